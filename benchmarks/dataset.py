@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Génération d'un jeu de données synthétique pour les tests de charge.
+
+Même graine et mêmes paramètres -> même base, identifiant pour identifiant.
+Contenu :
+- filières, niveaux (L1 à M2), groupes (~35 étudiants), modules et enseignants ;
+- étudiants avec parcours sur plusieurs années : entrée en L1 (ou admission directe),
+  passage si la moyenne annuelle atteint 10, redoublement, abandon, diplôme ;
+- notes CC et CT par module et par année (niveau de l'étudiant + difficulté du module + bruit),
+  absences (assiduité propre à chaque étudiant), enseignements par année ;
+- journal d'audit des notes de l'année en cours (saisies et quelques corrections).
+
+L'insertion se fait en une transaction, triggers et index secondaires retirés le temps
+du chargement ; index plein texte, moyennes matérialisées et journal des modifications
+sont ensuite reconstruits en bloc.
+
+Usage : python benchmarks/dataset.py SORTIE.db [--etudiants 50000] [--graine 1] [--annees 4] [--ecraser]
+Ordres de grandeur : 1 000 étudiants en quelques secondes, 500 000 en quelques minutes.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+APP_DIR = Path(__file__).resolve().parent.parent / "gestion_etudiants"
+sys.path.insert(0, str(APP_DIR))
+
+import main  # noqa: E402
+
+# (code, nom, part des étudiants, intitulés des modules)
+FILIERES = [
+    ("INF", "Informatique", 0.22, ("Algorithmique", "Programmation", "Bases de données",
+                                   "Réseaux", "Systèmes d'exploitation", "Génie logiciel")),
+    ("MAT", "Mathématiques", 0.10, ("Analyse", "Algèbre", "Probabilités",
+                                    "Statistique", "Topologie", "Analyse numérique")),
+    ("PHY", "Physique", 0.08, ("Mécanique", "Électromagnétisme", "Thermodynamique",
+                               "Optique", "Physique quantique", "Physique numérique")),
+    ("CHI", "Chimie", 0.07, ("Chimie organique", "Chimie minérale", "Chimie analytique",
+                             "Thermochimie", "Spectroscopie", "Travaux de laboratoire")),
+    ("BIO", "Biologie", 0.12, ("Biologie cellulaire", "Génétique", "Biochimie",
+                               "Microbiologie", "Écologie", "Physiologie")),
+    ("ECO", "Économie", 0.16, ("Microéconomie", "Macroéconomie", "Économétrie",
+                               "Finance", "Comptabilité", "Économie internationale")),
+    ("DRT", "Droit", 0.15, ("Droit civil", "Droit constitutionnel", "Droit des affaires",
+                            "Droit pénal", "Droit administratif", "Droit européen")),
+    ("LET", "Lettres modernes", 0.10, ("Littérature française", "Linguistique", "Littérature comparée",
+                                       "Stylistique", "Histoire littéraire", "Expression écrite")),
+]
+
+# (code, nom, part des entrées à ce niveau)
+NIVEAUX = [
+    ("L1", "Licence 1", 0.80),
+    ("L2", "Licence 2", 0.04),
+    ("L3", "Licence 3", 0.06),
+    ("M1", "Master 1", 0.10),
+    ("M2", "Master 2", 0.00),
+]
+NIVEAU_L3, NIVEAU_M2 = 2, 4
+
+MODULES_PAR_NIVEAU = 6
+COEFFICIENTS = (1.0, 1.5, 2.0, 3.0)
+EVALUATIONS = ("CC - Contrôle Continu", "CT - Contrôle Terminal")
+TAILLE_GROUPE = 35
+
+# Dernière année académique générée (2025 -> 2025-2026) : ne dépend pas de la date du jour
+ANNEE_FINALE = 2025
+
+# Parcours : probabilités par année
+P_ABANDON = 0.03
+P_REDOUBLEMENT = 0.85     # échec : redouble (une fois par niveau), sinon quitte
+P_MASTER = 0.60           # L3 validée : poursuit en M1, sinon diplômé
+P_JUSTIFIEE = 0.35
+P_CORRECTION = 0.03       # notes de l'année en cours corrigées après saisie
+
+NOMS = [
+    "Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand", "Leroy", "Moreau",
+    "Simon", "Laurent", "Lefèvre", "Michel", "Garcia", "David", "Bertrand", "Roux", "Vincent", "Fournier",
+    "Morel", "Girard", "André", "Lefebvre", "Mercier", "Dupont", "Lambert", "Bonnet", "François", "Martinez",
+    "Legrand", "Garnier", "Faure", "Rousseau", "Blanc", "Guérin", "Muller", "Henry", "Roussel", "Nicolas",
+    "Perrin", "Morin", "Mathieu", "Clément", "Gauthier", "Dumont", "Lopez", "Fontaine", "Chevalier", "Robin",
+    "Diallo", "Traoré", "Ndiaye", "Koné", "Mensah", "Nguyen", "Benali", "Haddad", "Gnadame", "Wandji",
+]
+PRENOMS_F = [
+    "Emma", "Léa", "Chloé", "Manon", "Inès", "Camille", "Sarah", "Jade", "Louise", "Zoé",
+    "Élodie", "Anaïs", "Clémence", "Océane", "Mélissa", "Aïcha", "Fatou", "Amina", "Maëlys", "Juliette",
+    "Héloïse", "Margaux", "Noémie", "Salomé", "Mileina",
+]
+PRENOMS_M = [
+    "Lucas", "Hugo", "Louis", "Gabriel", "Arthur", "Jules", "Nathan", "Raphaël", "Adam", "Théo",
+    "Mathéo", "Noé", "Ethan", "Maël", "Léo", "Paul", "Antoine", "Jérôme", "François", "Mamadou",
+    "Moussa", "Karim", "Yanis", "Jean-Eudes", "Yobe",
+]
+VILLES = [
+    "Paris", "Lyon", "Marseille", "Toulouse", "Lille", "Bordeaux", "Nantes", "Strasbourg", "Rennes", "Montpellier",
+    "Dakar", "Abidjan", "Douala", "Lomé", "Cotonou",
+]
+RUES = ["rue de la République", "avenue Victor Hugo", "boulevard Pasteur", "rue des Écoles", "place de la Gare",
+        "rue du Moulin", "allée des Tilleuls", "rue Jean Jaurès"]
+MOTIFS = ["Maladie", "Rendez-vous médical", "Raison familiale", "Transport",
+          "Convocation administrative", "Compétition sportive"]
+
+# Tables chargées en masse : triggers et index secondaires retirés pendant l'insertion
+BULK_TABLES = ("etudiants", "inscriptions", "notes", "notes_audit", "absences", "enseignements", "groupes", "modules")
+
+CHUNK_SIZE = 20000
+
+
+def annee_label(start: int) -> str:
+    return f"{start}-{start + 1}"
+
+
+class Reference:
+    """Filières, niveaux, groupes, modules et enseignants, avec leurs identifiants."""
+
+    def __init__(self, rng, students: int, years: list, group_base: int):
+        nf, nl, nm = len(FILIERES), len(NIVEAUX), MODULES_PAR_NIVEAU
+        self.years = years
+        cells = nf * nl
+
+        # Modules d'une cellule (filière, niveau) : identifiants contigus
+        self.module_base = 1 + np.arange(cells) * nm
+        self.coefficients = rng.choice(COEFFICIENTS, size=cells * nm)
+        self.difficulty = rng.normal(0.0, 1.5, size=cells * nm)
+
+        # Groupes par cellule, dimensionnés sur l'effectif annuel attendu
+        weights = np.repeat([f[2] for f in FILIERES], nl)
+        expected = students * weights * 2.5 / len(years) / nl
+        self.group_count = np.maximum(1, np.ceil(expected / TAILLE_GROUPE)).astype(np.int64)
+        self.group_start = group_base + np.concatenate(([0], np.cumsum(self.group_count)[:-1]))
+
+        # Un titulaire par module, qui change parfois d'une année sur l'autre
+        self.teachers = max(10, cells * nm // 2)
+        titular = rng.integers(0, self.teachers, size=cells * nm)
+        self.titular = np.empty((len(years), cells * nm), dtype=np.int64)
+        for y in range(len(years)):
+            change = rng.random(cells * nm) < 0.15
+            titular = np.where(change, rng.integers(0, self.teachers, size=cells * nm), titular)
+            self.titular[y] = titular + 1
+
+    def insert(self, conn) -> dict:
+        nl, nm = len(NIVEAUX), MODULES_PAR_NIVEAU
+        conn.executemany("INSERT INTO filieres (id, code, nom) VALUES (?, ?, ?)",
+                         [(i + 1, code, nom) for i, (code, nom, _, _) in enumerate(FILIERES)])
+        conn.executemany("INSERT INTO niveaux (id, code, nom, ordre) VALUES (?, ?, ?, ?)",
+                         [(i + 1, code, nom, i + 1) for i, (code, nom, _) in enumerate(NIVEAUX)])
+
+        groupes, modules = [], []
+        for f, (fcode, fnom, _, themes) in enumerate(FILIERES):
+            for l, (ncode, _, _) in enumerate(NIVEAUX):
+                cell = f * nl + l
+                for g in range(int(self.group_count[cell])):
+                    groupes.append((int(self.group_start[cell]) + g, f"{fcode}-{ncode}-G{g + 1:02d}",
+                                    f"{fnom} {ncode} groupe {g + 1}", f + 1, l + 1))
+                for k, theme in enumerate(themes[:nm]):
+                    module_id = int(self.module_base[cell]) + k
+                    coef = float(self.coefficients[module_id - 1])
+                    semestre = f"S{2 * l + 1 + (k >= nm // 2)}"
+                    modules.append((module_id, f"{fcode}-{ncode}-{k + 1:02d}", f"{theme} {ncode}", coef,
+                                    int(round(coef * 2)), semestre, f + 1, l + 1))
+        conn.executemany("INSERT INTO groupes (id, code, nom, filiere_id, niveau_id) VALUES (?, ?, ?, ?, ?)", groupes)
+        conn.executemany("""
+            INSERT INTO modules (id, code, nom, coefficient, credits, semestre, filiere_id, niveau_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, modules)
+
+        conn.executemany("INSERT INTO enseignants (id, nom, prenom, email) VALUES (?, ?, ?, ?)", [
+            (t + 1, NOMS[t % len(NOMS)], (PRENOMS_F + PRENOMS_M)[(t * 7) % 50], f"ens{t + 1:04d}@univ.exemple.fr")
+            for t in range(self.teachers)
+        ])
+        enseignements = [
+            (int(self.titular[y, m]), m + 1, annee_label(start))
+            for y, start in enumerate(self.years) for m in range(len(self.difficulty))
+        ]
+        conn.executemany("INSERT INTO enseignements (enseignant_id, module_id, annee_academique) VALUES (?, ?, ?)",
+                         enseignements)
+        return {"filieres": len(FILIERES), "niveaux": nl, "groupes": len(groupes), "modules": len(modules),
+                "enseignants": self.teachers, "enseignements": len(enseignements)}
+
+
+class Generator:
+    """Génère et insère les étudiants par lots de CHUNK_SIZE, parcours simulé année par année."""
+
+    def __init__(self, conn, rng, ref: Reference):
+        self.conn = conn
+        self.rng = rng
+        self.ref = ref
+        self.counters = {}
+        self.next_note_id = 1
+        self.counts = {"etudiants": 0, "inscriptions": 0, "notes": 0, "absences": 0, "notes_audit": 0}
+
+    def _matricules(self, noms, prenoms):
+        result = []
+        for nom, prenom in zip(noms, prenoms):
+            prefix = main.matricule_prefix(nom, prenom)
+            self.counters[prefix] = self.counters.get(prefix, 0) + 1
+            result.append(main.format_matricule(prefix, self.counters[prefix]))
+        return result
+
+    def chunk(self, first_id: int, n: int):
+        rng, ref = self.rng, self.ref
+        nl, nm, nyears = len(NIVEAUX), MODULES_PAR_NIVEAU, len(ref.years)
+        ids = np.arange(first_id, first_id + n)
+
+        fil = rng.choice(len(FILIERES), size=n, p=[f[2] for f in FILIERES])
+        entry = rng.integers(0, nyears, size=n)
+        entry_level = rng.choice(nl, size=n, p=[niv[2] for niv in NIVEAUX])
+        level = entry_level.copy()
+        ability = rng.normal(11.5, 2.5, size=n)
+        absenteeism = rng.gamma(0.8, 4.0, size=n)
+        female = rng.random(n) < 0.5
+        nom_idx = rng.integers(0, len(NOMS), size=n)
+        prenom_idx = rng.integers(0, len(PRENOMS_F), size=n)
+        birth_offset = rng.integers(0, 3 * 365, size=n)
+        ville_idx = rng.integers(0, len(VILLES), size=n)
+        has_phone = rng.random(n) < 0.7
+        phone = rng.integers(0, 10 ** 8, size=n)
+        street = rng.integers(1, 120, size=n)
+        rue_idx = rng.integers(0, len(RUES), size=n)
+        day = rng.integers(1, 26, size=n)
+
+        active = np.zeros(n, dtype=bool)
+        repeated = np.zeros(n, dtype=bool)
+        statut = np.full(n, "actif", dtype=object)
+
+        inscriptions, notes, absences, audits = [], [], [], []
+        for y, start in enumerate(ref.years):
+            annee = annee_label(start)
+            active |= entry == y
+            idx = np.flatnonzero(active)
+            k = len(idx)
+            if not k:
+                continue
+            cell = fil[idx] * nl + level[idx]
+            group = ref.group_start[cell] + (rng.random(k) * ref.group_count[cell]).astype(np.int64)
+            days = rng.integers(1, 26, size=k)
+            inscriptions.extend(zip(ids[idx].tolist(), (fil[idx] + 1).tolist(), (level[idx] + 1).tolist(),
+                                    group.tolist(), [annee] * k, [f"{start}-09-{d:02d} 10:00:00" for d in days]))
+
+            # Notes : une par module et par évaluation
+            modules = ref.module_base[cell][:, None] + np.arange(nm)           # (k, nm)
+            coef = ref.coefficients[modules - 1]
+            points, total = np.zeros(k), np.zeros(k)
+            for evaluation in EVALUATIONS:
+                raw = ability[idx][:, None] + ref.difficulty[modules - 1] + rng.normal(0.0, 2.5, size=(k, nm))
+                grade = np.clip(np.round(raw * 4) / 4, 0.0, 20.0)
+                points += (grade * coef).sum(axis=1)
+                total += coef.sum(axis=1)
+                note_ids = self.next_note_id + np.arange(k * nm)
+                self.next_note_id += k * nm
+                student_col = np.repeat(ids[idx], nm)
+                notes.extend(zip(note_ids.tolist(), student_col.tolist(), modules.ravel().tolist(),
+                                 grade.ravel().tolist(), [evaluation] * (k * nm), [annee] * (k * nm)))
+                if y == nyears - 1:
+                    audits.extend(self._audit(note_ids, modules.ravel(), grade.ravel(), evaluation, y, start))
+
+            # Absences : nombre selon l'assiduité de l'étudiant, jours ouvrés d'octobre à juin
+            count = np.minimum(rng.poisson(absenteeism[idx]), 30)
+            who = np.repeat(np.arange(k), count)
+            if len(who):
+                module = modules[who, rng.integers(0, nm, size=len(who))]
+                dates = np.busday_offset(np.datetime64(f"{start}-10-01") + rng.integers(0, 250, size=len(who)),
+                                         0, roll="forward").astype(str)
+                justified = rng.random(len(who)) < P_JUSTIFIEE
+                motif = rng.integers(0, len(MOTIFS), size=len(who))
+                absences.extend(zip(ids[idx][who].tolist(), module.tolist(), dates.tolist(),
+                                    justified.astype(int).tolist(),
+                                    [MOTIFS[m] if j else None for m, j in zip(motif, justified)]))
+
+            # Fin d'année (sauf l'année en cours) : passage, redoublement, abandon ou diplôme
+            if y == nyears - 1:
+                break
+            passed = points / total >= 10.0
+            lvl = level[idx]
+            quit_ = rng.random(k) < P_ABANDON
+            repeat = ~passed & ~repeated[idx] & (rng.random(k) < P_REDOUBLEMENT)
+            graduate = passed & ((lvl == NIVEAU_M2) | ((lvl == NIVEAU_L3) & (rng.random(k) >= P_MASTER)))
+            leave_fail = (~passed & ~repeat) | (quit_ & ~graduate)
+            level[idx] = np.where(passed & ~graduate, lvl + 1, lvl)
+            repeated[idx] = repeat
+            statut[idx[graduate]] = "diplômé"
+            statut[idx[leave_fail]] = "suspendu"
+            active[idx[graduate | leave_fail]] = False
+
+        # Étudiants
+        noms = [NOMS[i] for i in nom_idx]
+        prenoms = [(PRENOMS_F if f else PRENOMS_M)[i] for f, i in zip(female, prenom_idx)]
+        matricules = self._matricules(noms, prenoms)
+        entry_year = np.asarray(ref.years)[entry]
+        # 18 à 21 ans à l'entrée en L1, un an de plus par niveau d'admission directe
+        births = (np.array([f"{y - 18}-09-01" for y in entry_year], dtype="datetime64[D]")
+                  - birth_offset - entry_level * 365).astype(str)
+        rows = []
+        for i in range(n):
+            rows.append((
+                int(ids[i]), matricules[i], noms[i], prenoms[i], births[i], VILLES[ville_idx[i]],
+                "F" if female[i] else "M", f"+33 6{phone[i]:08d}" if has_phone[i] else None,
+                f"{street[i]} {RUES[rue_idx[i]]}, {VILLES[(ville_idx[i] + i) % len(VILLES)]}",
+                f"{matricules[i].lower()}@etu.exemple.fr", statut[i], f"{entry_year[i]}-09-{day[i]:02d} 10:00:00",
+            ))
+        conn = self.conn
+        conn.executemany("""
+            INSERT INTO etudiants (id, matricule, nom, prenom, date_naissance, lieu_naissance, sexe, telephone,
+                                   adresse, email, statut, date_inscription)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        conn.executemany("""
+            INSERT INTO inscriptions (etudiant_id, filiere_id, niveau_id, groupe_id, annee_academique, statut, date_inscription)
+            VALUES (?, ?, ?, ?, ?, 'inscrit', ?)
+        """, inscriptions)
+        conn.executemany("""
+            INSERT INTO notes (id, etudiant_id, module_id, note, type_evaluation, annee_academique)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, notes)
+        conn.executemany("""
+            INSERT INTO absences (etudiant_id, module_id, date_absence, justifiee, motif)
+            VALUES (?, ?, ?, ?, ?)
+        """, absences)
+        conn.executemany("""
+            INSERT INTO notes_audit (note_id, action, old_value, new_value, changed_at, changed_by)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, audits)
+        for table, added in (("etudiants", n), ("inscriptions", len(inscriptions)), ("notes", len(notes)),
+                             ("absences", len(absences)), ("notes_audit", len(audits))):
+            self.counts[table] += added
+
+    def _audit(self, note_ids, modules, grades, evaluation, y, start):
+        """Saisie (INSERT) de chaque note de l'année en cours, et quelques corrections (UPDATE)."""
+        rng = self.rng
+        n = len(note_ids)
+        teachers = self.ref.titular[y, modules - 1]
+        entered = (np.datetime64(f"{start}-11-01") + rng.integers(0, 200, size=n)).astype(str)
+        annee = annee_label(start)
+        rows = [(nid, "INSERT", None, f"note={g};type={evaluation};annee={annee}", f"{d} 14:00:00", f"ens{t:04d}")
+                for nid, g, d, t in zip(note_ids.tolist(), grades.tolist(), entered.tolist(), teachers.tolist())]
+        corrected = np.flatnonzero(rng.random(n) < P_CORRECTION)
+        delta = rng.choice((-2.0, -1.0, -0.5, 0.5, 1.0, 2.0), size=len(corrected))
+        for i, d in zip(corrected.tolist(), delta.tolist()):
+            old = min(20.0, max(0.0, grades[i] - d))
+            rows.append((int(note_ids[i]), "UPDATE", f"note={old};type={evaluation};annee={annee}",
+                         f"note={grades[i]};type={evaluation};annee={annee}",
+                         f"{entered[i]} 16:30:00", f"ens{int(teachers[i]):04d}"))
+        return rows
+
+
+def _rebuild_derived(conn):
+    """Index plein texte, moyennes matérialisées et journal des modifications, en bloc."""
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name='etudiants_fts'").fetchone():
+        conn.execute("INSERT INTO etudiants_fts(etudiants_fts) VALUES ('rebuild')")
+    main.rebuild_student_averages(conn)
+    seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM modifications").fetchone()[0]
+    for table in main.COLUMNAR_TABLES:
+        conn.execute(f"""
+            INSERT OR REPLACE INTO modifications (table_name, row_id, operation, seq)
+            SELECT ?, id, 'U', ? + id FROM {table}
+        """, (table, seq))
+        seq += conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+
+
+def generate(db_path, students: int, seed: int = 1, years: int = 4, progress=None) -> dict:
+    """Crée la base `db_path` (qui ne doit pas exister) et y génère `students` étudiants.
+
+    Retourne le nombre de lignes insérées par table.
+    """
+    db_path = Path(db_path)
+    if db_path.exists():
+        raise FileExistsError(f"{db_path} existe déjà")
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    main.use_database(db_path)
+    main.ensure_tables_and_seed()
+
+    rng = np.random.default_rng(seed)
+    conn = main.db_connect()
+    try:
+        # Données cohérentes par construction : contrôle des clés étrangères inutile pendant le chargement
+        conn.execute("PRAGMA foreign_keys=OFF")
+        conn.execute("BEGIN IMMEDIATE")
+        marks = ", ".join("?" for _ in BULK_TABLES)
+        triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type='trigger'").fetchall()
+        indexes = conn.execute(f"""
+            SELECT name, sql FROM sqlite_master
+            WHERE type='index' AND sql IS NOT NULL AND tbl_name IN ({marks})
+        """, BULK_TABLES).fetchall()
+        for name, _ in triggers:
+            conn.execute(f"DROP TRIGGER {name}")
+        for name, _ in indexes:
+            conn.execute(f"DROP INDEX {name}")
+
+        group_base = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM groupes").fetchone()[0]
+        ref = Reference(rng, students, list(range(ANNEE_FINALE - years + 1, ANNEE_FINALE + 1)), group_base)
+        counts = ref.insert(conn)
+        gen = Generator(conn, rng, ref)
+        for first in range(0, students, CHUNK_SIZE):
+            gen.chunk(first + 1, min(CHUNK_SIZE, students - first))
+            if progress:
+                progress(min(first + CHUNK_SIZE, students), students)
+        conn.executemany("INSERT INTO matricule_compteurs (prefixe, dernier) VALUES (?, ?)", gen.counters.items())
+        counts.update(gen.counts)
+
+        for _, sql in indexes:
+            conn.execute(sql)
+        for _, sql in triggers:
+            conn.execute(sql)
+        _rebuild_derived(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.close()
+    main.checkpoint_database()
+    return counts
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Jeu de données synthétique pour les tests de charge")
+    parser.add_argument("sortie", metavar="SORTIE", help="fichier de base à créer")
+    parser.add_argument("--etudiants", type=int, default=1000, help="nombre d'étudiants (ex. 1000, 50000, 500000)")
+    parser.add_argument("--graine", type=int, default=1, help="graine du générateur aléatoire")
+    parser.add_argument("--annees", type=int, default=4, help=f"années académiques jusqu'à {annee_label(ANNEE_FINALE)}")
+    parser.add_argument("--ecraser", action="store_true", help="remplacer SORTIE s'il existe")
+    args = parser.parse_args()
+
+    target = Path(args.sortie)
+    if args.ecraser:
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(str(target) + suffix)
+            if path.exists():
+                path.unlink()
+
+    def report(done, total):
+        sys.stderr.write(f"\rÉtudiants : {done}/{total}")
+        sys.stderr.flush()
+
+    start = time.perf_counter()
+    counts = generate(target, args.etudiants, args.graine, args.annees, report if sys.stderr.isatty() else None)
+    elapsed = time.perf_counter() - start
+    if sys.stderr.isatty():
+        sys.stderr.write("\n")
+    for table, count in counts.items():
+        print(f"{table:<14} {count:>10}")
+    print(f"Base générée en {elapsed:.1f} s : {target}")
+
+
+if __name__ == "__main__":
+    main_cli()
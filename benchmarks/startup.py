@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mesure du temps de démarrage de l'application.
+
+- import : interpréteur neuf -> `import main` terminé (sans affichage).
+- bibliotheques : import des bibliothèques lourdes dont main.py diffère le chargement
+  (ce que coûterait leur import au lancement).
+- connexion : interpréteur neuf -> fenêtre de connexion affichée, sur une base temporaire
+  (nécessite un affichage ; le script lancé quitte dès que la fenêtre est affichée).
+
+Usage : python benchmarks/startup.py [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent / "gestion_etudiants"
+
+HEAVY_MODULES = [
+    "reportlab.pdfgen.canvas",
+    "openpyxl",
+    "matplotlib.figure",
+    "matplotlib.backends.backend_tkagg",
+    "numpy",
+]
+
+
+# Démarrage de main.py (__main__) sur la base argv[1], jusqu'à l'affichage de la fenêtre de connexion
+CONNEXION_SCRIPT = """
+import sys
+import tkinter as tk
+from pathlib import Path
+
+import ttkbootstrap as ttkb
+
+import main
+
+main.use_database(Path(sys.argv[1]))
+main.ensure_tables_and_seed()
+root = tk.Tk()
+root.withdraw()
+ttkb.Style(theme="flatly")
+login = main.Login(root)
+login.bind("<Map>", lambda e: root.after_idle(root.quit), add="+")
+root.mainloop()
+"""
+
+
+def time_process(args, env=None) -> float:
+    """Durée (s) d'un processus Python lancé dans le dossier de l'application."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + args, cwd=APP_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def display_available() -> bool:
+    return not sys.platform.startswith("linux") or bool(os.environ.get("DISPLAY"))
+
+
+def scenarios(db_path):
+    yield "interpreteur", ["-c", "pass"], None
+    yield "import", ["-c", "import main"], None
+    yield "bibliotheques", ["-c", "import " + ", ".join(HEAVY_MODULES)], None
+    if display_available():
+        # Base créée avant les mesures : seul le démarrage sur une base existante est chronométré
+        time_process(["-c", f"import main; main.use_database({str(db_path)!r}); main.ensure_tables_and_seed()"])
+        yield "connexion", ["-c", CONNEXION_SCRIPT, str(db_path)], None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps de démarrage de l'application")
+    parser.add_argument("--runs", type=int, default=5, help="nombre de mesures par scénario")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, command, env in scenarios(Path(tmp) / "database.db"):
+            times = [time_process(command, env) for _ in range(args.runs)]
+            print(f"{name:<14} médiane {statistics.median(times) * 1000:8.1f} ms   "
+                  f"min {min(times) * 1000:8.1f} ms   ({args.runs} mesures)")
+    if not display_available():
+        print("connexion      ignoré : aucun affichage ($DISPLAY)")
+
+
+if __name__ == "__main__":
+    main()
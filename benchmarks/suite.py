@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Banc de performance des chemins critiques de l'application, sur jeux de données générés.
+
+Pour chaque échelle (nombre d'étudiants), la base est générée par dataset.py (puis
+réutilisée depuis --donnees) et chaque scénario est mesuré après un passage d'échauffement.
+Les scénarios sans interface graphique reprennent les lectures et écritures des
+fonctions de l'application (voir chaque scénario). Les scénarios qui écrivent
+remettent la base dans son état initial après chaque mesure.
+
+Résultats en JSON (médiane, min, moyenne, écart-type, mesures brutes, environnement) ;
+--comparer signale les scénarios dont la médiane dépasse l'ancienne de plus de --seuil
+(code de sortie 1).
+
+Usage : python benchmarks/suite.py [--echelles 1000 50000] [--scenarios ...] [--repetitions 5]
+                                   [--sortie resultats.json] [--comparer ancien.json] [--seuil 0.10]
+"""
+
+import argparse
+import csv
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+import dataset  # ajoute gestion_etudiants au chemin d'import
+import main  # noqa: E402
+from startup import time_process  # noqa: E402
+
+BENCH_DIR = Path(__file__).resolve().parent
+
+DEFAULT_SCALES = (1000, 50000)
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.10
+
+# Taille des échantillons d'une mesure
+SAMPLE_STUDENTS = 200
+TRANSCRIPTS = 20
+IMPORT_ROWS = 1000
+PAGE_SIZE = 200
+
+students = main.StudentService()
+enrollments = main.EnrollmentService()
+grades = main.GradeService(changed_by="benchmark")
+absences = main.AbsenceService()
+documents = main.DocumentService()
+
+
+class Scenario:
+    def __init__(self, name, fn, setup=None, teardown=None, repeat=None):
+        self.name = name
+        self.fn = fn
+        self.setup = setup
+        self.teardown = teardown
+        self.repeat = repeat
+
+
+SCENARIOS = {}
+
+
+def scenario(name, setup=None, teardown=None, repeat=None):
+    """Enregistre fn(ctx) ; setup(ctx) / teardown(ctx) encadrent chaque mesure sans être chronométrés.
+    repeat : plafond du nombre de mesures (scénarios longs)."""
+    def register(fn):
+        SCENARIOS[name] = Scenario(name, fn, setup, teardown, repeat)
+        return fn
+    return register
+
+
+class Context:
+    """Base d'une échelle, échantillon d'étudiants et dossier de travail."""
+
+    def __init__(self, db_path: Path, scale: int, seed: int, workdir: Path):
+        self.db_path = db_path
+        self.scale = scale
+        self.workdir = workdir
+        rng = np.random.default_rng(seed)
+        total = main.fetch_rows("SELECT COUNT(*) FROM etudiants")[0][0]
+        self.sample = sorted(int(i) for i in rng.choice(np.arange(1, total + 1), size=min(SAMPLE_STUDENTS, total),
+                                                      replace=False))
+        self.rows = main.fetch_rows(
+            f"SELECT nom, prenom FROM etudiants WHERE id IN ({', '.join('?' for _ in self.sample)})", self.sample)
+        self.state = {}
+
+
+def _first_page(query, limit):
+    if query.keys is None:
+        return main.fetch_rows(query.sql + " LIMIT ?", list(query.params) + [limit])
+    return main.fetch_keyset_page(query.sql, query.params, query.keys, None, True, limit)
+
+
+# SCÉNARIOS
+
+@scenario("refresh_all")
+def bench_refresh_all(ctx):
+    """Lectures de App.refresh_all, tous onglets construits : première page de chaque liste,
+    listes de sélection, statistiques d'absences et tableau de bord."""
+    _first_page(students.list_query(), main.App.SEARCH_CACHE_ROWS + 1)
+    students.choices()
+    enrollments.group_choices()
+    for query in (enrollments.list_query(), grades.list_query(), absences.list_query()):
+        _first_page(query, PAGE_SIZE)
+    absences.stats()
+    main.load_dashboard_data()
+
+
+FILTERS = [
+    main.StudentFilter("martin"),
+    main.StudentFilter("élodie dub"),
+    main.StudentFilter("ma", statut="actif"),
+    main.StudentFilter("", filiere="INF", niveau="L2"),
+    main.StudentFilter("", filiere="ECO", niveau="L1", groupe="ECO-L1-G01"),
+    main.StudentFilter("introuvable"),
+]
+
+
+@scenario("apply_etudiants_filters")
+def bench_filters(ctx):
+    """Recherches de l'onglet Étudiants (plein texte et filtres), première page affichée."""
+    for filtre in FILTERS:
+        _first_page(students.search_query(filtre), main.App.SEARCH_CACHE_ROWS + 1)
+
+
+@scenario("generate_matricule")
+def bench_matricules(ctx):
+    """Attribution d'un matricule par étudiant de l'échantillon (annulée : la base ne change pas)."""
+    conn = main.db_connect()
+    try:
+        for nom, prenom in ctx.rows:
+            main.allocate_matricules(conn, main.matricule_prefix(nom, prenom))
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def _import_setup(ctx):
+    path = ctx.workdir / "import.csv"
+    if not path.exists():
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["nom", "prenom", "email"])
+            for i in range(IMPORT_ROWS):
+                nom, prenom = ctx.rows[i % len(ctx.rows)]
+                w.writerow([nom, prenom, f"import{i}@bench.exemple.fr"])
+    conn = main.db_connect()
+    try:
+        ctx.state["max_id"] = conn.execute("SELECT COALESCE(MAX(id), 0) FROM etudiants").fetchone()[0]
+        ctx.state["compteurs"] = conn.execute("SELECT prefixe, dernier FROM matricule_compteurs").fetchall()
+    finally:
+        conn.close()
+
+
+def _import_teardown(ctx):
+    conn = main.db_connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM etudiants WHERE id > ?", (ctx.state["max_id"],))
+            conn.execute("DELETE FROM modifications WHERE table_name='etudiants' AND row_id > ?", (ctx.state["max_id"],))
+            conn.execute("DELETE FROM matricule_compteurs")
+            conn.executemany("INSERT INTO matricule_compteurs (prefixe, dernier) VALUES (?, ?)", ctx.state["compteurs"])
+    finally:
+        conn.close()
+
+
+@scenario("import_etudiants_csv", setup=_import_setup, teardown=_import_teardown)
+def bench_import(ctx):
+    """Import CSV de IMPORT_ROWS étudiants (supprimés après la mesure)."""
+    report = main.import_etudiants_csv_file(str(ctx.workdir / "import.csv"))
+    if report["rejects"]:
+        raise RuntimeError(f"Import : {len(report['rejects'])} ligne(s) rejetée(s)")
+
+
+@scenario("get_student_average")
+def bench_average(ctx):
+    """Moyenne toutes années et moyenne de l'année en cours de chaque étudiant de l'échantillon."""
+    annee = dataset.annee_label(dataset.ANNEE_FINALE)
+    for etudiant_id in ctx.sample:
+        students.average(etudiant_id)
+        students.average(etudiant_id, annee)
+
+
+@scenario("generate_transcript_pdf", repeat=3)
+def bench_transcripts(ctx):
+    """Relevés de notes PDF de TRANSCRIPTS étudiants."""
+    for etudiant_id in ctx.sample[:TRANSCRIPTS]:
+        documents.transcript(etudiant_id, str(ctx.workdir / f"releve_{etudiant_id}.pdf"))
+
+
+@scenario("export_notes_xlsx", repeat=3)
+def bench_export_notes(ctx):
+    """Export Excel de toutes les notes."""
+    main.export_notes_to_xlsx(str(ctx.workdir / "notes.xlsx"))
+
+
+@scenario("refresh_dashboard")
+def bench_dashboard(ctx):
+    """Données du tableau de bord (toutes les parties)."""
+    main.load_dashboard_data()
+
+
+@scenario("startup", repeat=3)
+def bench_startup(ctx):
+    """Interpréteur neuf : import de main puis vérification du schéma de la base (sans affichage)."""
+    main.DB_POOL.close_all()
+    time_process(["-c", f"import main; main.use_database({str(ctx.db_path)!r}); main.ensure_tables_and_seed()"])
+
+
+# EXÉCUTION
+
+def dataset_path(directory: Path, scale: int, seed: int) -> Path:
+    return directory / f"etudiants_{scale}_g{seed}.db"
+
+
+def prepare_dataset(directory: Path, scale: int, seed: int) -> Path:
+    path = dataset_path(directory, scale, seed)
+    if not path.exists():
+        print(f"Génération du jeu de {scale} étudiants (graine {seed})...")
+        start = time.perf_counter()
+        try:
+            dataset.generate(path, scale, seed)
+        except BaseException:
+            for suffix in ("", "-wal", "-shm"):
+                leftover = Path(str(path) + suffix)
+                if leftover.exists():
+                    leftover.unlink()
+            raise
+        print(f"  {time.perf_counter() - start:.1f} s")
+    main.use_database(path)
+    main.ensure_tables_and_seed()
+    return path
+
+
+def measure(sc: Scenario, ctx: Context, repeat: int) -> list:
+    """Durées (s) de `repeat` mesures, après un passage d'échauffement."""
+    times = []
+    for run in range(repeat + 1):
+        if sc.setup:
+            sc.setup(ctx)
+        try:
+            start = time.perf_counter()
+            sc.fn(ctx)
+            elapsed = time.perf_counter() - start
+        finally:
+            if sc.teardown:
+                sc.teardown(ctx)
+        if run:
+            times.append(elapsed)
+    return times
+
+
+def summarize(name, scale, times) -> dict:
+    return {
+        "scenario": name,
+        "echelle": scale,
+        "mediane": statistics.median(times),
+        "min": min(times),
+        "moyenne": statistics.mean(times),
+        "ecart_type": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "mesures": times,
+    }
+
+
+def environment(seed) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, check=True,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plateforme": platform.platform(),
+        "processeur": platform.processor() or platform.machine(),
+        "graine": seed,
+    }
+
+
+def compare(results, previous, threshold) -> list:
+    """[(scénario, échelle, ancienne médiane, nouvelle médiane)] des régressions au-delà de threshold."""
+    before = {(r["scenario"], r["echelle"]): r["mediane"] for r in previous["resultats"]}
+    regressions = []
+    print(f"\nComparaison avec {previous['environnement'].get('commit') or previous['environnement']['date']}")
+    for r in results:
+        key = (r["scenario"], r["echelle"])
+        if key not in before:
+            continue
+        ratio = r["mediane"] / before[key] if before[key] else float("inf")
+        flag = "  RÉGRESSION" if ratio > 1 + threshold else ""
+        print(f"  {r['scenario']:<26} {r['echelle']:>8}  {before[key] * 1000:10.1f} ms -> "
+              f"{r['mediane'] * 1000:10.1f} ms  ({ratio - 1:+.0%}){flag}")
+        if flag:
+            regressions.append((r["scenario"], r["echelle"], before[key], r["mediane"]))
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Banc de performance sur jeux de données générés")
+    parser.add_argument("--echelles", type=int, nargs="+", default=list(DEFAULT_SCALES),
+                        help="nombres d'étudiants (ex. 1000 50000 500000)")
+    parser.add_argument("--scenarios", nargs="+", choices=tuple(SCENARIOS), help="défaut : tous")
+    parser.add_argument("--repetitions", type=int, default=DEFAULT_REPEAT, help="mesures par scénario")
+    parser.add_argument("--graine", type=int, default=1)
+    parser.add_argument("--donnees", default=str(Path(tempfile.gettempdir()) / "gestion_etudiants_bench"),
+                        help="dossier des bases générées (réutilisées d'une exécution à l'autre)")
+    parser.add_argument("--sortie", help="fichier JSON des résultats (défaut : benchmarks/resultats/<date>.json)")
+    parser.add_argument("--comparer", metavar="JSON", help="résultats précédents à comparer")
+    parser.add_argument("--seuil", type=float, default=DEFAULT_THRESHOLD,
+                        help="hausse de la médiane tolérée (0.10 = 10 %%)")
+    args = parser.parse_args()
+
+    data_dir = Path(args.donnees)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    names = args.scenarios or list(SCENARIOS)
+    results = []
+    for scale in args.echelles:
+        db_path = prepare_dataset(data_dir, scale, args.graine)
+        with tempfile.TemporaryDirectory() as workdir:
+            ctx = Context(db_path, scale, args.graine, Path(workdir))
+            print(f"\n{scale} étudiants")
+            for name in names:
+                sc = SCENARIOS[name]
+                repeat = min(args.repetitions, sc.repeat) if sc.repeat else args.repetitions
+                times = measure(sc, ctx, max(1, repeat))
+                results.append(summarize(name, scale, times))
+                print(f"  {name:<26} médiane {statistics.median(times) * 1000:10.1f} ms   "
+                      f"min {min(times) * 1000:10.1f} ms   ({len(times)} mesures)")
+        main.checkpoint_database()
+
+    output = Path(args.sortie) if args.sortie else \
+        BENCH_DIR / "resultats" / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    report = {"environnement": environment(args.graine), "resultats": results}
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nRésultats : {output}")
+
+    if args.comparer:
+        previous = json.loads(Path(args.comparer).read_text(encoding="utf-8"))
+        regressions = compare(results, previous, args.seuil)
+        if regressions:
+            print(f"{len(regressions)} régression(s) au-delà de {args.seuil:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,12 @@
+"""Point d'entrée `python -m gestion_etudiants` : ligne de commande (voir cli.py)."""
+
+import sys
+from pathlib import Path
+
+# main.py importe ses modules voisins (statistiques) par leur nom
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from cli import run  # noqa: E402
+
+if __name__ == "__main__":
+    sys.exit(run())
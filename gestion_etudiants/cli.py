@@ -0,0 +1,409 @@
+"""Ligne de commande de l'application (sans interface graphique ni affichage).
+
+Mêmes fonctions et même base que l'application Tk : utilisable en script ou en tâche planifiée.
+
+    python -m gestion_etudiants [--db FICHIER] <commande> ...
+
+Commandes : import, export, transcripts, attestations, stats, maintenance, serve
+(`python -m gestion_etudiants <commande> --help` pour le détail).
+"""
+
+import argparse
+import csv
+import sqlite3
+import sys
+from pathlib import Path
+
+import main
+
+students = main.StudentService()
+absences = main.AbsenceService()
+documents = main.DocumentService()
+
+
+class CommandError(Exception):
+    """Erreur d'utilisation signalée sans trace (code de sortie 1)."""
+
+
+def _progress(label):
+    """Avancement sur stderr, seulement dans un terminal (rien dans les journaux des tâches planifiées)."""
+    if not sys.stderr.isatty():
+        return None
+
+    def report(done, total):
+        end = "\n" if total is not None and done >= total else ""
+        sys.stderr.write(f"\r{label} : {done}/{total if total is not None else '?'}{end}")
+        sys.stderr.flush()
+    return report
+
+
+def _lookup_id(conn, table, code):
+    """Identifiant d'une filière, d'un niveau ou d'un groupe à partir de son code."""
+    if not code:
+        return None
+    row = conn.execute(f"SELECT id FROM {table} WHERE code=?", (code,)).fetchone()
+    if not row:
+        raise CommandError(f"Code inconnu dans {table} : {code}")
+    return row[0]
+
+
+def _etudiant_id(matricule):
+    conn = main.db_connect()
+    try:
+        row = conn.execute("SELECT id FROM etudiants WHERE matricule=?", (matricule,)).fetchone()
+    finally:
+        conn.close()
+    if not row:
+        raise CommandError(f"Matricule inconnu : {matricule}")
+    return row[0]
+
+
+def _filters(args) -> dict:
+    """Filtres communs aux documents par lot (codes -> identifiants)."""
+    conn = main.db_connect()
+    try:
+        return {
+            "filiere_id": _lookup_id(conn, "filieres", args.filiere),
+            "niveau_id": _lookup_id(conn, "niveaux", args.niveau),
+            "groupe_id": _lookup_id(conn, "groupes", args.groupe),
+            "statut": args.statut or None,
+        }
+    finally:
+        conn.close()
+
+
+def _write_csv(filepath, headers, rows):
+    with open(filepath, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(headers)
+        w.writerows(rows)
+
+
+def _print_table(headers, rows):
+    rows = [["" if v is None else str(v) for v in r] for r in rows]
+    widths = [max([len(h)] + [len(r[i]) for r in rows]) for i, h in enumerate(headers)]
+    for r in [headers] + rows:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)).rstrip())
+
+
+def _batch_summary(result, output, merged):
+    if merged:
+        print(f"{result.total} document(s) écrits dans {output}")
+    else:
+        text = f"{result.written} document(s) générés"
+        if result.skipped:
+            text += f", {result.skipped} déjà présents conservés"
+        print(f"{text}, dans {output}")
+
+
+# IMPORT
+
+def cmd_import(args):
+    if args.format == "parquet":
+        if not main.pyarrow_available():
+            raise CommandError("pyarrow n'est pas installé (pip install pyarrow)")
+        result = main.import_columnar(args.fichiers, progress=_progress("Import Parquet"))
+        for table, n in result["counts"].items():
+            print(f"{table} : {n} ligne(s)")
+        for fichier, table, row_id, motif in result["rejects"]:
+            print(f"  rejet {fichier} ({table} id {row_id}) : {motif}")
+        return 1 if result["rejects"] else 0
+
+    status = 0
+    for filepath in args.fichiers:
+        result = students.import_csv(filepath, progress=_progress(f"Import {Path(filepath).name}"))
+        print(f"{filepath} : {result.inserted} étudiant(s) importé(s), {len(result.rejects)} rejet(s)")
+        if result.rejects:
+            status = 1
+            if args.rejets:
+                rejets = Path(args.rejets)
+                if len(args.fichiers) > 1:
+                    rejets = rejets.with_name(f"{rejets.stem}_{Path(filepath).stem}{rejets.suffix}")
+                main.write_import_rejects(result.rejects, str(rejets))
+                print(f"  rejets : {rejets}")
+            else:
+                for line, motif in result.rejects:
+                    print(f"  ligne {line} : {motif}")
+    return status
+
+
+# EXPORT
+
+def cmd_export(args):
+    if args.quoi == "parquet":
+        if not main.pyarrow_available():
+            raise CommandError("pyarrow n'est pas installé (pip install pyarrow)")
+        written = main.export_columnar(args.sortie, tables=args.tables, incremental=not args.complet,
+                                       progress=_progress("Export Parquet"))
+        for filepath, n in written:
+            print(f"{filepath} : {n} ligne(s)")
+        if not written:
+            print("Aucune modification depuis le dernier export")
+        return 0
+
+    if Path(args.sortie).suffix.lower() == ".csv":
+        if args.quoi != "etudiants":
+            raise CommandError("Export CSV disponible pour les étudiants seulement (utiliser .xlsx)")
+        documents.export_students_csv(args.sortie)
+    else:
+        documents.export_xlsx(args.quoi, args.sortie, progress=_progress(f"Export {args.quoi}"))
+    print(f"Export {args.quoi} : {args.sortie}")
+    return 0
+
+
+# DOCUMENTS
+
+def cmd_transcripts(args):
+    if args.matricule:
+        filepath = Path(args.sortie) / main.transcript_filename(args.matricule, args.annee)
+        documents.transcript(_etudiant_id(args.matricule), str(filepath))
+        print(f"Relevé généré : {filepath}")
+        return 0
+
+    result = documents.transcripts_batch(args.sortie, annee=args.annee or None, merged=args.fusion,
+                                         workers=args.workers, progress=_progress("Relevés"),
+                                         resume=args.reprendre, **_filters(args))
+    _batch_summary(result, args.sortie, args.fusion)
+    return 0
+
+
+def cmd_attestations(args):
+    if args.matricule:
+        filepath = Path(args.sortie) / main.attestation_filename(args.matricule, args.annee)
+        documents.attestation(_etudiant_id(args.matricule), args.annee, str(filepath))
+        print(f"Attestation générée : {filepath}")
+        return 0
+
+    result = documents.attestations_batch(args.sortie, args.annee, merged=args.fusion,
+                                          workers=args.workers, progress=_progress("Attestations"),
+                                          resume=args.reprendre, **_filters(args))
+    _batch_summary(result, args.sortie, args.fusion)
+    return 0
+
+
+# STATISTIQUES
+
+GROUP_TABLES = {"filiere": "filieres", "niveau": "niveaux", "groupe": "groupes", "module": "modules"}
+
+
+def _codes(table) -> dict:
+    conn = main.db_connect()
+    try:
+        return dict(conn.execute(f"SELECT id, code FROM {table}").fetchall())
+    finally:
+        conn.close()
+
+
+def _codes_etudiants() -> dict:
+    conn = main.db_connect()
+    try:
+        return dict(conn.execute("SELECT id, matricule FROM etudiants").fetchall())
+    finally:
+        conn.close()
+
+
+def _fmt(value, digits=2):
+    return "" if value != value else f"{value:.{digits}f}"  # NaN : groupe vide
+
+
+def cmd_stats_cohorte(args):
+    import numpy as np
+    from statistiques import group_stats
+
+    cohort = main.load_cohort(args.annee or None)
+    graded = ~np.isnan(cohort.averages)
+    overall = group_stats(cohort.averages[graded], np.zeros(int(graded.sum()), dtype=np.int64), 1)
+    print(f"Cohorte {args.annee or 'toutes années'} : {int(overall['count'][0])} étudiant(s) noté(s)")
+    if overall["count"][0]:
+        print(f"Moyenne {_fmt(overall['mean'][0])}  écart-type {_fmt(overall['std'][0])}  "
+              f"médiane {_fmt(overall['p50'][0])}  min {_fmt(overall['min'][0])}  max {_fmt(overall['max'][0])}  "
+              f"admis {_fmt(100 * overall['pass_rate'][0], 1)} %")
+        counts = np.bincount(cohort.mention_indexes()[graded], minlength=len(cohort.mentions) + 1)
+        for label, n in zip(main.mention_labels(), counts):
+            print(f"  {label} : {n}")
+
+    if args.par:
+        stats = cohort.module_stats() if args.par == "module" else cohort.stats_by(args.par)
+        codes = _codes(GROUP_TABLES[args.par])
+        headers = [args.par, "effectif", "moyenne", "ecart_type", "min", "p25", "mediane", "p75", "max", "reussite_%"]
+        rows = [
+            [codes.get(int(gid), gid), int(stats["count"][i]), _fmt(stats["mean"][i]), _fmt(stats["std"][i]),
+             _fmt(stats["min"][i]), _fmt(stats["p25"][i]), _fmt(stats["p50"][i]), _fmt(stats["p75"][i]),
+             _fmt(stats["max"][i]), _fmt(100 * stats["pass_rate"][i], 1)]
+            for i, gid in enumerate(stats["id"])
+        ]
+    else:
+        # Classement des étudiants
+        table = cohort.student_table()
+        matricules = _codes_etudiants()
+        mentions = [mention for _, mention in main.MENTIONS] + ["Insuffisant"]
+        headers = ["rang", "matricule", "moyenne", "mention"] + [f"rang_{name}" for name in ("filiere", "niveau", "groupe")]
+        order = np.argsort(np.where(table["rang"] > 0, table["rang"], len(table["rang"]) + 1), kind="stable")
+        rows = [
+            [int(table["rang"][i]) or "", matricules.get(int(table["id"][i]), ""), _fmt(table["moyenne"][i]),
+             mentions[table["mention"][i]] if graded[i] else "",
+             int(table["rang_filiere"][i]) or "", int(table["rang_niveau"][i]) or "", int(table["rang_groupe"][i]) or ""]
+            for i in order
+        ]
+
+    if args.csv:
+        _write_csv(args.csv, headers, rows)
+        print(f"{len(rows)} ligne(s) écrites dans {args.csv}")
+    elif args.par or args.classement:
+        print()
+        _print_table(headers, rows)
+    return 0
+
+
+def cmd_stats_absences(args):
+    rows = absences.alerts(args.seuil)
+    headers = ["matricule", "etudiant", "absences"]
+    if args.csv:
+        _write_csv(args.csv, headers, rows)
+        print(f"{len(rows)} alerte(s) écrites dans {args.csv}")
+    elif rows:
+        _print_table(headers, rows)
+    else:
+        print("Aucune alerte.")
+    return 0
+
+
+# MAINTENANCE
+
+def cmd_maintenance(args):
+    action = args.action
+    if action == "optimiser":
+        main.checkpoint_database()
+        print("Statistiques du planificateur à jour, journal WAL reporté dans la base")
+        return 0
+
+    conn = main.db_connect()
+    try:
+        if action == "verifier":
+            problems = [r[0] for r in conn.execute("PRAGMA integrity_check").fetchall() if r[0] != "ok"]
+            problems += [f"clé étrangère invalide : {table} ligne {rowid} -> {parent}"
+                         for table, rowid, parent, _ in conn.execute("PRAGMA foreign_key_check").fetchall()]
+            problems += [f"parcours complet : {label} ({detail})" for label, detail in main.find_full_scans(conn)]
+            print(f"Schéma version {main.schema_version(conn)} (application : {main.SCHEMA_VERSION})")
+            for problem in problems:
+                print(f"  {problem}")
+            print("Base saine" if not problems else f"{len(problems)} problème(s)")
+            return 1 if problems else 0
+
+        if action == "moyennes":
+            conn.execute("BEGIN IMMEDIATE")
+            main.rebuild_student_averages(conn)
+            conn.commit()
+            n = conn.execute("SELECT COUNT(*) FROM student_averages").fetchone()[0]
+            print(f"Moyennes recalculées : {n} ligne(s)")
+        elif action == "index":
+            conn.execute("BEGIN IMMEDIATE")
+            created = main.ensure_indexes(conn)
+            conn.commit()
+            print(f"Index recréés : {', '.join(created)}" if created else "Index à jour")
+        elif action == "sauvegarder":
+            if not args.fichier:
+                raise CommandError("Fichier de sauvegarde obligatoire")
+            Path(args.fichier).parent.mkdir(parents=True, exist_ok=True)
+            target = sqlite3.connect(args.fichier)
+            try:
+                conn.backup(target)
+            finally:
+                target.close()
+            print(f"Sauvegarde : {args.fichier}")
+    finally:
+        conn.close()
+    return 0
+
+
+def cmd_serve(args):
+    import server
+    server.serve(args.hote, args.port, args.lecteurs)
+    return 0
+
+
+# ANALYSE DES ARGUMENTS
+
+def _add_document_filters(parser):
+    parser.add_argument("--filiere", help="code de la filière")
+    parser.add_argument("--niveau", help="code du niveau")
+    parser.add_argument("--groupe", help="code du groupe")
+    parser.add_argument("--statut", help="statut d'inscription (ex. inscrit)")
+    parser.add_argument("--matricule", help="un seul étudiant (ignore les filtres)")
+    parser.add_argument("--fusion", action="store_true", help="un seul PDF : SORTIE est alors un fichier .pdf")
+    parser.add_argument("--workers", type=int, help="processus de rendu (défaut : nombre de cœurs)")
+    parser.add_argument("--reprendre", action="store_true",
+                        help="conserver les PDF déjà présents dans SORTIE (reprise d'un lot interrompu)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m gestion_etudiants",
+                                     description="Gestion des étudiants en ligne de commande")
+    parser.add_argument("--db", help=f"fichier de base SQLite (défaut : {main.DB_PATH})")
+    sub = parser.add_subparsers(dest="commande", metavar="commande")
+    sub.required = True
+
+    p = sub.add_parser("import", help="importer des étudiants (CSV) ou des fichiers Parquet")
+    p.add_argument("fichiers", nargs="+", metavar="FICHIER")
+    p.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    p.add_argument("--rejets", metavar="FICHIER", help="écrire les lignes rejetées dans ce CSV")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("export", help="exporter en Excel / CSV, ou en Parquet (dossier)")
+    p.add_argument("quoi", choices=("etudiants", "notes", "absences", "parquet"))
+    p.add_argument("sortie", metavar="SORTIE", help="fichier .xlsx (ou .csv pour les étudiants), dossier pour parquet")
+    p.add_argument("--tables", nargs="+", choices=tuple(main.COLUMNAR_TABLES), help="parquet : tables exportées")
+    p.add_argument("--complet", action="store_true", help="parquet : tout exporter, pas seulement les modifications")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("transcripts", help="relevés de notes PDF")
+    p.add_argument("sortie", metavar="SORTIE", help="dossier des PDF")
+    p.add_argument("--annee", help="année académique des inscriptions retenues")
+    _add_document_filters(p)
+    p.set_defaults(func=cmd_transcripts)
+
+    p = sub.add_parser("attestations", help="attestations de scolarité PDF")
+    p.add_argument("sortie", metavar="SORTIE", help="dossier des PDF")
+    p.add_argument("--annee", required=True, help="année académique")
+    _add_document_filters(p)
+    p.set_defaults(func=cmd_attestations)
+
+    p = sub.add_parser("stats", help="statistiques de cohorte et alertes d'absences")
+    stats = p.add_subparsers(dest="stats", metavar="type")
+    stats.required = True
+    q = stats.add_parser("cohorte", help="moyennes, mentions, classements")
+    q.add_argument("--annee", help="année académique (défaut : toutes)")
+    q.add_argument("--par", choices=tuple(GROUP_TABLES), help="statistiques par filière, niveau, groupe ou module")
+    q.add_argument("--classement", action="store_true", help="afficher le classement des étudiants")
+    q.add_argument("--csv", metavar="FICHIER", help="écrire le tableau (classement ou --par) dans un CSV")
+    q.set_defaults(func=cmd_stats_cohorte)
+    q = stats.add_parser("absences", help="étudiants au-delà d'un seuil d'absences")
+    q.add_argument("--seuil", type=int, default=3)
+    q.add_argument("--csv", metavar="FICHIER")
+    q.set_defaults(func=cmd_stats_absences)
+
+    p = sub.add_parser("maintenance", help="vérification et entretien de la base")
+    p.add_argument("action", choices=("verifier", "moyennes", "index", "optimiser", "sauvegarder"))
+    p.add_argument("fichier", nargs="?", metavar="FICHIER", help="sauvegarder : fichier de destination")
+    p.set_defaults(func=cmd_maintenance)
+
+    p = sub.add_parser("serve", help="serveur API HTTP/JSON : les postes lui confient leurs écritures")
+    p.add_argument("--hote", default="127.0.0.1", help="adresse d'écoute (défaut : 127.0.0.1)")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--lecteurs", type=int, default=8, help="threads de lecture (défaut : 8)")
+    p.set_defaults(func=cmd_serve)
+    return parser
+
+
+def run(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.db:
+        main.use_database(Path(args.db))
+    try:
+        main.ensure_tables_and_seed()
+        return args.func(args)
+    except (CommandError, ValueError, OSError, sqlite3.Error, RuntimeError) as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        return 1
+    finally:
+        main.DB_POOL.close_all()
@@ -1,26 +1,28 @@
+import os
 from pathlib import Path
 import sqlite3
 import hashlib
 import csv
-from datetime import datetime
+from datetime import datetime, date
 import calendar
+import re
+import unicodedata
+import threading
+import itertools
+import json
+import queue
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import NamedTuple, Optional
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 
 import ttkbootstrap as ttkb
 
-# PDF / Excel
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import cm
-from openpyxl import Workbook
-
-# Graphics
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-import numpy as np
+# Bibliothèques lourdes importées au premier usage, pas au lancement :
+# reportlab (PDF), openpyxl (Excel), matplotlib (Dashboard), numpy / statistiques,
+# pyarrow (Parquet, optionnel : pip install pyarrow, voir pyarrow_available).
+pa = pq = None
 
 
 # PATHS
@@ -32,11 +34,263 @@ DB_PATH = DB_DIR / "database.db"
 
 # DB HELPERS
 
+# Nombre maximal de connexions inactives conservées par thread
+DB_POOL_SIZE = 4
+
+# Profils PRAGMA appliqués à l'ouverture d'une connexion.
+# Le profil actif est lu dans parametres (clé 'db_profil').
+# - performance : WAL, lecteurs non bloqués par l'écrivain (base sur disque local)
+# - partage : journal classique, pour une base posée sur un lecteur réseau
+#   (le WAL repose sur de la mémoire partagée et ne fonctionne pas à travers SMB/NFS)
+# - standard : réglages SQLite par défaut, seulement un délai d'attente sur verrou
+DB_PROFILES = {
+    "performance": [
+        ("journal_mode", "WAL"),
+        ("synchronous", "NORMAL"),
+        ("cache_size", -64000),      # ~64 Mo
+        ("mmap_size", 268435456),    # 256 Mo
+        ("temp_store", "MEMORY"),
+        ("busy_timeout", 5000),
+    ],
+    "partage": [
+        ("journal_mode", "DELETE"),
+        ("synchronous", "FULL"),
+        ("cache_size", -32000),
+        ("mmap_size", 0),
+        ("temp_store", "MEMORY"),
+        ("busy_timeout", 15000),
+    ],
+    "standard": [
+        ("busy_timeout", 5000),
+    ],
+}
+DEFAULT_DB_PROFILE = "performance"
+
+# Checkpoint WAL exécuté à la fermeture (clé 'db_checkpoint') : PASSIVE, FULL, TRUNCATE ou AUCUN
+DEFAULT_DB_CHECKPOINT = "TRUNCATE"
+
+# Délai (ms) entre la dernière frappe et la recherche d'étudiants (clé 'recherche_delai_ms')
+DEFAULT_SEARCH_DELAY_MS = 250
+
+
+class PooledConnection:
+    """Connexion sqlite3 empruntée au pool.
+
+    S'utilise comme une connexion normale : `close()` la restitue au pool au lieu
+    de la fermer. Comme sqlite3, `with conn:` valide (ou annule en cas d'erreur)
+    la transaction sans fermer la connexion : `close()` reste nécessaire.
+    """
+    def __init__(self, pool, raw, owner):
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_raw", raw)
+        object.__setattr__(self, "_owner", owner)
+
+    def __getattr__(self, name):
+        raw = self._raw
+        if raw is None:
+            raise sqlite3.ProgrammingError("Connexion déjà restituée au pool")
+        return getattr(raw, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._raw, name, value)
+
+    def close(self):
+        raw = self._raw
+        if raw is not None:
+            object.__setattr__(self, "_raw", None)
+            self._pool.release(raw, self._owner)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._raw is not None:
+            if exc_type is None:
+                self._raw.commit()
+            else:
+                self._raw.rollback()
+        return False
+
+    def __del__(self):
+        # Connexion oubliée sans close() : on la rend quand même au pool
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Pool de connexions SQLite partagé par toute l'application.
+
+    Chaque thread réutilise ses propres connexions (sqlite3 n'aime pas partager une
+    connexion entre threads) ; au plus `size` connexions inactives sont gardées
+    par thread. Une connexion est vérifiée avant d'être resservie.
+    """
+    def __init__(self, db_path, size=DB_POOL_SIZE):
+        self.db_path = Path(db_path)
+        self.size = size
+        self._lock = threading.Lock()
+        self._idle = {}  # thread id -> [connexions inactives]
+        self._busy = {}  # thread id -> {connexions prêtées}
+        self._dir_ready = False
+        self.profile = None  # nom du profil PRAGMA, lu à la première ouverture
+
+    def _open(self):
+        if not self._dir_ready:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._dir_ready = True
+        # check_same_thread=False uniquement pour permettre close_all() depuis
+        # le thread principal : le pool ne prête jamais une connexion à un autre thread.
+        raw = sqlite3.connect(self.db_path, check_same_thread=False)
+        raw.execute("PRAGMA foreign_keys = ON;")
+        first = self.profile is None
+        if first:
+            self.profile = _read_parametre(raw, "db_profil", DEFAULT_DB_PROFILE)
+            if self.profile not in DB_PROFILES:
+                print(f"Profil base inconnu '{self.profile}', profil {DEFAULT_DB_PROFILE} utilisé")
+                self.profile = DEFAULT_DB_PROFILE
+        for pragma, value in DB_PROFILES[self.profile]:
+            # journal_mode est persistant dans le fichier : inutile de le rejouer à chaque connexion
+            if pragma == "journal_mode" and not first:
+                continue
+            try:
+                raw.execute(f"PRAGMA {pragma} = {value};")
+            except sqlite3.Error as e:
+                print(f"PRAGMA {pragma} ignoré: {e}")
+        return raw
+
+    def _is_healthy(self, raw):
+        try:
+            raw.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        with self._lock:
+            stack = self._idle.get(threading.get_ident())
+            raw = stack.pop() if stack else None
+        while raw is not None:
+            if self._is_healthy(raw):
+                return self._lend(raw)
+            try:
+                raw.close()
+            except sqlite3.Error:
+                pass
+            with self._lock:
+                stack = self._idle.get(threading.get_ident())
+                raw = stack.pop() if stack else None
+        return self._lend(self._open())
+
+    def _lend(self, raw):
+        owner = threading.get_ident()
+        with self._lock:
+            self._busy.setdefault(owner, set()).add(raw)
+        return PooledConnection(self, raw, owner)
+
+    def interrupt_thread(self, thread_id):
+        """Interrompt les requêtes en cours sur les connexions prêtées à ce thread."""
+        with self._lock:
+            conns = list(self._busy.get(thread_id, ()))
+        for raw in conns:
+            raw.interrupt()
+
+    def release(self, raw, owner):
+        """Restitue `raw`, prêtée au thread `owner`.
+
+        Rendue depuis un autre thread (close() ailleurs, ramasse-miettes), elle est
+        fermée : elle ne rejoint jamais les connexions inactives d'un autre thread.
+        """
+        with self._lock:
+            self._busy.get(owner, set()).discard(raw)
+        if owner != threading.get_ident():
+            try:
+                raw.close()
+            except sqlite3.Error:
+                pass
+            return
+        try:
+            # Même comportement qu'un close() : le travail non validé est abandonné
+            if raw.in_transaction:
+                raw.rollback()
+            raw.row_factory = None
+        except sqlite3.Error:
+            raw.close()
+            return
+        with self._lock:
+            stack = self._idle.setdefault(owner, [])
+            if len(stack) < self.size:
+                stack.append(raw)
+                return
+        raw.close()
+
+    def reset_profile(self):
+        """Relit le profil PRAGMA à la prochaine ouverture (après modification de parametres)."""
+        self.close_all()
+        self.profile = None
+
+    def close_all(self):
+        """Ferme toutes les connexions inactives (à appeler à la fermeture)."""
+        with self._lock:
+            stacks = list(self._idle.values())
+            self._idle = {}
+        for stack in stacks:
+            for raw in stack:
+                try:
+                    raw.close()
+                except sqlite3.Error:
+                    pass
+
+
+def _read_parametre(conn, cle: str, defaut=None):
+    try:
+        row = conn.execute("SELECT valeur FROM parametres WHERE cle=?", (cle,)).fetchone()
+    except sqlite3.OperationalError:
+        # Table parametres pas encore créée (premier lancement)
+        return defaut
+    return row[0] if row else defaut
+
+
+DB_POOL = ConnectionPool(DB_PATH)
+
+
 def db_connect():
-    DB_DIR.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
+    """Emprunte une connexion au pool partagé (conn.close() la restitue)."""
+    return DB_POOL.acquire()
+
+
+def use_database(db_path):
+    """Travaille sur un autre fichier de base (option --db de la ligne de commande)."""
+    global DB_POOL
+    DB_POOL.close_all()
+    DB_POOL = ConnectionPool(db_path)
+
+
+def get_parametre(cle: str, defaut=None):
+    """Valeur d'un paramètre de la table parametres (ou `defaut` s'il est absent)."""
+    conn = db_connect()
+    try:
+        return _read_parametre(conn, cle, defaut)
+    finally:
+        conn.close()
+
+
+def checkpoint_database():
+    """Applique la politique de checkpoint WAL puis ferme les connexions du pool."""
+    conn = db_connect()
+    try:
+        mode = str(_read_parametre(conn, "db_checkpoint", DEFAULT_DB_CHECKPOINT)).upper()
+        journal = conn.execute("PRAGMA journal_mode;").fetchone()[0]
+        if journal.lower() == "wal" and mode in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+            busy, log_frames, done = conn.execute(f"PRAGMA wal_checkpoint({mode});").fetchone()
+            if busy:
+                print(f"Checkpoint WAL partiel ({done}/{log_frames} pages) : base encore utilisée")
+        conn.execute("PRAGMA optimize;")
+    except sqlite3.Error as e:
+        print(f"Erreur checkpoint: {e}")
+    finally:
+        conn.close()
+        DB_POOL.close_all()
 
 
 def hash_password(password: str) -> str:
@@ -47,8 +301,26 @@ def now_iso():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
-def ensure_tables_and_seed():
-    conn = db_connect()
+# MIGRATIONS DU SCHÉMA
+
+# Colonnes ajoutées à des tables existantes après leur première version : (colonne, définition)
+LEGACY_COLUMNS = {
+    "etudiants": [
+        ("date_naissance", "TEXT"),
+        ("lieu_naissance", "TEXT"),
+        ("sexe", "TEXT DEFAULT 'M'"),
+        ("telephone", "TEXT"),
+        ("adresse", "TEXT"),
+        ("photo_path", "TEXT"),
+        ("date_inscription", "TEXT"),
+    ],
+    "enseignements": [("groupe", "TEXT")],
+    "modules": [("semestre", "TEXT")],
+}
+
+
+def _migration_tables(conn):
+    """Tables de base ; complète aussi les bases créées avant le versionnage du schéma."""
     cur = conn.cursor()
 
     # ETUDIANTS
@@ -70,6 +342,14 @@ def ensure_tables_and_seed():
         );
     """)
 
+    # Dernier numéro de matricule attribué par préfixe (ETU + 2 lettres nom + 2 lettres prénom)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS matricule_compteurs (
+            prefixe TEXT PRIMARY KEY,
+            dernier INTEGER NOT NULL
+        );
+    """)
+
     # FILIÈRES
     cur.execute("""
         CREATE TABLE IF NOT EXISTS filieres (
@@ -276,152 +556,561 @@ def ensure_tables_and_seed():
         );
     """)
 
+    # Colonnes ajoutées après coup : absentes des bases créées par les anciennes versions
+    for table, columns in LEGACY_COLUMNS.items():
+        cur.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cur.fetchall()}
+        for col, definition in columns:
+            if col not in existing:
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN {col} {definition}")
+                print(f"Colonne {col} ajoutée à la table {table}")
+
+
+def _migration_index(conn):
+    created = ensure_indexes(conn)
+    if created:
+        print(f"✓ Index créés : {', '.join(created)}")
+
+
+def _migration_donnees_initiales(conn):
+    """Paramètres par défaut, compte admin et groupes par défaut."""
+    cur = conn.cursor()
+
+    # Paramètres par défaut (n'écrase jamais une valeur existante)
+    parametres_defaults = [
+        ("db_profil", DEFAULT_DB_PROFILE, "Profil SQLite : performance | partage | standard", "texte"),
+        ("db_checkpoint", DEFAULT_DB_CHECKPOINT, "Checkpoint WAL à la fermeture : PASSIVE | FULL | TRUNCATE | AUCUN", "texte"),
+        ("recherche_delai_ms", str(DEFAULT_SEARCH_DELAY_MS), "Délai avant la recherche d'étudiants (ms)", "entier"),
+    ]
+    cur.executemany("""
+        INSERT OR IGNORE INTO parametres (cle, valeur, description, type_donnee)
+        VALUES (?, ?, ?, ?)
+    """, parametres_defaults)
+
     # SEED ADMIN IF NONE
-    try:
-        cur.execute("SELECT COUNT(*) FROM users;")
-        user_count = cur.fetchone()[0]
-    except Exception as e:
-        print(f"Erreur vérification users: {e}")
-        user_count = 0
-    
-    if user_count == 0:
-        try:
-            cur.execute("""
-                INSERT INTO users (username, password_hash, role, nom, prenom, date_creation, actif)
-                VALUES (?, ?, ?, ?, ?, ?, 1);
-            """, ("admin", hash_password("admin123"), "ADMIN", "Admin", "Système", now_iso()))
-            print("✓ Utilisateur admin créé avec succès")
-        except Exception as e:
-            print(f"Erreur création admin: {e}")
+    cur.execute("SELECT COUNT(*) FROM users;")
+    if cur.fetchone()[0] == 0:
+        cur.execute("""
+            INSERT INTO users (username, password_hash, role, nom, prenom, date_creation, actif)
+            VALUES (?, ?, ?, ?, ?, ?, 1);
+        """, ("admin", hash_password("admin123"), "ADMIN", "Admin", "Système", now_iso()))
+        print("✓ Utilisateur admin créé avec succès")
+
+    # Groupes par défaut s'il n'y en a pas
+    cur.execute("SELECT COUNT(*) FROM groupes")
+    if cur.fetchone()[0] == 0:
+        cur.executemany("INSERT OR IGNORE INTO groupes (code, nom) VALUES (?, ?)", [
+            ("GR-A1", "Groupe A1"),
+            ("GR-A2", "Groupe A2"),
+            ("GR-B1", "Groupe B1"),
+            ("GR-B2", "Groupe B2"),
+            ("GR-C1", "Groupe C1"),
+            ("GR-C2", "Groupe C2"),
+        ])
+        print("Groupes par défaut créés avec succès")
+
+
+# Migrations du schéma : (version, description, fonction(conn)), versions croissantes.
+# Ne jamais modifier une migration publiée : ajouter une nouvelle version à la fin.
+# La version 1 est idempotente pour reprendre les bases antérieures au versionnage (user_version = 0).
+SCHEMA_MIGRATIONS = [
+    (1, "tables", _migration_tables),
+    (2, "index", _migration_index),
+    (3, "recherche plein texte", lambda conn: ensure_fts(conn)),
+    (4, "journal des modifications", lambda conn: ensure_change_journal(conn)),
+    (5, "moyennes matérialisées", lambda conn: ensure_student_averages(conn)),
+    (6, "données initiales", _migration_donnees_initiales),
+    (7, "paramètres du serveur API", lambda conn: conn.executemany("""
+        INSERT OR IGNORE INTO parametres (cle, valeur, description, type_donnee)
+        VALUES (?, '', ?, 'texte')
+    """, [
+        ("serveur_api", "URL du serveur API (ex. http://127.0.0.1:8765) ; vide : accès direct à la base"),
+        ("serveur_api_jeton", "Jeton partagé du serveur API (créé au premier lancement de serve)"),
+    ])),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+
+def schema_version(conn) -> int:
+    """Version du schéma enregistrée dans le fichier (PRAGMA user_version)."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
 
+
+def apply_migrations(conn) -> list:
+    """Applique les migrations en attente dans une seule transaction.
+
+    Retourne les versions appliquées ; liste vide (et aucune DDL) si le schéma est à jour.
+    En cas d'erreur, tout est annulé et la base reste dans sa version précédente.
+    """
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return []
+    conn.execute("BEGIN IMMEDIATE")
     try:
+        # Relue sous verrou : une autre instance a pu migrer entre-temps
+        current = schema_version(conn)
+        applied = []
+        for version, description, migration in SCHEMA_MIGRATIONS:
+            if version > current:
+                migration(conn)
+                applied.append((version, description))
+        if applied:
+            conn.execute(f"PRAGMA user_version = {applied[-1][0]}")
         conn.commit()
-        print("✓ Base de données initialisée avec succès")
-    except Exception as e:
-        print(f"Erreur commit: {e}")
-    finally:
-        conn.close()
-    
-    # Appliquer les migrations
-    migrate_database()
-    
-    # Seed les groupes par défaut
-    seed_groupes_defaults()
+    except Exception:
+        conn.rollback()
+        raise
+    return [version for version, _ in applied]
 
 
-def migrate_database():
-    """Ajoute les colonnes manquantes à la table etudiants si nécessaire"""
+def ensure_tables_and_seed():
+    """Met la base au niveau de SCHEMA_VERSION (une connexion, une transaction)."""
+    global FTS_ENABLED
     conn = db_connect()
-    cur = conn.cursor()
-    
     try:
-        # Vérifier les colonnes existantes
-        cur.execute("PRAGMA table_info(etudiants)")
-        existing_columns = {row[1] for row in cur.fetchall()}
-        
-        # Colonnes requises
-        required_columns = {
-            'date_naissance', 'lieu_naissance', 'sexe', 
-            'telephone', 'adresse', 'photo_path', 'date_inscription'
-        }
-        
-        # Ajouter les colonnes manquantes
-        for col in required_columns:
-            if col not in existing_columns:
-                try:
-                    if col == 'date_inscription':
-                        cur.execute(f"ALTER TABLE etudiants ADD COLUMN {col} TEXT")
-                    elif col == 'telephone':
-                        cur.execute(f"ALTER TABLE etudiants ADD COLUMN {col} TEXT")
-                    elif col == 'adresse':
-                        cur.execute(f"ALTER TABLE etudiants ADD COLUMN {col} TEXT")
-                    elif col == 'photo_path':
-                        cur.execute(f"ALTER TABLE etudiants ADD COLUMN {col} TEXT")
-                    elif col == 'sexe':
-                        cur.execute(f"ALTER TABLE etudiants ADD COLUMN {col} TEXT DEFAULT 'M'")
-                    else:
-                        cur.execute(f"ALTER TABLE etudiants ADD COLUMN {col} TEXT")
-                    print(f"Colonne {col} ajoutée à la table etudiants")
-                except Exception as e:
-                    print(f"Colonne {col} existe déjà ou erreur: {e}")
-        
-        conn.commit()
-        print("Migration base de données complétée")
-    except Exception as e:
+        current = schema_version(conn)
+        if current > SCHEMA_VERSION:
+            print(f"Base en version {current}, plus récente que l'application (version {SCHEMA_VERSION})")
+        applied = apply_migrations(conn)
+        if applied:
+            print(f"✓ Base de données migrée de la version {current} à la version {applied[-1]}")
+        row = conn.execute("SELECT 1 FROM sqlite_master WHERE name='etudiants_fts'").fetchone()
+        FTS_ENABLED = row is not None
+    except sqlite3.Error as e:
         print(f"Erreur migration: {e}")
+        raise
     finally:
         conn.close()
 
-    # Vérifier la table des enseignements pour ajouter la colonne 'groupe' si nécessaire
-    conn = db_connect()
+
+# INDEX SECONDAIRES
+
+# Catalogue des index gérés par l'application : (nom, table, colonnes).
+# Couvre chaque clé étrangère et chaque colonne filtrée par les requêtes fréquentes.
+INDEXES = [
+    ("idx_notes_etudiant_annee", "notes", ("etudiant_id", "annee_academique")),
+    ("idx_notes_module", "notes", ("module_id",)),
+    ("idx_notes_audit_note", "notes_audit", ("note_id",)),
+    ("idx_absences_etudiant_date", "absences", ("etudiant_id", "date_absence")),
+    ("idx_absences_date", "absences", ("date_absence",)),
+    ("idx_absences_module", "absences", ("module_id",)),
+    ("idx_inscriptions_etudiant", "inscriptions", ("etudiant_id",)),
+    ("idx_inscriptions_filiere_niveau", "inscriptions", ("filiere_id", "niveau_id", "groupe_id")),
+    ("idx_inscriptions_niveau", "inscriptions", ("niveau_id",)),
+    ("idx_inscriptions_groupe", "inscriptions", ("groupe_id",)),
+    ("idx_inscriptions_annee", "inscriptions", ("annee_academique",)),
+    ("idx_modules_filiere", "modules", ("filiere_id",)),
+    ("idx_modules_niveau", "modules", ("niveau_id",)),
+    ("idx_enseignements_module", "enseignements", ("module_id",)),
+    ("idx_periodes_semestre", "periodes", ("semestre_id",)),
+    ("idx_specialites_filiere", "specialites", ("filiere_id",)),
+    ("idx_groupes_filiere", "groupes", ("filiere_id",)),
+    ("idx_groupes_niveau", "groupes", ("niveau_id",)),
+    ("idx_logs_date", "logs", ("date_action",)),
+    ("idx_logs_user", "logs", ("user_id",)),
+]
+
+
+def ensure_indexes(conn) -> list:
+    """Crée les index manquants du catalogue et recrée ceux dont la définition a changé.
+
+    Retourne la liste des index créés.
+    """
+    cur = conn.cursor()
+    created = []
+    for name, table, columns in INDEXES:
+        cur.execute(f"PRAGMA index_info({name})")
+        existing = tuple(row[2] for row in cur.fetchall())
+        if existing == columns:
+            continue
+        if existing:
+            cur.execute(f"DROP INDEX {name}")
+        cur.execute(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+        created.append(name)
+    return created
+
+
+# Requêtes fréquentes partagées entre l'application et la vérification des plans
+SQL_STUDENT_AVERAGE = """
+    SELECT moyenne, mention, count FROM student_averages
+    WHERE etudiant_id=? AND annee_academique=?
+"""
+
+SQL_FICHE_INSCRIPTIONS = """
+    SELECT i.annee_academique,
+           f.code || ' - ' || f.nom,
+           n.code || ' - ' || n.nom,
+           COALESCE(i.statut,'')
+    FROM inscriptions i
+    JOIN filieres f ON f.id=i.filiere_id
+    JOIN niveaux n ON n.id=i.niveau_id
+    WHERE i.etudiant_id=?
+    ORDER BY i.id DESC
+"""
+
+SQL_FICHE_NOTES = """
+    SELECT COALESCE(no.annee_academique,''),
+           m.code || ' - ' || m.nom,
+           no.note,
+           m.coefficient,
+           COALESCE(no.type_evaluation,'')
+    FROM notes no
+    JOIN modules m ON m.id=no.module_id
+    WHERE no.etudiant_id=?
+    ORDER BY no.id DESC
+"""
+
+SQL_FICHE_ABSENCES = """
+    SELECT a.date_absence,
+           m.code || ' - ' || m.nom,
+           CASE a.justifiee WHEN 1 THEN 'Oui' ELSE 'Non' END,
+           COALESCE(a.motif,'')
+    FROM absences a
+    JOIN modules m ON m.id=a.module_id
+    WHERE a.etudiant_id=?
+    ORDER BY a.date_absence DESC
+"""
+
+SQL_AUDIT_NOTE = """
+    SELECT id, action, COALESCE(old_value,''), COALESCE(new_value,''), COALESCE(changed_at,''), COALESCE(changed_by,'')
+    FROM notes_audit
+    WHERE note_id=?
+    ORDER BY id DESC
+"""
+
+SQL_GROUPES_FILIERE_NIVEAU = """
+    SELECT DISTINCT groupe_id FROM inscriptions
+    WHERE filiere_id=? AND niveau_id=? AND groupe_id IS NOT NULL
+    ORDER BY groupe_id
+"""
+
+SQL_TRANSCRIPT_NOTES = """
+    SELECT m.code, m.nom, m.coefficient, no.note, COALESCE(no.annee_academique,''), COALESCE(no.type_evaluation,'')
+    FROM notes no
+    JOIN modules m ON m.id = no.module_id
+    WHERE no.etudiant_id=?
+    ORDER BY COALESCE(no.annee_academique,''), m.code
+"""
+
+SQL_ATTESTATION_INSCRIPTION = """
+    SELECT f.code, f.nom, n.code, n.nom, COALESCE(i.statut,'')
+    FROM inscriptions i
+    JOIN filieres f ON f.id=i.filiere_id
+    JOIN niveaux n ON n.id=i.niveau_id
+    WHERE i.etudiant_id=? AND i.annee_academique=?
+    ORDER BY i.id DESC
+    LIMIT 1
+"""
+
+# Matricules d'un préfixe (allocate_matricules)
+SQL_MATRICULES_PREFIXE = """
+    SELECT matricule FROM etudiants
+    WHERE matricule >= ? AND matricule < ?
+"""
+
+# Lignes des listes principales (aussi relues une par une pour patcher une vue)
+SQL_ETUDIANT_ROW = """
+    SELECT e.id, e.matricule, e.nom, e.prenom, COALESCE(e.email,''), COALESCE(e.telephone,''), COALESCE(e.statut,'')
+    FROM etudiants e
+    WHERE e.id=?
+"""
+
+SQL_NOTES_ROWS = """
+    SELECT no.id,
+           e.matricule || ' - ' || e.nom || ' ' || e.prenom AS etu,
+           m.code || ' - ' || m.nom AS mod,
+           no.note,
+           m.coefficient,
+           COALESCE(no.annee_academique,''),
+           COALESCE(no.type_evaluation,'')
+    FROM notes no
+    JOIN etudiants e ON e.id = no.etudiant_id
+    JOIN modules m   ON m.id = no.module_id
+"""
+
+# (libellé, requête, paramètres d'exemple) : aucune ne doit parcourir une table entière
+HOT_QUERIES = [
+    ("get_student_average", SQL_STUDENT_AVERAGE, (1, "*")),
+    ("open_fiche_etudiant / inscriptions", SQL_FICHE_INSCRIPTIONS, (1,)),
+    ("open_fiche_etudiant / notes", SQL_FICHE_NOTES, (1,)),
+    ("open_fiche_etudiant / absences", SQL_FICHE_ABSENCES, (1,)),
+    ("refresh_audit_for_selected_note", SQL_AUDIT_NOTE, (1,)),
+    ("on_aff_niveau_selected", SQL_GROUPES_FILIERE_NIVEAU, (1, 1)),
+    ("generate_transcript_pdf", SQL_TRANSCRIPT_NOTES, (1,)),
+    ("generate_attestation_pdf", SQL_ATTESTATION_INSCRIPTION, (1, "2025")),
+    ("patch note", SQL_NOTES_ROWS + " WHERE no.id=?", (1,)),
+    ("patch étudiant", SQL_ETUDIANT_ROW, (1,)),
+    ("allocate_matricules", SQL_MATRICULES_PREFIXE, ("ETUDUAL", "ETUDUAL:")),
+    ("refresh_specialites_list", "SELECT id, nom, COALESCE(description,'') FROM specialites WHERE filiere_id=? ORDER BY nom", (1,)),
+]
+
+
+def find_full_scans(conn, queries=None) -> list:
+    """Passe chaque requête dans EXPLAIN QUERY PLAN.
+
+    Retourne [(libellé, détail du plan)] pour chaque parcours complet de table
+    (y compris via un index couvrant) : liste vide = toutes les requêtes utilisent un index.
+    Une table virtuelle interrogée par son index (ex. MATCH FTS5 : « INDEX 32:M4 ») n'est
+    pas un parcours complet ; « INDEX 0: » (aucune contrainte) en est un.
+    """
+    offenders = []
+    for label, sql, params in (queries if queries is not None else HOT_QUERIES):
+        for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall():
+            detail = row[-1]
+            if not detail.startswith("SCAN ") or "CONSTANT ROW" in detail:
+                continue
+            if "VIRTUAL TABLE INDEX" in detail and not detail.rstrip().endswith(":"):
+                continue
+            offenders.append((label, detail))
+    return offenders
+
+
+# RECHERCHE PLEIN TEXTE
+
+# Index FTS5 des étudiants, tenu à jour par triggers. unicode61 + remove_diacritics :
+# « elodie » trouve « Élodie » ; chaque mot saisi est cherché comme préfixe d'un mot indexé.
+FTS_ENABLED = False
+
+FTS_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS etudiants_fts USING fts5(
+        matricule, nom, prenom, email,
+        content='etudiants', content_rowid='id',
+        tokenize="unicode61 remove_diacritics 2", prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS etudiants_fts_ai AFTER INSERT ON etudiants BEGIN
+        INSERT INTO etudiants_fts(rowid, matricule, nom, prenom, email)
+        VALUES (new.id, new.matricule, new.nom, new.prenom, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS etudiants_fts_ad AFTER DELETE ON etudiants BEGIN
+        INSERT INTO etudiants_fts(etudiants_fts, rowid, matricule, nom, prenom, email)
+        VALUES ('delete', old.id, old.matricule, old.nom, old.prenom, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS etudiants_fts_au AFTER UPDATE OF matricule, nom, prenom, email ON etudiants BEGIN
+        INSERT INTO etudiants_fts(etudiants_fts, rowid, matricule, nom, prenom, email)
+        VALUES ('delete', old.id, old.matricule, old.nom, old.prenom, old.email);
+        INSERT INTO etudiants_fts(rowid, matricule, nom, prenom, email)
+        VALUES (new.id, new.matricule, new.nom, new.prenom, new.email);
+    END
+    """,
+]
+
+
+def ensure_fts(conn) -> bool:
+    """Crée l'index plein texte et ses triggers ; l'alimente à la création.
+
+    Retourne False si SQLite est compilé sans FTS5 (la recherche reste en LIKE).
+    """
+    global FTS_ENABLED
     cur = conn.cursor()
+    cur.execute("SELECT 1 FROM sqlite_master WHERE name='etudiants_fts'")
+    existed = cur.fetchone() is not None
     try:
-        cur.execute("PRAGMA table_info(enseignements)")
-        existing = {row[1] for row in cur.fetchall()}
-        if 'groupe' not in existing:
-            try:
-                cur.execute("ALTER TABLE enseignements ADD COLUMN groupe TEXT")
-                conn.commit()
-                print("Colonne 'groupe' ajoutée à la table enseignements")
-            except Exception as e:
-                print(f"Impossible d'ajouter la colonne 'groupe' : {e}")
-    except Exception:
-        pass
-    finally:
-        conn.close()
+        for sql in FTS_SCHEMA:
+            cur.execute(sql)
+    except sqlite3.OperationalError as e:
+        print(f"FTS5 indisponible, recherche par LIKE : {e}")
+        FTS_ENABLED = False
+        return False
+    if not existed:
+        cur.execute("INSERT INTO etudiants_fts(etudiants_fts) VALUES ('rebuild')")
+        print("✓ Index plein texte des étudiants créé")
+    FTS_ENABLED = True
+    return True
+
+
+def search_terms(text: str) -> list:
+    """Mots d'une saisie, normalisés comme le tokenizer (minuscules, sans accents)."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return re.findall(r"[^\W_]+", text)
 
-    # Vérifier la table modules pour ajouter la colonne 'semestre' si nécessaire
+
+def fts_match_expression(text: str):
+    """Expression MATCH : tous les mots saisis, chacun en préfixe ('"dup"* "ala"*')."""
+    terms = search_terms(text)
+    return " ".join(f'"{t}"*' for t in terms) if terms else None
+
+
+def fetch_rows(sql, params=()):
     conn = db_connect()
     cur = conn.cursor()
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+
+# MATRICULES
+
+def matricule_prefix(nom: str, prenom: str) -> str:
+    return f"ETU{nom[:2].upper()}{prenom[:2].upper()}"
+
+
+def format_matricule(prefix: str, numero: int) -> str:
+    # Le premier étudiant d'un préfixe n'a pas de suffixe : ETUDUAL, ETUDUAL2, ETUDUAL3...
+    return prefix if numero == 1 else f"{prefix}{numero}"
+
+
+def _last_matricule_number(cur, prefix: str) -> int:
+    """Plus grand numéro déjà utilisé pour ce préfixe (parcours de l'index UNIQUE sur matricule)."""
+    # Les suffixes sont des chiffres, tous inférieurs à ':' en ordre binaire
+    cur.execute(SQL_MATRICULES_PREFIXE, (prefix, prefix + ":"))
+    last = 0
+    for (matricule,) in cur.fetchall():
+        suffix = matricule[len(prefix):]
+        if not suffix:
+            last = max(last, 1)
+        elif suffix.isdigit():
+            last = max(last, int(suffix))
+    return last
+
+
+def allocate_matricules(conn, prefix: str, count: int = 1) -> list:
+    """Réserve `count` matricules consécutifs pour `prefix`.
+
+    Le compteur est mis à jour dans la transaction de l'appelant, qui doit insérer
+    les étudiants puis valider : en cas d'annulation, les numéros sont rendus.
+    La transaction est ouverte en IMMEDIATE pour que deux postes ne lisent jamais
+    le même compteur.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    cur = conn.cursor()
+    cur.execute("SELECT dernier FROM matricule_compteurs WHERE prefixe=?", (prefix,))
+    row = cur.fetchone()
+    if row is None:
+        # Premier passage pour ce préfixe : on repart des matricules existants
+        last = _last_matricule_number(cur, prefix)
+        cur.execute("INSERT INTO matricule_compteurs (prefixe, dernier) VALUES (?, ?)", (prefix, last + count))
+    else:
+        last = row[0]
+        cur.execute("UPDATE matricule_compteurs SET dernier=? WHERE prefixe=?", (last + count, prefix))
+    return [format_matricule(prefix, n) for n in range(last + 1, last + count + 1)]
+
+
+# IMPORT ÉTUDIANTS (CSV)
+
+IMPORT_CHUNK_SIZE = 1000
+
+SQL_INSERT_ETUDIANT_IMPORT = "INSERT INTO etudiants (matricule, nom, prenom, email, statut) VALUES (?, ?, ?, ?, ?)"
+
+
+def _csv_etudiant(row):
+    nom = (row.get("nom") or row.get("Nom") or "").strip()
+    prenom = (row.get("prenom") or row.get("Prenom") or row.get("Prénom") or "").strip()
+    email = (row.get("email") or row.get("Email") or "").strip()
+    return nom, prenom, email or None
+
+
+def _insert_import_chunk(conn, chunk, rejects):
+    """Insère un lot (ligne, nom, prénom, email) ; retourne le nombre de lignes insérées."""
+    # Matricules réservés en bloc, un appel par préfixe
+    by_prefix = {}
+    for item in chunk:
+        by_prefix.setdefault(matricule_prefix(item[1], item[2]), []).append(item)
+    rows = []
+    for prefix, items in by_prefix.items():
+        for item, matricule in zip(items, allocate_matricules(conn, prefix, len(items))):
+            rows.append((item[0], (matricule, item[1], item[2], item[3], "actif")))
+
+    conn.execute("SAVEPOINT import_lot")
     try:
-        cur.execute("PRAGMA table_info(modules)")
-        existing = {row[1] for row in cur.fetchall()}
-        if 'semestre' not in existing:
-            try:
-                cur.execute("ALTER TABLE modules ADD COLUMN semestre TEXT")
-                conn.commit()
-                print("Colonne 'semestre' ajoutée à la table modules")
-            except Exception as e:
-                print(f"Impossible d'ajouter la colonne 'semestre' : {e}")
-    except Exception:
-        pass
-    finally:
-        conn.close()
+        conn.executemany(SQL_INSERT_ETUDIANT_IMPORT, [values for _, values in rows])
+        conn.execute("RELEASE import_lot")
+        return len(rows)
+    except sqlite3.IntegrityError:
+        conn.execute("ROLLBACK TO import_lot")
+        conn.execute("RELEASE import_lot")
+
+    # Conflit imprévu dans le lot : ligne par ligne pour isoler les rejets
+    inserted = 0
+    for line, values in rows:
+        conn.execute("SAVEPOINT import_ligne")
+        try:
+            conn.execute(SQL_INSERT_ETUDIANT_IMPORT, values)
+            inserted += 1
+        except sqlite3.IntegrityError as e:
+            conn.execute("ROLLBACK TO import_ligne")
+            rejects.append((line, f"Conflit en base : {e}"))
+        conn.execute("RELEASE import_ligne")
+    return inserted
+
 
+def import_etudiants_csv_file(filepath: str, chunk_size: int = IMPORT_CHUNK_SIZE, progress=None) -> dict:
+    """Importe un CSV d'étudiants (colonnes nom, prenom, email) en une seule transaction.
 
-def seed_groupes_defaults():
-    """Insérer les groupes par défaut s'il n'y en a pas"""
+    Le fichier est lu par lots de `chunk_size` enregistrements ; chaque lot est inséré par
+    executemany dans un SAVEPOINT. Retourne {"inserted": n, "rejects": [(ligne, motif)]}
+    où ligne est la dernière ligne du fichier occupée par l'enregistrement (l'en-tête est
+    la ligne 1 ; un champ entre guillemets peut s'étendre sur plusieurs lignes).
+    progress(octets lus, taille du fichier) est appelé après chaque lot.
+    """
+    total = os.path.getsize(filepath)
+
+    rejects = []
+    inserted = 0
+    seen_emails = set()
     conn = db_connect()
-    cur = conn.cursor()
-    
     try:
-        # Vérifier si des groupes existent déjà
-        cur.execute("SELECT COUNT(*) FROM groupes")
-        count = cur.fetchone()[0]
-        
-        if count == 0:
-            # Insérer des groupes par défaut
-            groupes_defaults = [
-                ("GR-A1", "Groupe A1"),
-                ("GR-A2", "Groupe A2"),
-                ("GR-B1", "Groupe B1"),
-                ("GR-B2", "Groupe B2"),
-                ("GR-C1", "Groupe C1"),
-                ("GR-C2", "Groupe C2"),
-            ]
-            for code, nom in groupes_defaults:
-                try:
-                    cur.execute("INSERT INTO groupes (code, nom) VALUES (?, ?)", (code, nom))
-                except sqlite3.IntegrityError:
-                    pass  # Déjà existe
-            
-            conn.commit()
-            print("Groupes par défaut créés avec succès")
-    except Exception as e:
-        print(f"Erreur création groupes par défaut: {e}")
+        conn.execute("BEGIN IMMEDIATE")
+        with open(filepath, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.DictReader(f)
+            lines = ((reader.line_num, row) for row in reader)
+            while True:
+                batch = list(itertools.islice(lines, chunk_size))
+                if not batch:
+                    break
+
+                candidates = []
+                for line, row in batch:
+                    nom, prenom, email = _csv_etudiant(row)
+                    if not nom or not prenom:
+                        rejects.append((line, "Nom ou prénom manquant"))
+                    elif email and email in seen_emails:
+                        rejects.append((line, f"Email en double dans le fichier : {email}"))
+                    else:
+                        if email:
+                            seen_emails.add(email)
+                        candidates.append((line, nom, prenom, email))
+
+                # Emails déjà en base : une requête par lot
+                emails = [c[3] for c in candidates if c[3]]
+                existing = set()
+                if emails:
+                    marks = ", ".join("?" for _ in emails)
+                    existing = {r[0] for r in conn.execute(f"SELECT email FROM etudiants WHERE email IN ({marks})", emails)}
+                chunk = []
+                for c in candidates:
+                    if c[3] in existing:
+                        rejects.append((c[0], f"Email déjà utilisé : {c[3]}"))
+                    else:
+                        chunk.append(c)
+
+                if chunk:
+                    inserted += _insert_import_chunk(conn, chunk, rejects)
+                if progress:
+                    # Position dans le tampon binaire : tell() du flux texte est bloqué pendant l'itération
+                    progress(f.buffer.tell(), total)
+        conn.commit()
     finally:
         conn.close()
 
+    rejects.sort()
+    return {"inserted": inserted, "rejects": rejects}
+
+
+def write_import_rejects(rejects, filepath: str):
+    with open(filepath, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["ligne", "motif"])
+        w.writerows(rejects)
+
 
 def log_action(conn, user_id: int, action: str, table_affectee: str, enregistrement_id: int = None, details: str = None):
     """Enregistre une action dans la table logs pour l'audit"""
@@ -433,6 +1122,16 @@ def log_action(conn, user_id: int, action: str, table_affectee: str, enregistrem
     conn.commit()
 
 
+# Seuils des mentions, du plus haut au plus bas ; en dessous du dernier : « Insuffisant »
+MENTIONS = [
+    (18, "Excellente"),
+    (16, "Très bien"),
+    (14, "Bien"),
+    (12, "Assez bien"),
+    (10, "Passable"),
+]
+
+
 def calculate_academic_honors(average: float) -> str:
     """Calcule la mention académique en fonction de la moyenne
     
@@ -444,52 +1143,150 @@ def calculate_academic_honors(average: float) -> str:
     - Passable: >= 10/20
     - Insuffisant: < 10/20
     """
-    if average >= 18:
-        return "Excellente"
-    elif average >= 16:
-        return "Très bien"
-    elif average >= 14:
-        return "Bien"
-    elif average >= 12:
-        return "Assez bien"
-    elif average >= 10:
-        return "Passable"
-    else:
-        return "Insuffisant"
+    for seuil, mention in MENTIONS:
+        if average >= seuil:
+            return mention
+    return "Insuffisant"
+
+
+# MOYENNES MATÉRIALISÉES
+
+# Une ligne par (étudiant, année) et une ligne toutes années confondues (année AVERAGE_ALL_YEARS).
+# Notes sans année : année ''. Moyenne pondérée par modules.coefficient.
+AVERAGE_ALL_YEARS = "*"
+
+
+def _mention_sql(expr: str) -> str:
+    """Expression SQL équivalente à calculate_academic_honors(expr)."""
+    cases = " ".join(f"WHEN {expr} >= {seuil} THEN '{mention}'" for seuil, mention in MENTIONS)
+    return f"CASE WHEN {expr} IS NULL THEN NULL {cases} ELSE 'Insuffisant' END"
+
+
+def _averages_refresh_sql(condition: str) -> list:
+    """Recalcule les lignes de student_averages des étudiants dont les notes vérifient `condition`
+    (sur l'alias `no`) : suppression puis réinsertion depuis notes ⨝ modules."""
+    aggregate = """
+        SELECT no.etudiant_id AS etudiant_id, {annee} AS annee_academique,
+               SUM(no.note * m.coefficient) AS sum_points, SUM(m.coefficient) AS sum_coef, COUNT(*) AS count
+        FROM notes no
+        JOIN modules m ON m.id = no.module_id
+        WHERE {condition}
+        GROUP BY {group}
+    """
+    by_year = aggregate.format(annee="COALESCE(no.annee_academique,'')", condition=condition,
+                               group="no.etudiant_id, COALESCE(no.annee_academique,'')")
+    all_years = aggregate.format(annee=f"'{AVERAGE_ALL_YEARS}'", condition=condition, group="no.etudiant_id")
+    moyenne = "sum_points / NULLIF(sum_coef, 0)"
+    return [
+        f"DELETE FROM student_averages WHERE etudiant_id IN (SELECT no.etudiant_id FROM notes no WHERE {condition})",
+        f"""
+        INSERT INTO student_averages (etudiant_id, annee_academique, sum_points, sum_coef, count, moyenne, mention)
+        SELECT etudiant_id, annee_academique, sum_points, sum_coef, count, {moyenne}, {_mention_sql(moyenne)}
+        FROM ({by_year} UNION ALL {all_years})
+        """,
+    ]
+
+
+def _averages_trigger_sql(name: str, event: str, students: list) -> str:
+    """Trigger recalculant les moyennes des étudiants `students` (ex. ['new.etudiant_id'])."""
+    statements = []
+    for student in students:
+        statements.append(f"DELETE FROM student_averages WHERE etudiant_id = {student}")
+        statements.extend(_averages_refresh_sql(f"no.etudiant_id = {student}")[1:])
+    body = ";\n".join(statements)
+    return f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN\n{body};\nEND"
+
+
+STUDENT_AVERAGES_TRIGGERS = [
+    _averages_trigger_sql("student_averages_notes_ai", "AFTER INSERT ON notes", ["new.etudiant_id"]),
+    _averages_trigger_sql("student_averages_notes_ad", "AFTER DELETE ON notes", ["old.etudiant_id"]),
+    _averages_trigger_sql(
+        "student_averages_notes_au",
+        "AFTER UPDATE OF etudiant_id, module_id, note, annee_academique ON notes",
+        ["old.etudiant_id", "new.etudiant_id"],
+    ),
+    """
+    CREATE TRIGGER IF NOT EXISTS student_averages_modules_au
+    AFTER UPDATE OF coefficient ON modules WHEN new.coefficient IS NOT old.coefficient BEGIN
+    """ + ";\n".join(_averages_refresh_sql(
+        "no.etudiant_id IN (SELECT etudiant_id FROM notes WHERE module_id = new.id)")) + """;
+    END
+    """,
+]
+
+
+def ensure_student_averages(conn) -> bool:
+    """Crée student_averages et ses triggers ; la remplit à la création.
+
+    Retourne True si la table vient d'être créée.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM sqlite_master WHERE name='student_averages'")
+    existed = cur.fetchone() is not None
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS student_averages (
+            etudiant_id INTEGER NOT NULL,
+            annee_academique TEXT NOT NULL,
+            sum_points REAL NOT NULL,
+            sum_coef REAL NOT NULL,
+            count INTEGER NOT NULL,
+            moyenne REAL,
+            mention TEXT,
+            PRIMARY KEY (etudiant_id, annee_academique),
+            FOREIGN KEY(etudiant_id) REFERENCES etudiants(id) ON DELETE CASCADE
+        ) WITHOUT ROWID;
+    """)
+    for sql in STUDENT_AVERAGES_TRIGGERS:
+        cur.execute(sql)
+    if not existed:
+        rebuild_student_averages(conn)
+        print("✓ Moyennes des étudiants calculées")
+    return not existed
+
+
+def rebuild_student_averages(conn):
+    """Recalcule entièrement student_averages (création, maintenance)."""
+    cur = conn.cursor()
+    cur.execute("DELETE FROM student_averages")
+    for sql in _averages_refresh_sql("1=1")[1:]:
+        cur.execute(sql)
+
+
+def mention_thresholds() -> list:
+    return [seuil for seuil, _ in MENTIONS]
+
+
+def mention_labels() -> list:
+    """Libellés des mentions avec leur seuil, dans l'ordre de statistiques.mention_index."""
+    labels = [f"{mention} (≥{seuil})" for seuil, mention in MENTIONS]
+    return labels + [f"Insuffisant (<{MENTIONS[-1][0]})"]
+
+
+def load_cohort(annee_academique: str = None) -> "Cohort":
+    """Charge les notes de la cohorte (toutes années ou une année) pour les statistiques de jury."""
+    from statistiques import Cohort
+
+    conn = db_connect()
+    try:
+        return Cohort.from_db(conn, annee_academique, mentions=mention_thresholds())
+    finally:
+        conn.close()
 
 
 def get_student_average(etudiant_id: int, annee_academique: str = None) -> tuple:
-    """Récupère la moyenne générale d'un étudiant
+    """Récupère la moyenne générale (pondérée par les coefficients) d'un étudiant
     
     Retourne: (moyenne, mention, nombre_notes)
     """
     conn = db_connect()
     cur = conn.cursor()
-    
-    if annee_academique:
-        cur.execute("""
-            SELECT AVG(note) FROM notes 
-            WHERE etudiant_id=? AND annee_academique=?
-        """, (etudiant_id, annee_academique))
-    else:
-        cur.execute("SELECT AVG(note) FROM notes WHERE etudiant_id=?", (etudiant_id,))
-    
-    avg_result = cur.fetchone()[0]
-    moyenne = float(avg_result) if avg_result else 0.0
-    
-    # Compter le nombre de notes
-    if annee_academique:
-        cur.execute("""
-            SELECT COUNT(*) FROM notes 
-            WHERE etudiant_id=? AND annee_academique=?
-        """, (etudiant_id, annee_academique))
-    else:
-        cur.execute("SELECT COUNT(*) FROM notes WHERE etudiant_id=?", (etudiant_id,))
-    
-    count = cur.fetchone()[0]
+    cur.execute(SQL_STUDENT_AVERAGE, (etudiant_id, annee_academique or AVERAGE_ALL_YEARS))
+    row = cur.fetchone()
     conn.close()
-    
-    mention = calculate_academic_honors(moyenne)
+
+    if not row or row[0] is None:
+        return (0.0, calculate_academic_honors(0.0), row[2] if row else 0)
+    moyenne, mention, count = row
     return (round(moyenne, 2), mention, count)
 
 
@@ -634,34 +1431,522 @@ def format_phone_hint() -> str:
 
 # EXPORT HELPERS
 
-def export_query_to_xlsx(headers, rows, filepath: str, sheet_name="Export"):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = sheet_name[:31]
-    ws.append(headers)
-    for r in rows:
-        ws.append(list(r))
+# Lignes par feuille Excel (en-tête compris) et lignes lues par fetchmany
+XLSX_MAX_ROWS = 1048576
+EXPORT_BATCH_SIZE = 5000
+
+
+def write_xlsx_stream(headers, batches, filepath: str, sheet_name="Export", progress=None, total=None):
+    """Écrit des lots de lignes dans un classeur en écriture seule (mémoire constante).
+
+    Une nouvelle feuille « nom (2) », « nom (3) »... est ouverte quand la limite
+    Excel de XLSX_MAX_ROWS lignes est atteinte.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = None
+    sheet_rows = 0
+    sheet_no = 0
+    done = 0
+    for batch in batches:
+        for r in batch:
+            if ws is None or sheet_rows >= XLSX_MAX_ROWS:
+                sheet_no += 1
+                title = sheet_name[:31] if sheet_no == 1 else f"{sheet_name[:25]} ({sheet_no})"
+                ws = wb.create_sheet(title)
+                ws.append(headers)
+                sheet_rows = 1
+            ws.append(list(r))
+            sheet_rows += 1
+        done += len(batch)
+        if progress:
+            progress(done, total)
+    if ws is None:
+        wb.create_sheet(sheet_name[:31]).append(headers)
     Path(filepath).parent.mkdir(parents=True, exist_ok=True)
     wb.save(filepath)
 
 
-def _pdf_header(c, title: str):
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(2 * cm, 28.5 * cm, title)
-    c.setFont("Helvetica", 10)
-    c.drawString(2 * cm, 28.0 * cm, f"Généré le {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-
+def export_query_to_xlsx(headers, rows, filepath: str, sheet_name="Export"):
+    write_xlsx_stream(headers, [rows], filepath, sheet_name)
 
-def generate_transcript_pdf(conn, etudiant_id: int, filepath: str):
-    cur = conn.cursor()
-    cur.execute("SELECT matricule, nom, prenom, COALESCE(email,'') FROM etudiants WHERE id=?", (etudiant_id,))
-    etu = cur.fetchone()
-    if not etu:
-        raise ValueError("Étudiant introuvable")
 
-    Path(filepath).parent.mkdir(parents=True, exist_ok=True)
-    c = canvas.Canvas(filepath, pagesize=A4)
-    _pdf_header(c, "Relevé de notes")
+def export_sql_to_xlsx(sql, params, headers, filepath: str, sheet_name="Export", progress=None,
+                       batch_size=EXPORT_BATCH_SIZE, count_sql=None):
+    """Exporte le résultat de `sql` lu par lots (fetchmany) sans le charger en entier.
+
+    `count_sql` : comptage bon marché de la table de base (ex. SELECT COUNT(*) FROM notes)
+    donnant le total de la progression, plutôt que de compter la jointure complète ;
+    sans lui, la progression est rapportée sans total.
+    """
+    conn = db_connect()
+    try:
+        total = None
+        if progress and count_sql:
+            total = conn.execute(count_sql).fetchone()[0]
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        batches = iter(lambda: cur.fetchmany(batch_size), [])
+        write_xlsx_stream(headers, batches, filepath, sheet_name, progress, total)
+    finally:
+        conn.close()
+
+
+def _run_with_connection(fn, *args):
+    conn = db_connect()
+    try:
+        return fn(conn, *args)
+    finally:
+        conn.close()
+
+
+def export_etudiants_to_csv(filepath: str):
+    conn = db_connect()
+    cur = conn.cursor()
+    cur.execute("SELECT id, matricule, nom, prenom, COALESCE(email,''), COALESCE(statut,'') FROM etudiants ORDER BY id")
+    rows = cur.fetchall()
+    conn.close()
+
+    with open(filepath, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["id", "matricule", "nom", "prenom", "email", "statut"])
+        w.writerows(rows)
+
+
+def export_etudiants_to_xlsx(filepath: str, progress=None):
+    export_sql_to_xlsx(
+        "SELECT id, matricule, nom, prenom, COALESCE(email,''), COALESCE(statut,'') FROM etudiants ORDER BY id", (),
+        ["id", "matricule", "nom", "prenom", "email", "statut"],
+        filepath,
+        "etudiants",
+        progress,
+        count_sql="SELECT COUNT(*) FROM etudiants"
+    )
+
+
+def export_notes_to_xlsx(filepath: str, progress=None):
+    sql = """
+        SELECT no.id,
+               e.matricule,
+               e.nom || ' ' || e.prenom AS etudiant,
+               m.code,
+               m.nom AS module,
+               no.note,
+               m.coefficient,
+               COALESCE(no.annee_academique,'') AS annee,
+               COALESCE(no.type_evaluation,'') AS type
+        FROM notes no
+        JOIN etudiants e ON e.id=no.etudiant_id
+        JOIN modules m ON m.id=no.module_id
+        ORDER BY no.id
+    """
+    export_sql_to_xlsx(
+        sql,
+        (),
+        ["id", "matricule", "etudiant", "code_module", "module", "note", "coef", "annee", "type"],
+        filepath,
+        "notes",
+        progress,
+        count_sql="SELECT COUNT(*) FROM notes"
+    )
+
+
+def export_absences_to_xlsx(filepath: str, progress=None):
+    sql = """
+        SELECT a.id,
+               e.matricule,
+               e.nom || ' ' || e.prenom AS etudiant,
+               m.code,
+               m.nom AS module,
+               a.date_absence,
+               a.justifiee,
+               COALESCE(a.motif,'')
+        FROM absences a
+        JOIN etudiants e ON e.id=a.etudiant_id
+        JOIN modules m ON m.id=a.module_id
+        ORDER BY a.id
+    """
+    export_sql_to_xlsx(
+        sql,
+        (),
+        ["id", "matricule", "etudiant", "code_module", "module", "date_absence", "justifiee", "motif"],
+        filepath,
+        "absences",
+        progress,
+        count_sql="SELECT COUNT(*) FROM absences"
+    )
+
+
+# EXPORT COLONNAIRE (PARQUET)
+
+# Colonnes exportées par table : (colonne, type). Types :
+# int64, float64, bool, date (texte YYYY-MM-DD en base), string,
+# dict (texte à faible cardinalité, encodé en dictionnaire)
+COLUMNAR_TABLES = {
+    "etudiants": [
+        ("id", "int64"), ("matricule", "string"), ("nom", "string"), ("prenom", "string"),
+        ("email", "string"), ("telephone", "string"), ("adresse", "string"), ("date_naissance", "string"),
+        ("lieu_naissance", "dict"), ("sexe", "dict"), ("photo_path", "string"), ("statut", "dict"),
+        ("date_inscription", "string"),
+    ],
+    "inscriptions": [
+        ("id", "int64"), ("etudiant_id", "int64"), ("filiere_id", "int64"), ("niveau_id", "int64"),
+        ("groupe_id", "int64"), ("annee_academique", "dict"), ("statut", "dict"), ("date_inscription", "string"),
+    ],
+    "notes": [
+        ("id", "int64"), ("etudiant_id", "int64"), ("module_id", "int64"), ("note", "float64"),
+        ("type_evaluation", "dict"), ("annee_academique", "dict"),
+    ],
+    "absences": [
+        ("id", "int64"), ("etudiant_id", "int64"), ("module_id", "int64"), ("date_absence", "date"),
+        ("justifiee", "bool"), ("motif", "string"),
+    ],
+}
+
+PARQUET_ROW_GROUP = 65536
+PARQUET_COMPRESSION = "zstd"
+
+
+def ensure_change_journal(conn):
+    """Journal (table, id) -> dernière opération, numéroté par `seq` croissant.
+
+    Une ligne par enregistrement modifié : le journal ne grossit pas plus que les tables.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS modifications (
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            operation TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            PRIMARY KEY (table_name, row_id)
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_modifications_seq ON modifications (table_name, seq)")
+    # MAX(seq) des triggers : sans cet index, chaque écriture parcourrait tout le journal
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_modifications_seq_max ON modifications (seq)")
+    for table in COLUMNAR_TABLES:
+        for suffix, event, row, op in (("ai", "INSERT", "new", "U"), ("au", "UPDATE", "new", "U"),
+                                       ("ad", "DELETE", "old", "D")):
+            cur.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS journal_{table}_{suffix} AFTER {event} ON {table} BEGIN
+                    INSERT INTO modifications (table_name, row_id, operation, seq)
+                    VALUES ('{table}', {row}.id, '{op}', (SELECT COALESCE(MAX(seq), 0) + 1 FROM modifications))
+                    ON CONFLICT (table_name, row_id) DO UPDATE SET operation=excluded.operation, seq=excluded.seq;
+                END
+            """)
+
+
+def pyarrow_available() -> bool:
+    """Importe pyarrow au premier appel ; False s'il n'est pas installé."""
+    global pa, pq
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            return False
+        pa, pq = pyarrow, pyarrow.parquet
+    return True
+
+
+def _require_pyarrow():
+    if not pyarrow_available():
+        raise RuntimeError("pyarrow n'est pas installé (pip install pyarrow) : export Parquet indisponible.")
+
+
+def _arrow_type(kind):
+    return {
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "bool": pa.bool_(),
+        "date": pa.date32(),
+        "string": pa.string(),
+        "dict": pa.dictionary(pa.int32(), pa.string()),
+    }[kind]
+
+
+def _arrow_column(values, kind):
+    if kind == "date":
+        values = [date.fromisoformat(v[:10]) if v else None for v in values]
+    elif kind == "bool":
+        values = [None if v is None else bool(v) for v in values]
+    if kind == "dict":
+        return pa.array(values, pa.string()).dictionary_encode()
+    return pa.array(values, _arrow_type(kind))
+
+
+def _sql_value(value, kind):
+    if value is None:
+        return None
+    if kind == "date":
+        return value.isoformat()
+    if kind == "bool":
+        return int(value)
+    return value
+
+
+def _write_parquet(cur, table, columns, filepath, metadata):
+    schema = pa.schema([(name, _arrow_type(kind)) for name, kind in columns], metadata=metadata)
+    count = 0
+    with pq.ParquetWriter(filepath, schema, compression=PARQUET_COMPRESSION) as writer:
+        while True:
+            rows = cur.fetchmany(PARQUET_ROW_GROUP)
+            if not rows:
+                break
+            arrays = [_arrow_column([r[i] for r in rows], kind) for i, (_, kind) in enumerate(columns)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema), row_group_size=PARQUET_ROW_GROUP)
+            count += len(rows)
+    return count
+
+
+def export_columnar(directory: str, tables=None, incremental=True, progress=None) -> list:
+    """Exporte les tables en Parquet (colonnes typées, zstd, un row group par 65 536 lignes).
+
+    En mode incrémental, seules les lignes modifiées depuis le dernier export
+    (filigrane 'parquet_filigrane_<table>' dans parametres) sont écrites, et les
+    suppressions vont dans un fichier <table>_suppressions_*.parquet.
+    Retourne [(fichier, nombre de lignes)].
+    """
+    _require_pyarrow()
+    tables = list(tables or COLUMNAR_TABLES)
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    written = []
+    conn = db_connect()
+    try:
+        # Une seule transaction de lecture : toutes les tables au même instant
+        conn.execute("BEGIN")
+        cur = conn.cursor()
+        cur.execute("SELECT COALESCE(MAX(seq), 0) FROM modifications")
+        high = cur.fetchone()[0]
+        marks = {}
+        for done, table in enumerate(tables, start=1):
+            columns = COLUMNAR_TABLES[table]
+            col_sql = ", ".join(f"t.{name}" for name, _ in columns)
+            since = int(_read_parametre(conn, f"parquet_filigrane_{table}", 0)) if incremental else 0
+            metadata = {"table": table, "operation": "upsert", "depuis": str(since), "jusqu_a": str(high)}
+            path = Path(directory) / f"{table}_{since}_{high}.parquet"
+
+            if since:
+                cur.execute(f"""
+                    SELECT {col_sql} FROM {table} t
+                    JOIN modifications m ON m.table_name=? AND m.row_id=t.id
+                    WHERE m.seq > ? AND m.seq <= ? AND m.operation='U'
+                    ORDER BY t.id
+                """, (table, since, high))
+            else:
+                cur.execute(f"SELECT {col_sql} FROM {table} t ORDER BY t.id")
+            count = _write_parquet(cur, table, columns, path, metadata)
+            if count or not since:
+                written.append((str(path), count))
+            else:
+                path.unlink()
+
+            if since:
+                cur.execute("""
+                    SELECT row_id FROM modifications
+                    WHERE table_name=? AND seq > ? AND seq <= ? AND operation='D'
+                    ORDER BY row_id
+                """, (table, since, high))
+                metadata = dict(metadata, operation="delete")
+                path = Path(directory) / f"{table}_suppressions_{since}_{high}.parquet"
+                count = _write_parquet(cur, table, [("id", "int64")], path, metadata)
+                if count:
+                    written.append((str(path), count))
+                else:
+                    path.unlink()
+
+            marks[table] = high
+            if progress:
+                progress(done, len(tables))
+        conn.commit()
+
+        with conn:
+            conn.executemany("""
+                INSERT INTO parametres (cle, valeur, description, type_donnee) VALUES (?, ?, ?, 'entier')
+                ON CONFLICT(cle) DO UPDATE SET valeur=excluded.valeur
+            """, [(f"parquet_filigrane_{t}", str(m), f"Dernier export Parquet de {t} (journal modifications)")
+                  for t, m in marks.items()])
+    finally:
+        conn.close()
+    return written
+
+
+def _upsert_columnar_batch(conn, sql, rows, id_index, origin, rejects):
+    """Upsert d'un lot ; retourne le nombre de lignes appliquées.
+
+    Un conflit (email ou matricule déjà pris par un autre id, parent absent...) fait
+    reprendre le lot ligne par ligne : seules les lignes fautives sont rejetées.
+    """
+    conn.execute("SAVEPOINT import_columnar_lot")
+    try:
+        conn.executemany(sql, rows)
+        conn.execute("RELEASE import_columnar_lot")
+        return len(rows)
+    except sqlite3.IntegrityError:
+        conn.execute("ROLLBACK TO import_columnar_lot")
+        conn.execute("RELEASE import_columnar_lot")
+
+    applied = 0
+    for row in rows:
+        conn.execute("SAVEPOINT import_columnar_ligne")
+        try:
+            conn.execute(sql, row)
+            applied += 1
+        except sqlite3.IntegrityError as e:
+            conn.execute("ROLLBACK TO import_columnar_ligne")
+            rejects.append(origin + (row[id_index], f"Conflit en base : {e}"))
+        conn.execute("RELEASE import_columnar_ligne")
+    return applied
+
+
+def import_columnar(filepaths, progress=None) -> dict:
+    """Importe des fichiers produits par export_columnar, dans une seule transaction.
+
+    Les lignes sont insérées ou mises à jour par id (upsert) ; les fichiers de
+    suppressions suppriment les id listés. Une ligne en conflit avec la base est
+    rejetée sans interrompre l'import. Retourne {"counts": {table: lignes appliquées},
+    "rejects": [(fichier, table, id, motif)]}.
+    """
+    _require_pyarrow()
+    counts = {}
+    rejects = []
+    conn = db_connect()
+    try:
+        files = []
+        for filepath in filepaths:
+            pf = pq.ParquetFile(filepath)
+            meta = {k.decode(): v.decode() for k, v in (pf.schema_arrow.metadata or {}).items()}
+            if meta.get("table") not in COLUMNAR_TABLES:
+                raise ValueError(f"{Path(filepath).name} : fichier non produit par l'export Parquet")
+            files.append((Path(filepath).name, pf, meta))
+        # Parents avant enfants pour les upserts, l'inverse pour les suppressions ;
+        # pour une même table, les exports dans l'ordre des filigranes
+        order = list(COLUMNAR_TABLES)
+        files.sort(key=lambda f: (f[2]["operation"] == "delete",
+                                  order.index(f[2]["table"]) * (-1 if f[2]["operation"] == "delete" else 1),
+                                  int(f[2].get("depuis", 0))))
+
+        conn.execute("BEGIN IMMEDIATE")
+        for done, (filename, pf, meta) in enumerate(files, start=1):
+            table = meta["table"]
+            kinds = dict(COLUMNAR_TABLES[table])
+
+            if meta.get("operation") == "delete":
+                for batch in pf.iter_batches(columns=["id"]):
+                    ids = batch.column(0).to_pylist()
+                    conn.executemany(f"DELETE FROM {table} WHERE id=?", [(i,) for i in ids])
+                    counts[table] = counts.get(table, 0) + len(ids)
+            else:
+                names = [n for n in pf.schema_arrow.names if n in kinds]
+                updates = ", ".join(f"{n}=excluded.{n}" for n in names if n != "id")
+                sql = f"""
+                    INSERT INTO {table} ({", ".join(names)}) VALUES ({", ".join("?" for _ in names)})
+                    ON CONFLICT(id) DO UPDATE SET {updates}
+                """
+                for batch in pf.iter_batches(columns=names):
+                    cols = [[_sql_value(v, kinds[n]) for v in batch.column(i).to_pylist()] for i, n in enumerate(names)]
+                    applied = _upsert_columnar_batch(conn, sql, list(zip(*cols)), names.index("id"),
+                                                     (filename, table), rejects)
+                    counts[table] = counts.get(table, 0) + applied
+            if progress:
+                progress(done, len(files))
+
+        if "etudiants" in counts:
+            # Matricules importés : les compteurs seront recalculés depuis la base
+            conn.execute("DELETE FROM matricule_compteurs")
+        conn.commit()
+    finally:
+        conn.close()
+    return {"counts": counts, "rejects": rejects}
+
+
+def fetch_absence_alerts(conn, seuil: int) -> list:
+    """Étudiants ayant au moins `seuil` absences : [(matricule, nom prénom, nombre)], du plus absent au moins absent."""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT e.matricule, e.nom || ' ' || e.prenom, COUNT(*) as nb
+        FROM absences a
+        JOIN etudiants e ON e.id=a.etudiant_id
+        GROUP BY a.etudiant_id
+        HAVING nb >= ?
+        ORDER BY nb DESC
+    """, (seuil,))
+    return cur.fetchall()
+
+
+def load_dashboard_data(parts=None) -> dict:
+    """Indicateurs et séries du tableau de bord (lu hors du thread Tk).
+
+    `parts` : clés à recalculer (voir App.DASHBOARD_DEPENDENCIES) ; toutes par défaut.
+    """
+    import numpy as np
+    from statistiques import mention_counts
+
+    conn = db_connect()
+    cur = conn.cursor()
+    data = {}
+
+    for key, table in (("nb_etudiants", "etudiants"), ("nb_modules", "modules"),
+                       ("nb_inscriptions", "inscriptions"), ("nb_absences", "absences")):
+        if parts is None or key in parts:
+            cur.execute(f"SELECT COUNT(*) FROM {table}")
+            data[key] = cur.fetchone()[0]
+
+    if parts is None or "top_abs" in parts:
+        cur.execute("""
+            SELECT e.matricule, e.nom || ' ' || e.prenom, COUNT(*) as nb
+            FROM absences a
+            JOIN etudiants e ON e.id=a.etudiant_id
+            GROUP BY a.etudiant_id
+            ORDER BY nb DESC
+            LIMIT 5
+        """)
+        data["top_abs"] = cur.fetchall()
+
+    # Distribution des mentions
+    if parts is None or "mentions" in parts:
+        cur.execute("SELECT note FROM notes WHERE note IS NOT NULL")
+        notes = np.fromiter((row[0] for row in cur), dtype=np.float64)
+        data["mentions"] = dict(zip(mention_labels(), mention_counts(notes, mention_thresholds()).tolist()))
+
+    # Absences par niveau
+    if parts is None or "absences_niveaux" in parts:
+        cur.execute("""
+            SELECT n.nom, COUNT(a.id) as nb_absences
+            FROM absences a
+            LEFT JOIN modules m ON m.id = a.module_id
+            LEFT JOIN niveaux n ON n.id = (
+                SELECT niveau_id FROM inscriptions WHERE etudiant_id = a.etudiant_id LIMIT 1
+            )
+            GROUP BY n.nom
+            ORDER BY nb_absences DESC
+            LIMIT 8
+        """)
+        data["absences_niveaux"] = cur.fetchall()
+    conn.close()
+    return data
+
+
+def _pdf_header(c, title: str):
+    from reportlab.lib.units import cm
+
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(2 * cm, 28.5 * cm, title)
+    c.setFont("Helvetica", 10)
+    c.drawString(2 * cm, 28.0 * cm, f"Généré le {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+
+
+def _draw_transcript(c, etu, rows, average=None):
+    """Dessine le relevé d'un étudiant sur le canvas c, en commençant une nouvelle page.
+
+    etu = (matricule, nom, prenom, email) ; rows = lignes de SQL_TRANSCRIPT_NOTES ;
+    average = (moyenne, mention) lue dans student_averages, ou None sans note.
+    """
+    from reportlab.lib.units import cm
+
+    _pdf_header(c, "Relevé de notes")
 
     matricule, nom, prenom, email = etu
     c.setFont("Helvetica", 11)
@@ -670,105 +1955,1281 @@ def generate_transcript_pdf(conn, etudiant_id: int, filepath: str):
     if email:
         c.drawString(2 * cm, 25.6 * cm, f"Email : {email}")
 
-    cur.execute("""
-        SELECT m.code, m.nom, m.coefficient, no.note, COALESCE(no.annee_academique,''), COALESCE(no.type_evaluation,'')
-        FROM notes no
-        JOIN modules m ON m.id = no.module_id
-        WHERE no.etudiant_id=?
-        ORDER BY COALESCE(no.annee_academique,''), m.code
-    """, (etudiant_id,))
-    rows = cur.fetchall()
+    y = 24.5 * cm
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(2 * cm, y, "Module")
+    c.drawString(10 * cm, y, "Coef")
+    c.drawString(12 * cm, y, "Note")
+    c.drawString(14 * cm, y, "Année")
+    y -= 0.6 * cm
+
+    c.setFont("Helvetica", 10)
+    for code, mnom, coef, note, annee, typ in rows:
+        if y < 2.5 * cm:
+            c.showPage()
+            _pdf_header(c, "Relevé de notes (suite)")
+            y = 26.5 * cm
+            c.setFont("Helvetica", 10)
+
+        c.drawString(2 * cm, y, f"{code} - {mnom}"[:60])
+        c.drawString(10 * cm, y, f"{coef}")
+        c.drawString(12 * cm, y, f"{note}")
+        c.drawString(14 * cm, y, annee)
+        y -= 0.5 * cm
+
+    y -= 0.4 * cm
+    c.setFont("Helvetica-Bold", 11)
+    if average and average[0] is not None:
+        moyenne, mention = average
+        c.drawString(2 * cm, y, f"Moyenne générale : {moyenne:.2f} / 20")
+        y -= 0.5 * cm
+        c.drawString(2 * cm, y, f"Mention : {mention}")
+    else:
+        c.drawString(2 * cm, y, "Moyenne générale : -")
+
+    c.showPage()
+
+
+def generate_transcript_pdf(conn, etudiant_id: int, filepath: str):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    cur = conn.cursor()
+    cur.execute("SELECT matricule, nom, prenom, COALESCE(email,'') FROM etudiants WHERE id=?", (etudiant_id,))
+    etu = cur.fetchone()
+    if not etu:
+        raise ValueError("Étudiant introuvable")
+
+    cur.execute(SQL_TRANSCRIPT_NOTES, (etudiant_id,))
+    rows = cur.fetchall()
+    cur.execute(SQL_STUDENT_AVERAGE, (etudiant_id, AVERAGE_ALL_YEARS))
+    average = cur.fetchone()
+
+    Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+    c = canvas.Canvas(filepath, pagesize=A4)
+    _draw_transcript(c, etu, rows, average[:2] if average else None)
+    c.save()
+
+
+def _attestation_templates(c):
+    """Définit une fois par document les blocs fixes de l'attestation (formes réutilisées)."""
+    from reportlab.lib.units import cm
+
+    if c.hasForm("attestation_entete"):
+        return
+    c.beginForm("attestation_entete")
+    _pdf_header(c, "Attestation de scolarité")
+    c.setFont("Helvetica", 12)
+    c.drawString(2 * cm, 25.5 * cm, "Je soussigné(e), certifie que :")
+    c.endForm()
+
+    c.beginForm("attestation_signature")
+    c.setFont("Helvetica", 12)
+    c.drawString(2 * cm, 25.5 * cm - 9 * 14.4, "Fait pour servir et valoir ce que de droit.")
+    c.setFont("Helvetica", 10)
+    c.drawString(2 * cm, 4 * cm, "Signature : ____________________________")
+    c.endForm()
+
+
+def _draw_attestation(c, etu, ins, annee):
+    """Dessine une attestation sur une page du canvas c.
+
+    etu = (matricule, nom, prenom) ; ins = (fcode, fnom, ncode, nnom, statut).
+    """
+    from reportlab.lib.units import cm
+
+    matricule, nom, prenom = etu
+    fcode, fnom, ncode, nnom, statut = ins
+
+    _attestation_templates(c)
+    c.doForm("attestation_entete")
+
+    c.setFont("Helvetica", 12)
+    text = c.beginText(2 * cm, 25.5 * cm)
+    text.textLine("")
+    text.textLine("")
+    text.textLine(f"{nom} {prenom} (matricule : {matricule})")
+    text.textLine("")
+    text.textLine(f"est inscrit(e) pour l'année académique : {annee}")
+    text.textLine(f"Filière : {fcode} - {fnom}")
+    text.textLine(f"Niveau : {ncode} - {nnom}")
+    text.textLine(f"Statut : {statut}")
+    c.drawText(text)
+
+    c.doForm("attestation_signature")
+    c.showPage()
+
+
+def generate_attestation_pdf(conn, etudiant_id: int, annee: str, filepath: str):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    cur = conn.cursor()
+    cur.execute("SELECT matricule, nom, prenom FROM etudiants WHERE id=?", (etudiant_id,))
+    etu = cur.fetchone()
+    if not etu:
+        raise ValueError("Étudiant introuvable")
+
+    cur.execute(SQL_ATTESTATION_INSCRIPTION, (etudiant_id, annee))
+    ins = cur.fetchone()
+    if not ins:
+        raise ValueError("Aucune inscription pour cette année")
+
+    Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+    c = canvas.Canvas(filepath, pagesize=A4)
+    _draw_attestation(c, etu, ins, annee)
+    c.save()
+
+
+# DOCUMENTS PAR LOT
+
+# Documents envoyés à chaque processus de rendu en une fois
+PDF_BATCH_CHUNK_SIZE = 16
+
+
+def _inscription_filter(filiere_id=None, niveau_id=None, annee=None, groupe_id=None, statut=None):
+    """Clause WHERE (sur inscriptions i) et paramètres du filtre d'un lot de documents."""
+    clauses, params = [], []
+    for column, value in (("i.filiere_id", filiere_id), ("i.niveau_id", niveau_id),
+                          ("i.annee_academique", annee), ("i.groupe_id", groupe_id),
+                          ("i.statut", statut)):
+        if value not in (None, ""):
+            clauses.append(f"{column}=?")
+            params.append(value)
+    return (" AND ".join(clauses) or "1=1"), params
+
+
+def fetch_transcript_batch(conn, filiere_id=None, niveau_id=None, annee=None, groupe_id=None, statut=None) -> list:
+    """Charge les relevés d'un lot : [(etu, rows, average)] avec etu = (matricule, nom, prenom, email).
+
+    Les notes de tous les étudiants sont lues en une seule requête puis regroupées
+    par étudiant. Avec une année, le relevé se limite aux notes (et à la moyenne) de cette année.
+    """
+    where, params = _inscription_filter(filiere_id, niveau_id, annee, groupe_id, statut)
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT e.id, e.matricule, e.nom, e.prenom, COALESCE(e.email,''), sa.moyenne, sa.mention
+        FROM etudiants e
+        LEFT JOIN student_averages sa ON sa.etudiant_id = e.id AND sa.annee_academique = ?
+        WHERE e.id IN (SELECT i.etudiant_id FROM inscriptions i WHERE {where})
+        ORDER BY e.nom, e.prenom, e.id
+    """, [annee or AVERAGE_ALL_YEARS] + params)
+    etudiants = cur.fetchall()
+
+    note_filter = " AND no.annee_academique=?" if annee else ""
+    cur.execute(f"""
+        SELECT no.etudiant_id, m.code, m.nom, m.coefficient, no.note,
+               COALESCE(no.annee_academique,''), COALESCE(no.type_evaluation,'')
+        FROM notes no
+        JOIN modules m ON m.id = no.module_id
+        WHERE no.etudiant_id IN (SELECT i.etudiant_id FROM inscriptions i WHERE {where}){note_filter}
+        ORDER BY no.etudiant_id, COALESCE(no.annee_academique,''), m.code
+    """, params + ([annee] if annee else []))
+    notes = {
+        etu_id: [row[1:] for row in group]
+        for etu_id, group in itertools.groupby(cur.fetchall(), key=lambda row: row[0])
+    }
+    return [(etu[1:5], notes.get(etu[0], []), etu[5:]) for etu in etudiants]
+
+
+def fetch_attestation_batch(conn, annee, filiere_id=None, niveau_id=None, statut=None, groupe_id=None) -> list:
+    """Charge en une jointure les attestations d'une année : [(etu, ins)].
+
+    Comme generate_attestation_pdf, l'inscription retenue est la plus récente de l'étudiant.
+    """
+    where, params = _inscription_filter(filiere_id, niveau_id, annee, groupe_id, statut)
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT e.id, e.matricule, e.nom, e.prenom,
+               f.code, f.nom, n.code, n.nom, COALESCE(i.statut,'')
+        FROM inscriptions i
+        JOIN etudiants e ON e.id=i.etudiant_id
+        JOIN filieres f ON f.id=i.filiere_id
+        JOIN niveaux n ON n.id=i.niveau_id
+        WHERE {where}
+        ORDER BY e.nom, e.prenom, e.id, i.id DESC
+    """, params)
+    batch = []
+    for _, group in itertools.groupby(cur.fetchall(), key=lambda row: row[0]):
+        row = next(group)
+        batch.append((row[1:4], row[4:]))
+    return batch
+
+
+def _filename_part(value) -> str:
+    return re.sub(r"[^\w.-]+", "_", str(value)).strip("_") or "sans_nom"
+
+
+def transcript_filename(matricule: str, annee: Optional[str] = None) -> str:
+    if annee:
+        return f"releve_{_filename_part(matricule)}_{_filename_part(annee)}.pdf"
+    return f"releve_{_filename_part(matricule)}.pdf"
+
+
+def attestation_filename(matricule: str, annee: str) -> str:
+    return f"attestation_{_filename_part(matricule)}_{_filename_part(annee)}.pdf"
+
+
+def _render_pdf_file(job):
+    """Rend un document dans un .part puis le renomme : un fichier présent est toujours complet."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    draw, args, filepath = job
+    part = filepath + ".part"
+    c = canvas.Canvas(part, pagesize=A4)
+    draw(c, *args)
+    c.save()
+    os.replace(part, filepath)
+    return filepath
+
+
+def _render_pdf_batch(draw, items, output, filename, merged=False, workers=None, progress=None,
+                      resume=False) -> dict:
+    """Rend items = [args de draw] dans un dossier (un fichier par élément) ou un PDF unique.
+
+    - merged=False : output est un dossier ; les fichiers sont rendus en parallèle par un pool
+      de processus et remplacent les fichiers existants. Avec resume, les fichiers déjà présents
+      sont conservés : relancer le lot après une interruption reprend là où il s'était arrêté.
+    - merged=True : output est un fichier PDF unique, rendu en un seul canvas.
+
+    Retourne {"total", "written", "skipped"}.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    total = len(items)
+
+    if merged:
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        part = str(output) + ".part"
+        c = canvas.Canvas(part, pagesize=A4)
+        for done, args in enumerate(items, start=1):
+            draw(c, *args)
+            if progress:
+                progress(done, total)
+        c.save()
+        os.replace(part, output)
+        return {"total": total, "written": total, "skipped": 0}
+
+    directory = Path(output)
+    directory.mkdir(parents=True, exist_ok=True)
+    jobs = []
+    for args in items:
+        filepath = directory / filename(*args)
+        if not (resume and filepath.exists()):
+            jobs.append((draw, args, str(filepath)))
+    skipped = total - len(jobs)
+    if progress:
+        progress(skipped, total)
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(jobs) > PDF_BATCH_CHUNK_SIZE:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_render_pdf_file, jobs, chunksize=PDF_BATCH_CHUNK_SIZE)
+            for done, _ in enumerate(results, start=skipped + 1):
+                if progress:
+                    progress(done, total)
+    else:
+        for done, job in enumerate(jobs, start=skipped + 1):
+            _render_pdf_file(job)
+            if progress:
+                progress(done, total)
+    return {"total": total, "written": len(jobs), "skipped": skipped}
+
+
+def generate_transcripts_batch(output, filiere_id=None, niveau_id=None, annee=None, groupe_id=None,
+                               merged=False, workers=None, progress=None, statut=None, resume=False) -> dict:
+    """Génère les relevés de tous les étudiants inscrits correspondant au filtre.
+
+    Fichiers releve_<matricule>_<année>.pdf (releve_<matricule>.pdf sans année) dans le
+    dossier output, ou PDF unique si merged (voir _render_pdf_batch). Retourne
+    {"total", "written", "skipped"}.
+    """
+    conn = db_connect()
+    try:
+        batch = fetch_transcript_batch(conn, filiere_id, niveau_id, annee, groupe_id, statut)
+    finally:
+        conn.close()
+    return _render_pdf_batch(_draw_transcript, batch, output,
+                             lambda etu, rows, average: transcript_filename(etu[0], annee),
+                             merged=merged, workers=workers, progress=progress, resume=resume)
+
+
+def generate_attestations_batch(output, annee, filiere_id=None, niveau_id=None, statut=None, groupe_id=None,
+                                merged=False, workers=None, progress=None, resume=False) -> dict:
+    """Génère les attestations de scolarité de tous les inscrits d'une année.
+
+    Fichiers attestation_<matricule>_<année>.pdf dans le dossier output, ou PDF unique
+    si merged (voir _render_pdf_batch). Retourne {"total", "written", "skipped"}.
+    """
+    if not annee:
+        raise ValueError("Année académique obligatoire")
+    conn = db_connect()
+    try:
+        batch = fetch_attestation_batch(conn, annee, filiere_id, niveau_id, statut, groupe_id)
+    finally:
+        conn.close()
+    items = [(etu, ins, annee) for etu, ins in batch]
+    return _render_pdf_batch(_draw_attestation, items, output,
+                             lambda etu, ins, an: attestation_filename(etu[0], an),
+                             merged=merged, workers=workers, progress=progress, resume=resume)
+
+# SERVICES
+
+# Accès aux données par domaine, sans widget : App, la ligne de commande et les
+# benchmarks passent par ces classes. Les erreurs de saisie lèvent ValueError
+# (message prêt à afficher), les conflits d'intégrité sqlite3.IntegrityError.
+
+class Student(NamedTuple):
+    id: int
+    matricule: str
+    nom: str
+    prenom: str
+    email: Optional[str]
+    telephone: Optional[str]
+    adresse: Optional[str]
+    date_naissance: Optional[str]
+    lieu_naissance: Optional[str]
+    sexe: Optional[str]
+    photo_path: Optional[str]
+    statut: Optional[str]
+    date_inscription: Optional[str]
+
+
+class Average(NamedTuple):
+    moyenne: float
+    mention: str
+    nb_notes: int
+
+
+class StudentSheet(NamedTuple):
+    """Fiche étudiant : identité, moyenne générale et historiques (lignes prêtes à afficher)."""
+    student: Student
+    average: Average
+    inscriptions: list  # (année, filière, niveau, statut)
+    notes: list  # (année, module, note, coefficient, type)
+    absences: list  # (date, module, justifiée, motif)
+
+
+class StudentFilter(NamedTuple):
+    """Critères de la liste des étudiants ; filiere, niveau et groupe sont des codes."""
+    recherche: str = ""
+    filiere: str = ""
+    niveau: str = ""
+    statut: str = ""
+    groupe: str = ""
+
+
+class ListQuery(NamedTuple):
+    """Requête d'une liste (VirtualTreeview.set_query, fetch_keyset_page).
+
+    keys=None : requête déjà triée (pertinence), lue sans pagination par clés.
+    """
+    sql: str
+    params: tuple
+    keys: Optional[tuple]
+
+
+class ImportReport(NamedTuple):
+    inserted: int
+    rejects: list  # [(ligne, motif)]
+
+
+class Enrollment(NamedTuple):
+    id: int
+    etudiant_id: int
+    filiere_id: int
+    niveau_id: int
+    groupe_id: Optional[int]
+    annee_academique: str
+    statut: Optional[str]
+
+
+class GradeAudit(NamedTuple):
+    id: int
+    action: str
+    old_value: str
+    new_value: str
+    changed_at: str
+    changed_by: str
+
+
+class Absence(NamedTuple):
+    id: int
+    etudiant_id: int
+    module_id: int
+    date_absence: str
+    justifiee: int
+    motif: Optional[str]
+
+
+class AbsenceAlert(NamedTuple):
+    matricule: str
+    etudiant: str
+    absences: int
+
+
+class AbsenceStats(NamedTuple):
+    absences: int
+    etudiants: int
+    taux: float  # absences par étudiant
+
+
+class BatchResult(NamedTuple):
+    total: int
+    written: int
+    skipped: int
+
+
+SQL_ETUDIANT = """
+    SELECT id, matricule, nom, prenom, email, telephone, adresse, date_naissance,
+           lieu_naissance, sexe, photo_path, statut, date_inscription
+    FROM etudiants WHERE id=?
+"""
+
+SQL_ETUDIANTS_LIST = """
+    SELECT id, matricule, nom, prenom, COALESCE(email,''), COALESCE(telephone,''), COALESCE(statut,'')
+    FROM etudiants
+    WHERE 1=1
+"""
+
+SQL_INSCRIPTIONS_ROWS = """
+    SELECT i.id,
+           e.matricule,
+           e.nom || ' ' || e.prenom AS etu,
+           f.code || ' - ' || f.nom AS fil,
+           n.code || ' - ' || n.nom AS niv,
+           COALESCE(i.groupe_id, '') AS groupe,
+           i.annee_academique,
+           COALESCE(i.statut,'')
+    FROM inscriptions i
+    JOIN etudiants e ON e.id = i.etudiant_id
+    JOIN filieres f  ON f.id = i.filiere_id
+    JOIN niveaux n   ON n.id = i.niveau_id
+"""
+
+SQL_ABSENCES_ROWS = """
+    SELECT a.id,
+           e.nom || ' ' || e.prenom,
+           m.code || ' - ' || m.nom,
+           a.date_absence,
+           CASE a.justifiee WHEN 1 THEN 'Oui' ELSE 'Non' END,
+           COALESCE(a.motif,'')
+    FROM absences a
+    JOIN etudiants e ON e.id = a.etudiant_id
+    JOIN modules m ON m.id = a.module_id
+"""
+
+
+def _fetch_one(sql, params=()):
+    conn = db_connect()
+    try:
+        return conn.execute(sql, params).fetchone()
+    finally:
+        conn.close()
+
+
+def _execute(sql, params=()) -> int:
+    """Exécute une écriture dans sa propre transaction ; retourne lastrowid."""
+    conn = db_connect()
+    try:
+        cur = conn.execute(sql, params)
+        conn.commit()
+        return cur.lastrowid
+    finally:
+        conn.close()
+
+
+class StudentService:
+    """Étudiants : création (matricule attribué), fiche, liste et recherche, import CSV."""
+
+    def create(self, nom, prenom, email, telephone=None, adresse=None, date_naissance=None,
+               lieu_naissance=None, sexe="M", photo_path=None) -> Student:
+        nom, prenom, email = (nom or "").strip(), (prenom or "").strip(), (email or "").strip()
+        if not nom or not prenom:
+            raise ValueError("Nom et prénom obligatoires.")
+        if not email:
+            raise ValueError("Email obligatoire.")
+        if telephone and not validate_phone(telephone):
+            raise ValueError(f"Format téléphone invalide.\n{format_phone_hint()}")
+
+        conn = db_connect()
+        try:
+            matricule = allocate_matricules(conn, matricule_prefix(nom, prenom))[0]
+            cur = conn.execute("""
+                INSERT INTO etudiants
+                (matricule, nom, prenom, email, telephone, adresse, date_naissance, lieu_naissance, sexe, photo_path, statut, date_inscription)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (matricule, nom, prenom, email, telephone or None, adresse or None, date_naissance or None,
+                  lieu_naissance or None, sexe, photo_path, "actif", now_iso()))
+            conn.commit()
+            return Student(*conn.execute(SQL_ETUDIANT, (cur.lastrowid,)).fetchone())
+        finally:
+            conn.close()
+
+    def get(self, etudiant_id) -> Optional[Student]:
+        row = _fetch_one(SQL_ETUDIANT, (etudiant_id,))
+        return Student(*row) if row else None
+
+    def delete(self, etudiant_id):
+        """Supprime l'étudiant ; inscriptions, notes et absences suivent en cascade."""
+        _execute("DELETE FROM etudiants WHERE id=?", (etudiant_id,))
+
+    def row(self, etudiant_id):
+        """Ligne de la liste des étudiants (patch d'une vue)."""
+        return _fetch_one(SQL_ETUDIANT_ROW, (etudiant_id,))
+
+    def choices(self) -> list:
+        """[(id, matricule, nom, prénom)] par nom, pour les listes de sélection."""
+        return fetch_rows("SELECT id, matricule, nom, prenom FROM etudiants ORDER BY nom, prenom")
+
+    def average(self, etudiant_id, annee_academique=None) -> Average:
+        return Average(*get_student_average(etudiant_id, annee_academique))
+
+    def sheet(self, etudiant_id) -> Optional[StudentSheet]:
+        conn = db_connect()
+        try:
+            row = conn.execute(SQL_ETUDIANT, (etudiant_id,)).fetchone()
+            if not row:
+                return None
+            return StudentSheet(
+                Student(*row),
+                self.average(etudiant_id),
+                conn.execute(SQL_FICHE_INSCRIPTIONS, (etudiant_id,)).fetchall(),
+                conn.execute(SQL_FICHE_NOTES, (etudiant_id,)).fetchall(),
+                conn.execute(SQL_FICHE_ABSENCES, (etudiant_id,)).fetchall(),
+            )
+        finally:
+            conn.close()
+
+    def list_query(self) -> ListQuery:
+        return ListQuery(SQL_ETUDIANTS_LIST, (), (("id", 0),))
+
+    def search_query(self, filtre: StudentFilter) -> ListQuery:
+        """Liste filtrée : plein texte classé par pertinence si FTS5 est disponible, sinon LIKE."""
+        search_text = filtre.recherche.strip().lower()
+        select = """
+            SELECT DISTINCT e.id, e.matricule, e.nom, e.prenom, COALESCE(e.email,''), COALESCE(e.telephone,''), COALESCE(e.statut,'')
+        """
+        joins = """
+            LEFT JOIN inscriptions i ON e.id = i.etudiant_id
+            LEFT JOIN filieres f ON i.filiere_id = f.id
+            LEFT JOIN niveaux n ON i.niveau_id = n.id
+            LEFT JOIN groupes g ON i.groupe_id = g.id
+        """
+        match = fts_match_expression(search_text) if FTS_ENABLED else None
+        if match:
+            # Index plein texte : résultats classés par pertinence (bm25)
+            query = select + "FROM etudiants_fts JOIN etudiants e ON e.id = etudiants_fts.rowid" + joins + \
+                "WHERE etudiants_fts MATCH ?"
+            params = [match]
+        else:
+            query = select + "FROM etudiants e" + joins + "WHERE 1=1"
+            params = []
+
+        if search_text and not match:
+            query += " AND (LOWER(e.nom) LIKE ? OR LOWER(e.prenom) LIKE ? OR LOWER(e.email) LIKE ? OR e.matricule LIKE ?)"
+            params.extend([f"%{search_text}%"] * 4)
+        for column, value in (("f.code", filtre.filiere), ("n.code", filtre.niveau),
+                              ("e.statut", filtre.statut), ("g.code", filtre.groupe)):
+            if value:
+                query += f" AND {column} = ?"
+                params.append(value)
+
+        if match:
+            return ListQuery(query + " ORDER BY etudiants_fts.rank", tuple(params), None)
+        return ListQuery(query, tuple(params), (("e.id", 0),))
+
+    def import_csv(self, filepath, progress=None) -> ImportReport:
+        report = import_etudiants_csv_file(filepath, progress=progress)
+        return ImportReport(report["inserted"], report["rejects"])
+
+
+class EnrollmentService:
+    """Inscriptions d'un étudiant dans une filière, un niveau et un groupe pour une année."""
+
+    def save(self, etudiant_id, filiere_id, niveau_id, annee, groupe_id=None, inscription_id=None) -> int:
+        """Crée l'inscription, ou modifie `inscription_id` ; retourne son id."""
+        if not (etudiant_id and filiere_id and niveau_id and annee):
+            raise ValueError("Étudiant, filière, niveau et année sont obligatoires.")
+        if inscription_id:
+            _execute("""
+                UPDATE inscriptions SET etudiant_id=?, filiere_id=?, niveau_id=?,
+                                      groupe_id=?, annee_academique=?
+                WHERE id=?
+            """, (etudiant_id, filiere_id, niveau_id, groupe_id, annee, inscription_id))
+            return inscription_id
+        return _execute("""
+            INSERT INTO inscriptions (etudiant_id, filiere_id, niveau_id, groupe_id, annee_academique, statut)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (etudiant_id, filiere_id, niveau_id, groupe_id, annee, "inscrit"))
+
+    def get(self, inscription_id) -> Optional[Enrollment]:
+        row = _fetch_one("""
+            SELECT id, etudiant_id, filiere_id, niveau_id, groupe_id, annee_academique, statut
+            FROM inscriptions WHERE id=?
+        """, (inscription_id,))
+        return Enrollment(*row) if row else None
+
+    def delete(self, inscription_id):
+        _execute("DELETE FROM inscriptions WHERE id=?", (inscription_id,))
+
+    def group_choices(self) -> list:
+        """[(id, nom)] des groupes, pour les listes de sélection."""
+        return fetch_rows("SELECT id, nom FROM groupes ORDER BY nom")
+
+    def list_query(self) -> ListQuery:
+        return ListQuery(SQL_INSCRIPTIONS_ROWS + " WHERE 1=1", (), (("i.id", 0),))
+
+
+class GradeService:
+    """Notes et leur journal d'audit (notes_audit), attribué à `changed_by`."""
+
+    def __init__(self, changed_by: str):
+        self.changed_by = changed_by
+
+    @staticmethod
+    def parse_note(text) -> float:
+        try:
+            note = float(str(text).strip().replace(",", "."))
+        except ValueError:
+            raise ValueError("Note invalide (ex: 14.5).")
+        if note < 0 or note > 20:
+            raise ValueError("La note doit être entre 0 et 20.")
+        return note
+
+    def _audit(self, cur, note_id, action, old, new):
+        cur.execute("""
+            INSERT INTO notes_audit (note_id, action, old_value, new_value, changed_at, changed_by)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (note_id, action, old, new, now_iso(), self.changed_by))
+
+    @staticmethod
+    def _old_value(cur, note_id):
+        cur.execute("SELECT note, COALESCE(type_evaluation,''), COALESCE(annee_academique,'') FROM notes WHERE id=?",
+                    (note_id,))
+        old = cur.fetchone()
+        return f"note={old[0]};type={old[1]};annee={old[2]}" if old else None
+
+    def add(self, etudiant_id, module_id, note, type_evaluation=None, annee=None) -> int:
+        if not (etudiant_id and module_id):
+            raise ValueError("Étudiant, module et note sont obligatoires.")
+        conn = db_connect()
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                INSERT INTO notes (etudiant_id, module_id, note, type_evaluation, annee_academique)
+                VALUES (?, ?, ?, ?, ?)
+            """, (etudiant_id, module_id, note, type_evaluation or None, annee or None))
+            note_id = cur.lastrowid
+            self._audit(cur, note_id, "INSERT", None, f"note={note};type={type_evaluation or ''};annee={annee or ''}")
+            conn.commit()
+            return note_id
+        finally:
+            conn.close()
+
+    def update(self, note_id, note, type_evaluation=None, annee=None):
+        conn = db_connect()
+        try:
+            cur = conn.cursor()
+            old = self._old_value(cur, note_id)
+            if old is None:
+                raise ValueError("Note introuvable.")
+            cur.execute("""
+                UPDATE notes
+                SET note=?, type_evaluation=?, annee_academique=?
+                WHERE id=?
+            """, (note, type_evaluation or None, annee or None, note_id))
+            self._audit(cur, note_id, "UPDATE", old, f"note={note};type={type_evaluation or ''};annee={annee or ''}")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def delete(self, note_id):
+        conn = db_connect()
+        try:
+            cur = conn.cursor()
+            self._audit(cur, note_id, "DELETE", self._old_value(cur, note_id), None)
+            cur.execute("DELETE FROM notes WHERE id=?", (note_id,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def row(self, note_id):
+        """Ligne de la liste des notes (patch d'une vue)."""
+        return _fetch_one(SQL_NOTES_ROWS + " WHERE no.id=?", (note_id,))
+
+    def audit(self, note_id) -> list:
+        return [GradeAudit(*r) for r in fetch_rows(SQL_AUDIT_NOTE, (note_id,))]
+
+    def list_query(self) -> ListQuery:
+        return ListQuery(SQL_NOTES_ROWS + " WHERE 1=1", (), (("no.id", 0),))
+
+
+class AbsenceService:
+    """Absences, taux d'absentéisme et alertes par seuil."""
+
+    def save(self, etudiant_id, module_id, date_absence, justifiee=0, motif=None, absence_id=None) -> int:
+        """Enregistre l'absence, ou modifie `absence_id` ; retourne son id."""
+        if not (etudiant_id and module_id and date_absence):
+            raise ValueError("Étudiant, module et date sont obligatoires.")
+        values = (etudiant_id, module_id, date_absence, justifiee, motif or None)
+        if absence_id:
+            _execute("""
+                UPDATE absences
+                SET etudiant_id=?, module_id=?, date_absence=?, justifiee=?, motif=?
+                WHERE id=?
+            """, values + (absence_id,))
+            return absence_id
+        return _execute("""
+            INSERT INTO absences (etudiant_id, module_id, date_absence, justifiee, motif)
+            VALUES (?, ?, ?, ?, ?)
+        """, values)
 
-    y = 24.5 * cm
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(2 * cm, y, "Module")
-    c.drawString(10 * cm, y, "Coef")
-    c.drawString(12 * cm, y, "Note")
-    c.drawString(14 * cm, y, "Année")
-    y -= 0.6 * cm
+    def get(self, absence_id) -> Optional[Absence]:
+        row = _fetch_one("SELECT id, etudiant_id, module_id, date_absence, justifiee, motif FROM absences WHERE id=?",
+                         (absence_id,))
+        return Absence(*row) if row else None
 
-    c.setFont("Helvetica", 10)
-    total_points = 0.0
-    total_coef = 0.0
+    def delete(self, absence_id):
+        _execute("DELETE FROM absences WHERE id=?", (absence_id,))
 
-    for code, mnom, coef, note, annee, typ in rows:
-        if y < 2.5 * cm:
-            c.showPage()
-            _pdf_header(c, "Relevé de notes (suite)")
-            y = 26.5 * cm
-            c.setFont("Helvetica", 10)
+    def stats(self) -> AbsenceStats:
+        total, etudiants = _fetch_one("SELECT (SELECT COUNT(*) FROM absences), (SELECT COUNT(*) FROM etudiants)")
+        return AbsenceStats(total, etudiants, (total / etudiants) if etudiants else 0.0)
 
-        c.drawString(2 * cm, y, f"{code} - {mnom}"[:60])
-        c.drawString(10 * cm, y, f"{coef}")
-        c.drawString(12 * cm, y, f"{note}")
-        c.drawString(14 * cm, y, annee)
-        y -= 0.5 * cm
+    def alerts(self, seuil: int) -> list:
+        conn = db_connect()
+        try:
+            return [AbsenceAlert(*r) for r in fetch_absence_alerts(conn, seuil)]
+        finally:
+            conn.close()
 
+    def list_query(self) -> ListQuery:
+        return ListQuery(SQL_ABSENCES_ROWS + " WHERE 1=1", (), (("a.date_absence", 3), ("a.id", 0)))
+
+
+class DocumentService:
+    """Relevés, attestations (à l'unité ou par lot) et exports tabulaires."""
+
+    EXPORTS_XLSX = {
+        "etudiants": export_etudiants_to_xlsx,
+        "notes": export_notes_to_xlsx,
+        "absences": export_absences_to_xlsx,
+    }
+
+    def transcript(self, etudiant_id, filepath):
+        _run_with_connection(generate_transcript_pdf, etudiant_id, filepath)
+
+    def attestation(self, etudiant_id, annee, filepath):
+        if not annee:
+            raise ValueError("Année académique obligatoire")
+        _run_with_connection(generate_attestation_pdf, etudiant_id, annee, filepath)
+
+    def transcripts_batch(self, output, merged=False, workers=None, progress=None, resume=False,
+                          **filters) -> BatchResult:
+        """filters : filiere_id, niveau_id, annee, groupe_id, statut (voir generate_transcripts_batch)."""
+        result = generate_transcripts_batch(output, merged=merged, workers=workers, progress=progress,
+                                            resume=resume, **filters)
+        return BatchResult(result["total"], result["written"], result["skipped"])
+
+    def attestations_batch(self, output, annee, merged=False, workers=None, progress=None, resume=False,
+                           **filters) -> BatchResult:
+        """filters : filiere_id, niveau_id, groupe_id, statut (voir generate_attestations_batch)."""
+        result = generate_attestations_batch(output, annee, merged=merged, workers=workers, progress=progress,
+                                             resume=resume, **filters)
+        return BatchResult(result["total"], result["written"], result["skipped"])
+
+    def export_students_csv(self, filepath):
+        export_etudiants_to_csv(filepath)
+
+    def export_xlsx(self, table, filepath, progress=None):
+        """Exporte etudiants, notes ou absences dans un classeur Excel."""
+        if table not in self.EXPORTS_XLSX:
+            raise ValueError(f"Export Excel inconnu : {table}")
+        self.EXPORTS_XLSX[table](filepath, progress=progress)
+
+
+class StructureService:
+    """Référentiel des inscriptions : filières, niveaux, groupes et spécialités."""
+
+    @staticmethod
+    def _save(table, columns, values, row_id):
+        """INSERT, ou UPDATE de `row_id` ; retourne l'id."""
+        if row_id:
+            assignments = ", ".join(f"{c}=?" for c in columns)
+            _execute(f"UPDATE {table} SET {assignments} WHERE id=?", tuple(values) + (row_id,))
+            return row_id
+        placeholders = ", ".join("?" for _ in columns)
+        return _execute(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", tuple(values))
+
+    def filieres(self) -> list:
+        """[(id, code, nom)] par code."""
+        return fetch_rows("SELECT id, code, nom FROM filieres ORDER BY code")
+
+    def get_filiere(self, filiere_id):
+        return _fetch_one("SELECT code, nom FROM filieres WHERE id=?", (filiere_id,))
+
+    def save_filiere(self, code, nom, filiere_id=None) -> int:
+        code, nom = (code or "").strip(), (nom or "").strip()
+        if not code or not nom:
+            raise ValueError("Code et nom filière obligatoires.")
+        return self._save("filieres", ("code", "nom"), (code, nom), filiere_id)
+
+    def delete_filiere(self, filiere_id):
+        """Modules et groupes sont détachés, les spécialités supprimées."""
+        _execute("DELETE FROM filieres WHERE id=?", (filiere_id,))
+
+    def niveaux(self) -> list:
+        """[(id, code, nom, ordre ou '')] par ordre puis code."""
+        return fetch_rows("SELECT id, code, nom, COALESCE(ordre,'') FROM niveaux ORDER BY COALESCE(ordre, 999), code")
+
+    def get_niveau(self, niveau_id):
+        return _fetch_one("SELECT code, nom, COALESCE(ordre,'') FROM niveaux WHERE id=?", (niveau_id,))
+
+    def save_niveau(self, code, nom, ordre=None, niveau_id=None) -> int:
+        """`ordre` : entier, texte d'un entier ou vide."""
+        code, nom = (code or "").strip(), (nom or "").strip()
+        if not code or not nom:
+            raise ValueError("Code et nom niveau obligatoires.")
+        ordre = str(ordre).strip() if ordre is not None else ""
+        if ordre and not ordre.isdigit():
+            raise ValueError("Ordre doit être un entier (ex: 4).")
+        return self._save("niveaux", ("code", "nom", "ordre"), (code, nom, int(ordre) if ordre else None), niveau_id)
+
+    def delete_niveau(self, niveau_id):
+        _execute("DELETE FROM niveaux WHERE id=?", (niveau_id,))
+
+    def groupes(self) -> list:
+        """[(id, code, nom)] par code."""
+        return fetch_rows("SELECT id, code, nom FROM groupes ORDER BY code")
+
+    def get_groupe(self, groupe_id):
+        return _fetch_one("SELECT code, nom FROM groupes WHERE id=?", (groupe_id,))
+
+    def save_groupe(self, code, nom, groupe_id=None) -> int:
+        code, nom = (code or "").strip(), (nom or "").strip()
+        if not code or not nom:
+            raise ValueError("Code et nom groupe obligatoires.")
+        return self._save("groupes", ("code", "nom"), (code, nom), groupe_id)
+
+    def delete_groupe(self, groupe_id):
+        _execute("DELETE FROM groupes WHERE id=?", (groupe_id,))
+
+    def groupes_filiere_niveau(self, filiere_id, niveau_id) -> list:
+        return fetch_rows(SQL_GROUPES_FILIERE_NIVEAU, (filiere_id, niveau_id))
+
+    def filter_choices(self) -> tuple:
+        """Libellés « code - nom » des filières, niveaux et groupes, pour les filtres de recherche."""
+        conn = db_connect()
         try:
-            total_points += float(note) * float(coef)
-            total_coef += float(coef)
-        except Exception:
-            pass
+            return tuple([row[0] for row in conn.execute(sql).fetchall()] for sql in (
+                "SELECT code || ' - ' || nom FROM filieres ORDER BY nom",
+                "SELECT code || ' - ' || nom FROM niveaux ORDER BY ordre",
+                "SELECT code || ' - ' || nom FROM groupes ORDER BY nom",
+            ))
+        finally:
+            conn.close()
 
-    y -= 0.4 * cm
-    c.setFont("Helvetica-Bold", 11)
-    if total_coef > 0:
-        moyenne = total_points / total_coef
-        mention = calculate_academic_honors(moyenne)
-        c.drawString(2 * cm, y, f"Moyenne générale : {moyenne:.2f} / 20")
-        y -= 0.5 * cm
-        c.drawString(2 * cm, y, f"Mention : {mention}")
-    else:
-        c.drawString(2 * cm, y, "Moyenne générale : -")
+    def specialites(self, filiere_id) -> list:
+        """[(id, nom, description ou '')] d'une filière, par nom."""
+        return fetch_rows(
+            "SELECT id, nom, COALESCE(description,'') FROM specialites WHERE filiere_id=? ORDER BY nom",
+            (filiere_id,)
+        )
 
-    c.save()
+    def add_specialite(self, filiere_id, nom, description=None) -> int:
+        nom = (nom or "").strip()
+        if not filiere_id or not nom:
+            raise ValueError("Filière et nom spécialité obligatoires.")
+        return _execute("INSERT INTO specialites (filiere_id, nom, description) VALUES (?, ?, ?)",
+                        (filiere_id, nom, description or None))
 
+    def delete_specialite(self, specialite_id):
+        _execute("DELETE FROM specialites WHERE id=?", (specialite_id,))
 
-def generate_attestation_pdf(conn, etudiant_id: int, annee: str, filepath: str):
-    cur = conn.cursor()
-    cur.execute("SELECT matricule, nom, prenom FROM etudiants WHERE id=?", (etudiant_id,))
-    etu = cur.fetchone()
-    if not etu:
-        raise ValueError("Étudiant introuvable")
 
-    cur.execute("""
-        SELECT f.code, f.nom, n.code, n.nom, COALESCE(i.statut,'')
-        FROM inscriptions i
-        JOIN filieres f ON f.id=i.filiere_id
-        JOIN niveaux n ON n.id=i.niveau_id
-        WHERE i.etudiant_id=? AND i.annee_academique=?
-        ORDER BY i.id DESC
-        LIMIT 1
-    """, (etudiant_id, annee))
-    ins = cur.fetchone()
-    if not ins:
-        raise ValueError("Aucune inscription pour cette année")
+class ModuleService:
+    """Modules : création, rattachement à une filière / un niveau, semestres proposés."""
 
-    matricule, nom, prenom = etu
-    fcode, fnom, ncode, nnom, statut = ins
+    def create(self, code, nom, coefficient, credits=None, semestre=None) -> int:
+        """`coefficient` et `credits` acceptent le texte saisi (« 1,5 », « 5 »)."""
+        code, nom = (code or "").strip(), (nom or "").strip()
+        coefficient = str(coefficient if coefficient is not None else "").strip()
+        if not code or not nom or not coefficient:
+            raise ValueError("Code, nom et coefficient sont obligatoires.")
+        try:
+            coefficient = float(coefficient.replace(",", "."))
+        except ValueError:
+            raise ValueError("Coefficient invalide (ex: 2 ou 1.5).")
+        credits = str(credits).strip() if credits is not None else ""
+        if credits and not credits.isdigit():
+            raise ValueError("Crédits doit être un entier (ex: 5).")
+        return _execute("""
+            INSERT INTO modules (code, nom, coefficient, credits, semestre, filiere_id, niveau_id)
+            VALUES (?, ?, ?, ?, ?, NULL, NULL)
+        """, (code, nom, coefficient, int(credits) if credits else None, semestre or None))
+
+    def associate(self, module_id, filiere_id=None, niveau_id=None):
+        if not filiere_id and not niveau_id:
+            raise ValueError("Veuillez sélectionner au moins une filière ou un niveau.")
+        _execute("""
+            UPDATE modules
+            SET filiere_id = ?, niveau_id = ?
+            WHERE id = ?
+        """, (filiere_id, niveau_id, module_id))
+
+    def rows(self) -> list:
+        """[(id, code, nom, coefficient, crédits, semestre, code filière, code niveau)] par code."""
+        return fetch_rows("""
+            SELECT m.id, m.code, m.nom, m.coefficient, COALESCE(m.credits, ''),
+                   COALESCE(m.semestre, ''), COALESCE(f.code,''), COALESCE(n.code,'')
+            FROM modules m
+            LEFT JOIN filieres f ON f.id = m.filiere_id
+            LEFT JOIN niveaux n  ON n.id = m.niveau_id
+            ORDER BY m.code
+        """)
 
-    Path(filepath).parent.mkdir(parents=True, exist_ok=True)
-    c = canvas.Canvas(filepath, pagesize=A4)
-    _pdf_header(c, "Attestation de scolarité")
+    def semestre_choices(self) -> list:
+        """Semestres des modules et niveaux « S.. » existants, complétés de S01 à S10."""
+        conn = db_connect()
+        try:
+            semestres = [row[0] for row in conn.execute(
+                "SELECT DISTINCT semestre FROM modules WHERE semestre IS NOT NULL ORDER BY semestre")]
+            semestres += [row[0] for row in conn.execute(
+                "SELECT DISTINCT code FROM niveaux WHERE code LIKE 'S%' ORDER BY code")]
+        finally:
+            conn.close()
+        return sorted(set(semestres + [f"S{i:02d}" for i in range(1, 11)]))
 
-    c.setFont("Helvetica", 12)
-    text = c.beginText(2 * cm, 25.5 * cm)
-    text.textLine("Je soussigné(e), certifie que :")
-    text.textLine("")
-    text.textLine(f"{nom} {prenom} (matricule : {matricule})")
-    text.textLine("")
-    text.textLine(f"est inscrit(e) pour l'année académique : {annee}")
-    text.textLine(f"Filière : {fcode} - {fnom}")
-    text.textLine(f"Niveau : {ncode} - {nnom}")
-    text.textLine(f"Statut : {statut}")
-    text.textLine("")
-    text.textLine("Fait pour servir et valoir ce que de droit.")
-    c.drawText(text)
 
-    c.setFont("Helvetica", 10)
-    c.drawString(2 * cm, 4 * cm, "Signature : ____________________________")
+class TeacherService:
+    """Enseignants et leurs affectations (enseignements) à un module, un groupe et une année."""
 
-    c.save()
+    def rows(self) -> list:
+        """[(id, nom, prénom, email ou '')] par nom."""
+        return fetch_rows("SELECT id, nom, prenom, COALESCE(email,'') FROM enseignants ORDER BY nom, prenom")
+
+    def get(self, enseignant_id):
+        return _fetch_one("SELECT nom, prenom, email FROM enseignants WHERE id=?", (enseignant_id,))
+
+    def create(self, nom, prenom, email=None) -> int:
+        nom, prenom = (nom or "").strip(), (prenom or "").strip()
+        if not nom or not prenom:
+            raise ValueError("Nom et prénom obligatoires.")
+        return _execute("INSERT INTO enseignants (nom, prenom, email) VALUES (?, ?, ?)", (nom, prenom, email or None))
+
+    def delete(self, enseignant_id):
+        """Supprime l'enseignant et ses affectations."""
+        _execute("DELETE FROM enseignants WHERE id=?", (enseignant_id,))
+
+    def assignments(self) -> list:
+        """[(id, enseignant, module, groupe, année)], les plus récentes d'abord."""
+        return fetch_rows("""
+            SELECT en.id, e.nom || ' ' || e.prenom, m.code || ' - ' || m.nom,
+                COALESCE(en.groupe,''), COALESCE(en.annee_academique,'')
+            FROM enseignements en
+            JOIN enseignants e ON e.id=en.enseignant_id
+            JOIN modules m ON m.id=en.module_id
+            ORDER BY en.id DESC
+        """)
+
+    def get_assignment(self, affectation_id):
+        """(enseignant_id, module_id, filiere_id, niveau_id, groupe, année) ou None."""
+        return _fetch_one("""
+            SELECT en.enseignant_id, en.module_id, m.filiere_id, m.niveau_id, en.groupe, en.annee_academique 
+            FROM enseignements en
+            JOIN modules m ON m.id = en.module_id
+            WHERE en.id=?
+        """, (affectation_id,))
+
+    def save_assignment(self, enseignant_id, module_id, groupe=None, annee=None, affectation_id=None) -> int:
+        if not enseignant_id or not module_id:
+            raise ValueError("Enseignant et module obligatoires.")
+        if affectation_id:
+            _execute("""
+                UPDATE enseignements SET enseignant_id=?, module_id=?, groupe=?, annee_academique=? WHERE id=?
+            """, (enseignant_id, module_id, groupe, annee, affectation_id))
+            return affectation_id
+        return _execute("""
+            INSERT INTO enseignements (enseignant_id, module_id, groupe, annee_academique)
+            VALUES (?, ?, ?, ?)
+        """, (enseignant_id, module_id, groupe, annee))
+
+    def delete_assignment(self, affectation_id):
+        _execute("DELETE FROM enseignements WHERE id=?", (affectation_id,))
+
+    def specialite_choices(self, filiere_id) -> list:
+        """[(id, nom)] des spécialités d'une filière."""
+        return fetch_rows("SELECT id, nom FROM specialites WHERE filiere_id=? ORDER BY nom", (filiere_id,))
+
+
+class CalendarService:
+    """Calendrier académique : semestres et leurs périodes (cours, examens, vacances...)."""
+
+    def semestres(self) -> list:
+        """[(id, code, libellé ou '', début, fin)] par date de début."""
+        return fetch_rows("SELECT id, code, COALESCE(libelle,''), date_debut, date_fin FROM semestres ORDER BY date_debut")
+
+    def save_semestre(self, code, libelle, date_debut, date_fin, semestre_id=None) -> int:
+        if not code or not date_debut or not date_fin:
+            raise ValueError("Code + dates début/fin obligatoires.")
+        values = (code, libelle or None, date_debut, date_fin)
+        if semestre_id:
+            _execute("""
+                UPDATE semestres SET code=?, libelle=?, date_debut=?, date_fin=?
+                WHERE id=?
+            """, values + (semestre_id,))
+            return semestre_id
+        return _execute("INSERT INTO semestres (code, libelle, date_debut, date_fin) VALUES (?, ?, ?, ?)", values)
+
+    def delete_semestre(self, semestre_id):
+        """Les périodes du semestre suivent en cascade."""
+        _execute("DELETE FROM semestres WHERE id=?", (semestre_id,))
+
+    def periodes(self) -> list:
+        """[(id, code semestre, type, libellé ou '', début, fin)] par date de début."""
+        return fetch_rows("""
+            SELECT p.id, s.code, p.type, COALESCE(p.libelle,''), p.date_debut, p.date_fin
+            FROM periodes p
+            JOIN semestres s ON s.id=p.semestre_id
+            ORDER BY p.date_debut
+        """)
+
+    def periode_semestre(self, periode_id):
+        row = _fetch_one("SELECT semestre_id FROM periodes WHERE id=?", (periode_id,))
+        return row[0] if row else None
+
+    def save_periode(self, semestre_id, type_periode, libelle, date_debut, date_fin, periode_id=None) -> int:
+        if not semestre_id or not type_periode or not date_debut or not date_fin:
+            raise ValueError("Semestre, type et dates obligatoires.")
+        values = (semestre_id, type_periode, libelle or None, date_debut, date_fin)
+        if periode_id:
+            _execute("""
+                UPDATE periodes SET semestre_id=?, type=?, libelle=?, date_debut=?, date_fin=?
+                WHERE id=?
+            """, values + (periode_id,))
+            return periode_id
+        return _execute("""
+            INSERT INTO periodes (semestre_id, type, libelle, date_debut, date_fin)
+            VALUES (?, ?, ?, ?, ?)
+        """, values)
+
+    def delete_periode(self, periode_id):
+        _execute("DELETE FROM periodes WHERE id=?", (periode_id,))
+
+
+class UserService:
+    """Comptes de connexion : création, modification, activation et authentification."""
+
+    # Mot de passe donné par reset_password
+    RESET_PASSWORD = "Password123"
+
+    def authenticate(self, username, password) -> Optional[str]:
+        """Rôle d'un compte actif dont le mot de passe correspond, sinon None."""
+        row = _fetch_one("""
+            SELECT role FROM users
+            WHERE username = ? AND password_hash = ? AND actif = 1
+        """, (username, hash_password(password)))
+        return row[0] if row else None
+
+    def rows(self) -> list:
+        """[(id, identifiant, rôle, nom complet, email ou '', Actif/Inactif)], les plus récents d'abord."""
+        return fetch_rows("""
+            SELECT id, username, role, COALESCE(nom,'') || ' ' || COALESCE(prenom,''), 
+                   COALESCE(email,''), CASE actif WHEN 1 THEN 'Actif' ELSE 'Inactif' END
+            FROM users
+            ORDER BY id DESC
+        """)
+
+    def get(self, user_id):
+        """(identifiant, rôle, nom, prénom, email) ou None."""
+        return _fetch_one("SELECT username, role, nom, prenom, email FROM users WHERE id=?", (user_id,))
+
+    def create(self, username, password, role, nom=None, prenom=None, email=None) -> int:
+        if not username or not password:
+            raise ValueError("Nom d'utilisateur et mot de passe obligatoires.")
+        return _execute("""
+            INSERT INTO users (username, password_hash, role, nom, prenom, email, date_creation, actif)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (username, hash_password(password), role, nom or None, prenom or None, email or None, now_iso(), 1))
+
+    def update(self, user_id, username, role, nom=None, prenom=None, email=None, password=None):
+        """Le mot de passe n'est changé que s'il est renseigné."""
+        if password:
+            _execute("UPDATE users SET username=?, password_hash=?, role=?, nom=?, prenom=?, email=? WHERE id=?",
+                     (username, hash_password(password), role, nom, prenom, email, user_id))
+        else:
+            _execute("UPDATE users SET username=?, role=?, nom=?, prenom=?, email=? WHERE id=?",
+                     (username, role, nom, prenom, email, user_id))
+
+    def reset_password(self, user_id) -> str:
+        """Remet RESET_PASSWORD et le retourne."""
+        _execute("UPDATE users SET password_hash=? WHERE id=?", (hash_password(self.RESET_PASSWORD), user_id))
+        return self.RESET_PASSWORD
+
+    def is_active(self, user_id) -> Optional[bool]:
+        """None si le compte n'existe pas."""
+        row = _fetch_one("SELECT actif FROM users WHERE id=?", (user_id,))
+        return row[0] == 1 if row else None
+
+    def set_active(self, user_id, active: bool):
+        _execute("UPDATE users SET actif=? WHERE id=?", (1 if active else 0, user_id))
+
+
+# CLIENT DU SERVEUR API
+
+# Poste « client léger » : avec le paramètre serveur_api renseigné, les écritures sur
+# étudiants, inscriptions, notes et absences passent par le serveur (server.py), seul
+# écrivain de la base. Les lectures restent locales (WAL : elles ne bloquent pas l'écrivain).
+
+API_TIMEOUT = 30
+
+
+class ApiClient:
+    """Requêtes JSON vers le serveur API ; les erreurs reprennent les exceptions des services."""
+
+    def __init__(self, url: str, token: str, timeout: float = API_TIMEOUT):
+        self.url = url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    def request(self, method, path, payload=None, query=None):
+        """Réponse JSON décodée ; serveur injoignable ou muet : ConnectionError."""
+        import socket
+        from urllib.error import HTTPError, URLError
+        from urllib.parse import urlencode
+        from urllib.request import Request, urlopen
+
+        url = self.url + path
+        if query:
+            url += "?" + urlencode({k: v for k, v in query.items() if v is not None})
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        req = Request(url, data=data, method=method, headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.token}",
+        })
+        try:
+            with urlopen(req, timeout=self.timeout) as resp:
+                body = resp.read()
+        except HTTPError as e:
+            try:
+                message = json.loads(e.read().decode("utf-8")).get("erreur", e.reason)
+            except ValueError:
+                message = e.reason
+            if e.code == 400:
+                raise ValueError(message)
+            if e.code == 401:
+                raise PermissionError(f"Serveur API : {message}")
+            if e.code == 404:
+                raise LookupError(message)
+            if e.code == 409:
+                raise sqlite3.IntegrityError(message)
+            raise RuntimeError(f"Serveur API ({e.code}) : {message}")
+        except URLError as e:
+            raise ConnectionError(f"Serveur API injoignable ({self.url}) : {e.reason}")
+        except socket.timeout:
+            raise ConnectionError(f"Serveur API sans réponse ({self.url}) après {self.timeout:g} s")
+        return json.loads(body.decode("utf-8")) if body else None
+
+    def ping(self) -> bool:
+        try:
+            return bool(self.request("GET", "/sante"))
+        except PermissionError:
+            raise
+        except OSError:
+            return False
+
+
+class RemoteStudentService(StudentService):
+    def __init__(self, client: ApiClient):
+        self.client = client
+
+    def create(self, nom, prenom, email, **fields) -> Student:
+        return Student(**self.client.request("POST", "/etudiants", dict(fields, nom=nom, prenom=prenom, email=email)))
+
+    def delete(self, etudiant_id):
+        self.client.request("DELETE", f"/etudiants/{etudiant_id}")
+
+    def import_csv(self, filepath, progress=None) -> ImportReport:
+        # Le contenu voyage dans la requête : le serveur ne lit aucun fichier désigné par le client
+        with open(filepath, "r", encoding="utf-8-sig", newline="") as f:
+            content = f.read()
+        report = self.client.request("POST", "/etudiants/import", {"contenu": content})
+        return ImportReport(report["inserted"], [tuple(r) for r in report["rejects"]])
+
+
+class RemoteEnrollmentService(EnrollmentService):
+    def __init__(self, client: ApiClient):
+        self.client = client
+
+    def save(self, etudiant_id, filiere_id, niveau_id, annee, groupe_id=None, inscription_id=None) -> int:
+        payload = {"etudiant_id": etudiant_id, "filiere_id": filiere_id, "niveau_id": niveau_id,
+                   "annee": annee, "groupe_id": groupe_id}
+        if inscription_id:
+            return self.client.request("PUT", f"/inscriptions/{inscription_id}", payload)["id"]
+        return self.client.request("POST", "/inscriptions", payload)["id"]
+
+    def delete(self, inscription_id):
+        self.client.request("DELETE", f"/inscriptions/{inscription_id}")
+
+
+class RemoteGradeService(GradeService):
+    def __init__(self, client: ApiClient, changed_by: str):
+        super().__init__(changed_by)
+        self.client = client
+
+    def add(self, etudiant_id, module_id, note, type_evaluation=None, annee=None) -> int:
+        return self.client.request("POST", "/notes", {
+            "etudiant_id": etudiant_id, "module_id": module_id, "note": note,
+            "type_evaluation": type_evaluation, "annee": annee, "utilisateur": self.changed_by,
+        })["id"]
+
+    def update(self, note_id, note, type_evaluation=None, annee=None):
+        self.client.request("PUT", f"/notes/{note_id}", {
+            "note": note, "type_evaluation": type_evaluation, "annee": annee, "utilisateur": self.changed_by,
+        })
+
+    def delete(self, note_id):
+        self.client.request("DELETE", f"/notes/{note_id}", query={"utilisateur": self.changed_by})
+
+
+class RemoteAbsenceService(AbsenceService):
+    def __init__(self, client: ApiClient):
+        self.client = client
+
+    def save(self, etudiant_id, module_id, date_absence, justifiee=0, motif=None, absence_id=None) -> int:
+        payload = {"etudiant_id": etudiant_id, "module_id": module_id, "date_absence": date_absence,
+                   "justifiee": justifiee, "motif": motif}
+        if absence_id:
+            return self.client.request("PUT", f"/absences/{absence_id}", payload)["id"]
+        return self.client.request("POST", "/absences", payload)["id"]
+
+    def delete(self, absence_id):
+        self.client.request("DELETE", f"/absences/{absence_id}")
+
+
+def connect_api_server():
+    """Client du serveur configuré dans serveur_api, ou None (accès direct) s'il est vide ou injoignable."""
+    url = str(get_parametre("serveur_api", "") or "").strip()
+    if not url:
+        return None
+    token = str(get_parametre("serveur_api_jeton", "") or "").strip()
+    if not token:
+        print("Jeton du serveur API absent (serveur_api_jeton) : accès direct à la base")
+        return None
+    client = ApiClient(url, token)
+    try:
+        reachable = client.ping()
+    except PermissionError as e:
+        print(f"{e} : accès direct à la base")
+        return None
+    if not reachable:
+        print(f"Serveur API injoignable ({url}) : accès direct à la base")
+        return None
+    print(f"✓ Écritures via le serveur API {url}")
+    return client
 
 
 # DATE PICKER WIDGET
@@ -881,44 +3342,480 @@ class DatePickerEntry(ttk.Frame):
         except Exception:
             return ''
 
-    def set(self, value):
-        # Accept 'YYYY-MM-DD' (ISO). Silently ignore invalids.
+    def set(self, value):
+        # Accept 'YYYY-MM-DD' (ISO). Silently ignore invalids.
+        try:
+            parts = value.split('-')
+            if len(parts) == 3:
+                y, m, d = int(parts[0]), int(parts[1]), int(parts[2])
+                self.year_var.set(str(y))
+                self.month_var.set(f"{m:02d}")
+                self.day_var.set(f"{d:02d}")
+                self._adjust_day_limit()
+        except Exception:
+            pass
+
+    def delete(self, start=None, end=None):
+        self.day_var.set('')
+        self.month_var.set('')
+        self.year_var.set('')
+
+
+# YEAR COMBOBOX WIDGET
+
+class YearCombobox(ttk.Combobox):
+    """Combobox for year selection up to current year"""
+    def __init__(self, parent, start_year=1980, **kwargs):
+        current_year = datetime.now().year
+        years = [str(y) for y in range(current_year, start_year - 1, -1)]
+        super().__init__(parent, values=years, **kwargs)
+        self.set(str(current_year))
+
+
+# NOTIFICATIONS DE CHANGEMENTS
+
+# Opérations d'écriture publiées : insert, update, delete
+UPDATE_DELETE = ("update", "delete")
+
+
+class ChangeBus:
+    """Relaie les écritures en base aux vues qui en dépendent.
+
+    Chaque écriture publie les tables touchées et l'opération effectuée ;
+    seules les vues abonnées à l'une de ces tables sont rafraîchies.
+    """
+
+    def __init__(self):
+        self._subscribers = []  # (nom, {table: opérations ou None}, callback)
+
+    def subscribe(self, name, dependencies, callback):
+        """`dependencies` : {table: None (toute opération) ou tuple d'opérations}"""
+        self._subscribers.append((name, dependencies, callback))
+
+    @staticmethod
+    def _matches(dependencies, table, op):
+        if table not in dependencies:
+            return False
+        ops = dependencies[table]
+        return ops is None or op is None or op in ops
+
+    def publish(self, *changes, skip=()):
+        """Rafraîchit les vues concernées par `changes`.
+
+        `changes` : tuples (table, opération) ou simples noms de table (toute opération).
+        `skip` : vues déjà mises à jour par l'appelant (lignes patchées directement).
+        Retourne la liste des vues rafraîchies.
+        """
+        changes = [(c, None) if isinstance(c, str) else c for c in changes]
+        refreshed = []
+        for name, dependencies, callback in self._subscribers:
+            if name in skip:
+                continue
+            if any(self._matches(dependencies, table, op) for table, op in changes):
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"Erreur rafraîchissement {name}: {e}")
+                refreshed.append(name)
+        return refreshed
+
+
+# VIRTUAL TREEVIEW WIDGET
+
+def keyset_page_sql(sql, params, keys, bound=None, after=True, limit=200):
+    """(requête, paramètres) d'une page de `sql` triée par clé décroissante, après (ou avant) `bound`.
+
+    `sql` se termine par une clause WHERE ; `keys` : (expression SQL, indice de colonne).
+    """
+    params = list(params)
+    if bound is not None:
+        exprs = ", ".join(expr for expr, _ in keys)
+        marks = ", ".join("?" for _ in keys)
+        sql += f" AND ({exprs}) {'<' if after else '>'} ({marks})"
+        params.extend(bound)
+    order = "DESC" if after else "ASC"
+    sql += " ORDER BY " + ", ".join(f"{expr} {order}" for expr, _ in keys) + " LIMIT ?"
+    params.append(limit)
+    return sql, params
+
+
+def fetch_keyset_page(sql, params, keys, bound=None, after=True, limit=200):
+    """Lit une page de `sql` (voir keyset_page_sql)."""
+    sql, params = keyset_page_sql(sql, params, keys, bound, after, limit)
+    conn = db_connect()
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+
+class VirtualTreeview(ttk.Treeview):
+    """Treeview paginé pour les grandes listes.
+
+    Seule une fenêtre de `page_size * max_pages` lignes est gardée dans Tk ;
+    les pages suivantes (ou précédentes) sont lues au fil du défilement avec
+    une pagination par clé : WHERE (clé) < (dernière clé lue) ORDER BY clé DESC
+    LIMIT n, sans OFFSET. Les lignes sont triées par clé décroissante.
+    """
+
+    def __init__(self, parent, page_size=200, max_pages=5, **kwargs):
+        self._user_yscroll = kwargs.pop("yscrollcommand", None)
+        super().__init__(parent, yscrollcommand=self._on_yscroll, **kwargs)
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._sql = None
+        self._params = ()
+        self._keys = ()
+        self._row_keys = {}  # iid -> valeurs de clé de la ligne
+        self._more_after = False
+        self.has_rows_before = False
+        self._loading = False
+
+    def configure(self, cnf=None, **kw):
+        # Le défilement reste intercepté pour déclencher le chargement des pages
+        if "yscrollcommand" in kw:
+            self._user_yscroll = kw.pop("yscrollcommand")
+        return super().configure(cnf, **kw)
+
+    config = configure
+
+    def set_query(self, sql, params=(), keys=(("id", 0),), rows=None):
+        """Affiche le résultat de `sql` à partir de la première page.
+
+        `sql` : SELECT se terminant par une clause WHERE (au besoin 'WHERE 1=1'),
+        sans ORDER BY ni LIMIT.
+        `keys` : (expression SQL, indice de la colonne dans la ligne) formant une
+        clé unique, par ex. (("a.date_absence", 3), ("a.id", 0)).
+        `rows` : première page déjà lue (par exemple en arrière-plan).
+        """
+        self._sql = sql
+        self._params = tuple(params)
+        self._keys = tuple(keys)
+        self.reload(rows)
+
+    def set_rows(self, rows):
+        """Affiche une liste déjà complète (sans pagination)."""
+        self._sql = None
+        super().delete(*self.get_children())
+        self._row_keys.clear()
+        self.has_rows_before = False
+        self._more_after = False
+        for r in rows:
+            self.insert("", "end", iid=r[0], values=r)
+        self.yview_moveto(0)
+
+    def reload(self, rows=None):
+        super().delete(*self.get_children())
+        self._row_keys.clear()
+        self.has_rows_before = False
+        self._more_after = False
+        if self._sql is None:
+            return
+        if rows is None:
+            rows = self._fetch(None, after=True)
+        for r in rows:
+            self.insert("", "end", iid=r[0], values=r)
+        self._more_after = len(rows) == self.page_size
+        self.yview_moveto(0)
+
+    def insert(self, parent, index, iid=None, **kw):
+        item = super().insert(parent, index, iid=iid, **kw)
+        if self._keys and "values" in kw:
+            self._row_keys[item] = tuple(kw["values"][i] for _, i in self._keys)
+        return item
+
+    def delete(self, *items):
+        super().delete(*items)
+        for item in items:
+            self._row_keys.pop(item, None)
+
+    def _fetch(self, bound, after):
+        return fetch_keyset_page(self._sql, self._params, self._keys, bound, after, self.page_size)
+
+    def _edge_key(self, items):
+        for item in items:
+            if item in self._row_keys:
+                return self._row_keys[item]
+        return None
+
+    def _on_yscroll(self, first, last):
+        if self._user_yscroll:
+            self._user_yscroll(first, last)
+        if self._loading:
+            return
+        if float(last) >= 0.9 and self._more_after:
+            self._loading = True
+            self.after_idle(self._load_after)
+        elif float(first) <= 0.1 and self.has_rows_before:
+            self._loading = True
+            self.after_idle(self._load_before)
+
+    def _keep_in_view(self, anchor):
+        children = self.get_children()
+        if anchor and self.exists(anchor) and children:
+            self.yview_moveto(self.index(anchor) / len(children))
+
+    def _load_after(self):
+        try:
+            children = self.get_children()
+            rows = self._fetch(self._edge_key(reversed(children)), after=True)
+            self._more_after = len(rows) == self.page_size
+            for r in rows:
+                self.insert("", "end", iid=r[0], values=r)
+
+            children = self.get_children()
+            excess = len(children) - self.page_size * self.max_pages
+            if excess > 0:
+                anchor = self.identify_row(1)
+                self.delete(*children[:excess])
+                self.has_rows_before = True
+                self._keep_in_view(anchor)
+        finally:
+            self._loading = False
+
+    def _load_before(self):
         try:
-            parts = value.split('-')
-            if len(parts) == 3:
-                y, m, d = int(parts[0]), int(parts[1]), int(parts[2])
-                self.year_var.set(str(y))
-                self.month_var.set(f"{m:02d}")
-                self.day_var.set(f"{d:02d}")
-                self._adjust_day_limit()
-        except Exception:
-            pass
+            children = self.get_children()
+            rows = self._fetch(self._edge_key(children), after=False)
+            self.has_rows_before = len(rows) == self.page_size
+            anchor = self.identify_row(1)
+            for r in rows:
+                self.insert("", 0, iid=r[0], values=r)
+
+            children = self.get_children()
+            excess = len(children) - self.page_size * self.max_pages
+            if excess > 0:
+                self.delete(*children[-excess:])
+                self._more_after = True
+            self._keep_in_view(anchor)
+        finally:
+            self._loading = False
 
-    def delete(self, start=None, end=None):
-        self.day_var.set('')
-        self.month_var.set('')
-        self.year_var.set('')
 
+# BACKGROUND EXECUTOR
 
-# YEAR COMBOBOX WIDGET
+class BackgroundTask:
+    """Demande soumise à BackgroundExecutor."""
 
-class YearCombobox(ttk.Combobox):
-    """Combobox for year selection up to current year"""
-    def __init__(self, parent, start_year=1980, **kwargs):
-        current_year = datetime.now().year
-        years = [str(y) for y in range(current_year, start_year - 1, -1)]
-        super().__init__(parent, values=years, **kwargs)
-        self.set(str(current_year))
+    def __init__(self, key, on_done, on_error, on_progress):
+        self.key = key
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.cancelled = False
+        self.thread_id = None  # thread de travail tant que la tâche s'exécute
+        self.future = None
+
+
+class BackgroundExecutor:
+    """Exécute les requêtes lentes sur des threads de travail.
+
+    Les résultats reviennent au thread Tk par une file relevée avec after() :
+    `on_done`, `on_error` et `on_progress` s'exécutent toujours dans la boucle Tk.
+    Une nouvelle demande de même `key` annule la précédente ; si celle-ci est
+    déjà en cours, sa requête SQLite est interrompue.
+    """
+
+    def __init__(self, widget, workers=2, poll_ms=40, on_busy=None):
+        self._widget = widget
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._latest = {}  # clé -> dernière tâche soumise
+        self._poll_ms = poll_ms
+        self._polling = False
+        self._on_busy = on_busy
+
+    def submit(self, fn, *args, key=None, on_done=None, on_error=None, on_progress=None):
+        """Lance fn(*args) en arrière-plan.
+
+        Avec `on_progress`, fn reçoit en plus progress=callable(fait, total).
+        """
+        if key is not None and key in self._latest:
+            self.cancel(self._latest[key])
+        task = BackgroundTask(key, on_done, on_error, on_progress)
+        kwargs = {}
+        if on_progress is not None:
+            kwargs["progress"] = lambda done, total: self._results.put((task, "progress", (done, total)))
+        self._pending.add(task)
+        if key is not None:
+            self._latest[key] = task
+        task.future = self._pool.submit(self._run, task, fn, args, kwargs)
+        self._notify_busy()
+        self._schedule_poll()
+        return task
+
+    def _run(self, task, fn, args, kwargs):
+        with self._lock:
+            if task.cancelled:
+                return
+            task.thread_id = threading.get_ident()
+        try:
+            self._results.put((task, "done", fn(*args, **kwargs)))
+        except Exception as e:
+            self._results.put((task, "error", e))
+        finally:
+            with self._lock:
+                task.thread_id = None
+
+    def cancel(self, task):
+        with self._lock:
+            task.cancelled = True
+            if task.thread_id is not None:
+                DB_POOL.interrupt_thread(task.thread_id)
+        if task.future is not None:
+            task.future.cancel()
+        self._forget(task)
+
+    def cancel_key(self, key):
+        task = self._latest.get(key)
+        if task is not None:
+            self.cancel(task)
+
+    def cancel_all(self):
+        for task in list(self._pending):
+            self.cancel(task)
+
+    def shutdown(self):
+        self.cancel_all()
+        self._pool.shutdown(wait=False)
+
+    def _forget(self, task):
+        self._pending.discard(task)
+        if task.key is not None and self._latest.get(task.key) is task:
+            del self._latest[task.key]
+        self._notify_busy()
+
+    def _notify_busy(self):
+        if self._on_busy:
+            self._on_busy(len(self._pending))
+
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            self._widget.after(self._poll_ms, self._poll)
+
+    def _poll(self):
+        self._polling = False
+        while True:
+            try:
+                task, kind, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if task.cancelled:
+                continue
+            if kind == "progress":
+                if task.on_progress:
+                    task.on_progress(*value)
+                continue
+            self._forget(task)
+            if kind == "done":
+                if task.on_done:
+                    task.on_done(value)
+            elif task.on_error:
+                task.on_error(value)
+            else:
+                print(f"Erreur tâche en arrière-plan: {value}")
+        if self._pending:
+            self._schedule_poll()
 
 
 # MAIN APP
 
 class App(tk.Toplevel):
+    # Au-delà, un résultat de recherche est paginé au lieu d'être gardé en cache
+    SEARCH_CACHE_ROWS = 2000
+    SEARCH_CACHE_ENTRIES = 32
+
+    # Vue -> tables lues : une écriture sur l'une d'elles rafraîchit la vue.
+    # None = toute opération ; UPDATE_DELETE = seuls les libellés affichés changent.
+    VIEW_DEPENDENCIES = {
+        "clear_search_cache": {"etudiants": None, "inscriptions": None, "filieres": UPDATE_DELETE,
+                               "niveaux": UPDATE_DELETE, "groupes": UPDATE_DELETE},
+        "refresh_etudiants_list": {"etudiants": None, "inscriptions": None, "filieres": UPDATE_DELETE,
+                                   "niveaux": UPDATE_DELETE, "groupes": UPDATE_DELETE},
+        "load_filter_options": {"filieres": None, "niveaux": None, "groupes": None},
+        "refresh_filieres": {"filieres": None},
+        "refresh_niveaux": {"niveaux": None},
+        "refresh_groupes": {"groupes": None, "filieres": UPDATE_DELETE, "niveaux": UPDATE_DELETE},
+        "populate_semestres": {"modules": None, "niveaux": None},
+        "refresh_inscriptions_lists": {"etudiants": None, "inscriptions": None, "filieres": None,
+                                       "niveaux": None, "groupes": None},
+        "refresh_modules_list": {"modules": None, "filieres": UPDATE_DELETE, "niveaux": UPDATE_DELETE},
+        "refresh_notes_lists": {"notes": None, "etudiants": UPDATE_DELETE, "modules": UPDATE_DELETE},
+        "refresh_absences": {"absences": None, "etudiants": UPDATE_DELETE, "modules": UPDATE_DELETE},
+        "refresh_absence_stats": {"etudiants": ("insert",)},
+        "refresh_enseignants": {"enseignants": None, "enseignements": None, "modules": None,
+                                "filieres": None, "niveaux": None, "groupes": None},
+        "refresh_calendrier": {"semestres": None, "periodes": None},
+        "refresh_specialites_list": {"specialites": None, "filieres": UPDATE_DELETE},
+        "refresh_users_list": {"users": None},
+    }
+
+    # Partie du tableau de bord -> tables lues : seules les parties touchées sont relues.
+    # Les compteurs ne changent qu'à l'ajout ou à la suppression d'une ligne.
+    DASHBOARD_DEPENDENCIES = {
+        "nb_etudiants": {"etudiants": ("insert", "delete")},
+        "nb_modules": {"modules": ("insert", "delete")},
+        "nb_inscriptions": {"inscriptions": ("insert", "delete")},
+        "nb_absences": {"absences": ("insert", "delete")},
+        "top_abs": {"absences": None, "etudiants": UPDATE_DELETE},
+        "mentions": {"notes": None},
+        "absences_niveaux": {"absences": None, "inscriptions": None, "niveaux": UPDATE_DELETE},
+    }
+
+    # Onglets : (clé, libellé, méthode de construction, vues qui alimentent ses widgets).
+    # Un onglet est construit et rempli à sa première activation. Une vue invalidée alors
+    # qu'aucun onglet affiché n'en dépend est marquée périmée et rafraîchie au prochain
+    # affichage d'un onglet qui l'utilise. Les vues sont listées dans l'ordre de refresh_all.
+    TABS = [
+        ("etudiants", "Étudiants", "build_etudiants_tab",
+         ("refresh_etudiants_list", "load_filter_options")),
+        ("academique", "Filières & Niveaux", "build_academique_tab",
+         ("refresh_filieres", "refresh_niveaux", "refresh_groupes", "refresh_specialites_list")),
+        ("inscriptions", "Inscriptions", "build_inscriptions_tab",
+         ("refresh_filieres", "refresh_niveaux", "refresh_groupes", "refresh_inscriptions_lists")),
+        ("notes", "Modules & Notes", "build_notes_tab",
+         ("refresh_filieres", "refresh_niveaux", "populate_semestres", "refresh_inscriptions_lists",
+          "refresh_modules_list", "refresh_notes_lists")),
+        ("absences", "Absences", "build_absences_tab",
+         ("refresh_inscriptions_lists", "refresh_modules_list", "refresh_absences", "refresh_absence_stats")),
+        ("enseignants", "Enseignants", "build_enseignants_tab",
+         ("refresh_modules_list", "refresh_enseignants")),
+        ("calendrier", "Calendrier", "build_calendrier_tab", ("refresh_calendrier",)),
+        ("dashboard", "Dashboard", "build_dashboard_tab", ("refresh_dashboard",)),
+        ("documents", "Documents", "build_documents_tab",
+         ("refresh_filieres", "refresh_niveaux", "refresh_groupes", "refresh_inscriptions_lists",
+          "refresh_documents_lists")),
+        ("users", "Gestion utilisateurs", "build_users_tab", ("refresh_users_list",)),
+    ]
+
     def __init__(self, parent, username: str, root=None):
         super().__init__(parent)
         self.username = username
         self.root = root
 
+        # Accès aux données (voir SERVICES) ; écritures via le serveur API s'il est configuré
+        api = self.api = connect_api_server()
+        if api is None:
+            self.students = StudentService()
+            self.enrollments = EnrollmentService()
+            self.grades = GradeService(changed_by=username)
+            self.absences = AbsenceService()
+        else:
+            self.students = RemoteStudentService(api)
+            self.enrollments = RemoteEnrollmentService(api)
+            self.grades = RemoteGradeService(api, changed_by=username)
+            self.absences = RemoteAbsenceService(api)
+        self.documents = DocumentService()
+        self.structure = StructureService()
+        self.modules = ModuleService()
+        self.teachers = TeacherService()
+        self.calendar = CalendarService()
+        self.users = UserService()
+
         self.title("Gestion des étudiants")
         self.geometry("1400x800")
         self.resizable(True, True)
@@ -930,19 +3827,28 @@ class App(tk.Toplevel):
         self.bind("<F11>", self.toggle_fullscreen)
         self.fullscreen_state = False
 
-        self.tabs = ttk.Notebook(self)
-        self.tabs.pack(fill="both", expand=True, padx=10, pady=10)
+        # Barre d'état : indicateur des requêtes en arrière-plan
+        status = ttk.Frame(self, padding=(10, 0, 10, 6))
+        status.pack(side="bottom", fill="x")
+        self.lbl_status = ttk.Label(status, text="")
+        self.lbl_status.pack(side="left")
+        self.progress = ttk.Progressbar(status, mode="indeterminate", length=160)
+        self.progress.pack(side="right")
+        self.executor = BackgroundExecutor(self, on_busy=self.on_background_busy)
 
-        self.tab_etudiants = ttk.Frame(self.tabs)
-        self.tab_academique = ttk.Frame(self.tabs)
-        self.tab_inscriptions = ttk.Frame(self.tabs)
-        self.tab_notes = ttk.Frame(self.tabs)
-        self.tab_absences = ttk.Frame(self.tabs)
-        self.tab_enseignants = ttk.Frame(self.tabs)
-        self.tab_calendrier = ttk.Frame(self.tabs)
-        self.tab_dashboard = ttk.Frame(self.tabs)
-        self.tab_documents = ttk.Frame(self.tabs)
-        self.tab_users = ttk.Frame(self.tabs)
+        # Recherche d'étudiants : délai de frappe et résultats complets par critères
+        try:
+            self.search_delay_ms = int(get_parametre("recherche_delai_ms", DEFAULT_SEARCH_DELAY_MS))
+        except (TypeError, ValueError):
+            self.search_delay_ms = DEFAULT_SEARCH_DELAY_MS
+        self._search_after_id = None
+        self._search_cache = {}  # (texte, filière, niveau, statut, groupe) -> lignes
+        self._search_shown = None
+        self._dashboard_data = {}  # dernière valeur de chaque partie du tableau de bord
+        self._dashboard_stale = set()  # parties invalidées par une écriture, relues au prochain idle
+        self._dashboard_loading = set()  # parties en cours de lecture
+        self._dashboard_charts = {}  # nom -> FigureCanvasTkAgg, réutilisé d'un rafraîchissement à l'autre
+        self._dashboard_after = None  # relecture des parties périmées programmée
 
         # Initialize filter variables BEFORE builds
         self.var_search_name = tk.StringVar()
@@ -951,29 +3857,30 @@ class App(tk.Toplevel):
         self.var_filter_statut = tk.StringVar()
         self.var_filter_groupe = tk.StringVar()
 
-        self.tabs.add(self.tab_etudiants, text="Étudiants")
-        self.tabs.add(self.tab_academique, text="Filières & Niveaux")
-        self.tabs.add(self.tab_inscriptions, text="Inscriptions")
-        self.tabs.add(self.tab_notes, text="Modules & Notes")
-        self.tabs.add(self.tab_absences, text="Absences")
-        self.tabs.add(self.tab_enseignants, text="Enseignants")
-        self.tabs.add(self.tab_calendrier, text="Calendrier")
-        self.tabs.add(self.tab_dashboard, text="Dashboard")
-        self.tabs.add(self.tab_documents, text="Documents")
-        self.tabs.add(self.tab_users, text="Gestion utilisateurs")
-
-        self.build_etudiants_tab()
-        self.build_academique_tab()
-        self.build_inscriptions_tab()
-        self.build_notes_tab()
-        self.build_absences_tab()
-        self.build_enseignants_tab()
-        self.build_calendrier_tab()
-        self.build_dashboard_tab()
-        self.build_documents_tab()
-        self.build_users_tab()
-
-        self.refresh_all()
+        # Onglets vides : chacun est construit à sa première activation (voir TABS)
+        self.tabs = ttk.Notebook(self)
+        self.tabs.pack(fill="both", expand=True, padx=10, pady=10)
+        self._tab_keys = {}  # chemin Tk du cadre -> clé d'onglet
+        self._view_tabs = {}  # vue -> onglets qui l'affichent
+        self._built_tabs = set()
+        self._stale_views = set()
+        for key, text, _, views in self.TABS:
+            frame = ttk.Frame(self.tabs)
+            setattr(self, f"tab_{key}", frame)
+            self.tabs.add(frame, text=text)
+            self._tab_keys[str(frame)] = key
+            for view in views:
+                self._view_tabs.setdefault(view, set()).add(key)
+
+        self.changes = ChangeBus()
+        for name, dependencies in self.VIEW_DEPENDENCIES.items():
+            self.changes.subscribe(name, dependencies, lambda name=name: self.request_view_refresh(name))
+        for part, dependencies in self.DASHBOARD_DEPENDENCIES.items():
+            self.changes.subscribe(f"dashboard:{part}", dependencies,
+                                   lambda part=part: self.invalidate_dashboard(part))
+
+        self.tabs.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        self.on_tab_changed()
 
     # UTIL
 
@@ -983,22 +3890,128 @@ class App(tk.Toplevel):
         part = s.split("-", 1)[0].strip()
         return int(part) if part.isdigit() else None
 
+    def patch_tree_row(self, tree, row, index="end"):
+        """Insère ou met à jour la ligne d'identifiant row[0] sans recharger la vue."""
+        iid = str(row[0])
+        if tree.exists(iid):
+            tree.item(iid, values=row)
+        elif not getattr(tree, "has_rows_before", False):
+            tree.insert("", index, iid=iid, values=row)
+
+    def remove_tree_row(self, tree, row_id):
+        iid = str(row_id)
+        if tree.exists(iid):
+            tree.delete(iid)
+
+    def on_background_busy(self, count):
+        if count:
+            self.lbl_status.config(text=f"Chargement… ({count})")
+            if str(self.progress.cget("mode")) == "indeterminate":
+                self.progress.start(15)
+        else:
+            self.lbl_status.config(text="")
+            self.progress.stop()
+            self.progress.config(mode="indeterminate", value=0)
+
+    def on_background_progress(self, done, total):
+        if total is None:
+            # Total inconnu : la barre reste en mode indéterminé
+            return
+        self.progress.stop()
+        self.progress.config(mode="determinate", maximum=max(total, 1), value=done)
+
+    def run_in_background(self, fn, *args, key=None, on_done=None, on_progress=None, error_title="Erreur"):
+        """Exécute fn hors du thread Tk ; les erreurs sont affichées dans une boîte de dialogue."""
+        return self.executor.submit(
+            fn, *args, key=key, on_done=on_done, on_progress=on_progress,
+            on_error=lambda e: messagebox.showerror(error_title, str(e)),
+        )
+
+    def run_write(self, fn, *args, on_done=None):
+        """Écriture par un service, hors du thread Tk (requête HTTP en mode serveur API).
+
+        Les erreurs (validation, conflit, serveur injoignable...) sont affichées par show_write_error.
+        """
+        def done(result):
+            self.set_offline(False)
+            if on_done:
+                on_done(result)
+        return self.executor.submit(fn, *args, on_done=done, on_error=self.show_write_error)
+
+    def show_write_error(self, e):
+        if isinstance(e, (ValueError, LookupError)):
+            message = str(e)
+        elif isinstance(e, sqlite3.IntegrityError):
+            message = f"Conflit avec les données existantes (doublon ou référence inconnue).\n{e}"
+        elif isinstance(e, PermissionError):
+            message = f"{e}\nVérifiez le paramètre serveur_api_jeton."
+        elif isinstance(e, ConnectionError) and self.api is not None:
+            # Le serveur est recontacté à chaque écriture : pas de bascule silencieuse vers la base
+            self.set_offline(True)
+            message = ("Ce poste est hors ligne : rien n'a été enregistré.\n"
+                       f"Réessayez quand le serveur ({self.api.url}) est de nouveau disponible.\n{e}")
+        else:
+            message = f"Erreur lors de l'enregistrement : {e}"
+        print(f"Erreur écriture: {e}")
+        messagebox.showerror("Erreur", message)
+
+    def set_offline(self, offline):
+        if self.api is not None:
+            self.title("Gestion des étudiants" + (" — serveur API hors ligne" if offline else ""))
+
+    def run_export(self, fn, *args, message="Export terminé.", progress=False):
+        """`progress` : fn accepte progress=callable(fait, total) et alimente la barre d'état."""
+        self.run_in_background(fn, *args, on_done=lambda _: messagebox.showinfo("OK", message),
+                               on_progress=self.on_background_progress if progress else None,
+                               error_title="Erreur export")
+
+    def publish_change(self, *changes, skip=()):
+        """Signale une écriture : seules les vues dépendantes sont rafraîchies."""
+        return self.changes.publish(*changes, skip=skip)
+
+    def current_tab(self):
+        """Clé de l'onglet affiché (voir TABS)."""
+        try:
+            return self._tab_keys.get(str(self.tabs.select()))
+        except tk.TclError:
+            return None
+
+    def tab_views(self, key):
+        return next(views for tab, _, _, views in self.TABS if tab == key)
+
+    def on_tab_changed(self, event=None):
+        """Construit l'onglet à sa première activation, sinon rafraîchit ses vues périmées."""
+        key = self.current_tab()
+        if key is None:
+            return
+        if key not in self._built_tabs:
+            build = next(method for tab, _, method, _ in self.TABS if tab == key)
+            getattr(self, build)()
+            self._built_tabs.add(key)
+            views = self.tab_views(key)
+        else:
+            views = [view for view in self.tab_views(key) if view in self._stale_views]
+        for view in views:
+            self._stale_views.discard(view)
+            getattr(self, view)()
+        if key == "dashboard" and "refresh_dashboard" not in views:
+            self.refresh_dashboard_stale()
+
+    def request_view_refresh(self, name):
+        """Rafraîchit la vue si l'onglet affiché en dépend ; sinon la marque périmée."""
+        tabs = self._view_tabs.get(name)
+        if tabs is None or self.current_tab() in tabs:
+            getattr(self, name)()
+        else:
+            self._stale_views.add(name)
+
     def refresh_all(self):
-        self.refresh_etudiants_list()
-        self.load_filter_options()
-        self.refresh_filieres()
-        self.refresh_niveaux()
-        self.refresh_groupes()
-        self.populate_semestres()
-        self.refresh_inscriptions_lists()
-        self.refresh_modules_list()
-        self.refresh_notes_lists()
-        self.refresh_absences()
-        self.refresh_enseignants()
-        self.refresh_calendrier()
-        self.refresh_dashboard()
-        self.refresh_documents_lists()
-        self.refresh_users_list()
+        """Rafraîchit les vues des onglets construits ; les autres seront remplis à leur activation."""
+        views = [view for _, _, _, tab_views in self.TABS for view in tab_views]
+        for view in dict.fromkeys(views):
+            if self._view_tabs[view] & self._built_tabs:
+                self._stale_views.discard(view)
+                getattr(self, view)()
 
     def toggle_fullscreen(self, event=None):
         """Toggle fullscreen mode with F11"""
@@ -1081,7 +4094,7 @@ class App(tk.Toplevel):
         ttk.Label(filter_frame, text="Recherche (nom/email):").grid(row=0, column=0, sticky="w", padx=4, pady=4)
         e_search = ttk.Entry(filter_frame, textvariable=self.var_search_name, width=25)
         e_search.grid(row=0, column=1, sticky="ew", padx=4, pady=4)
-        e_search.bind("<KeyRelease>", lambda e: self.apply_etudiants_filters())
+        e_search.bind("<KeyRelease>", lambda e: self.schedule_etudiants_search())
 
         ttk.Label(filter_frame, text="Filière:").grid(row=0, column=2, sticky="w", padx=4, pady=4)
         self.cb_filter_filiere = ttk.Combobox(filter_frame, textvariable=self.var_filter_filiere, width=15, state="readonly")
@@ -1106,11 +4119,15 @@ class App(tk.Toplevel):
 
         ttk.Button(filter_frame, text="Réinitialiser", command=self.reset_etudiants_filters).grid(row=2, column=2, columnspan=2, sticky="ew", padx=4, pady=4)
 
+        # Avertissement quand une recherche classée dépasse SEARCH_CACHE_ROWS résultats
+        self.lbl_search_limit = ttk.Label(filter_frame, text="", foreground="gray")
+        self.lbl_search_limit.grid(row=3, column=0, columnspan=4, sticky="w", padx=4)
+
         filter_frame.columnconfigure(1, weight=1)
         filter_frame.columnconfigure(3, weight=1)
 
         cols = ("id", "matricule", "nom", "prenom", "email", "telephone", "statut")
-        self.tree_etudiants = ttk.Treeview(right, columns=cols, show="headings")
+        self.tree_etudiants = VirtualTreeview(right, columns=cols, show="headings")
         for c in cols:
             self.tree_etudiants.heading(c, text=c)
             if c == "id":
@@ -1129,21 +4146,6 @@ class App(tk.Toplevel):
         
         ttk.Button(actions_frame, text="Supprimer l'étudiant sélectionné", command=self.delete_etudiant, bootstyle="danger").pack(side="right")        
 
-    def generate_matricule(self, nom: str, prenom: str) -> str:
-        base = f"ETU{nom[:2].upper()}{prenom[:2].upper()}"
-        conn = db_connect()
-        cur = conn.cursor()
-        i = 1
-        matricule = base
-        while True:
-            cur.execute("SELECT 1 FROM etudiants WHERE matricule = ?", (matricule,))
-            if cur.fetchone() is None:
-                break
-            i += 1
-            matricule = f"{base}{i}"
-        conn.close()
-        return matricule
-
     def add_etudiant(self):
         nom = self.e_nom.get().strip()
         prenom = self.e_prenom.get().strip()
@@ -1155,55 +4157,15 @@ class App(tk.Toplevel):
         pays = self.var_pays.get().strip()
         photo_path = self.photo_path_temp
 
-        # Validations
-        if not nom or not prenom:
-            messagebox.showerror("Erreur", "Nom et prénom obligatoires.")
-            return
-        
-        if not email:
-            messagebox.showerror("Erreur", "Email obligatoire.")
-            return
-        
-        if telephone and not validate_phone(telephone):
-            messagebox.showerror("Erreur", f"Format téléphone invalide.\n{format_phone_hint()}")
-            return
+        def create():
+            return self.students.create(nom, prenom, email, telephone=telephone, adresse=adresse,
+                                        date_naissance=date_naissance, lieu_naissance=pays, sexe=sexe,
+                                        photo_path=photo_path)
 
-        matricule = self.generate_matricule(nom, prenom)
+        self.run_write(create, on_done=self.on_etudiant_added)
 
-        conn = db_connect()
-        cur = conn.cursor()
-        try:
-            cur.execute("""
-                INSERT INTO etudiants 
-                (matricule, nom, prenom, email, telephone, adresse, date_naissance, lieu_naissance, sexe, photo_path, statut, date_inscription) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                matricule, nom, prenom, 
-                email, 
-                telephone if telephone else None,
-                adresse if adresse else None,
-                date_naissance if date_naissance else None,
-                pays if pays else None,  # <--- C'est la 8ème valeur
-                sexe,
-                photo_path,
-                "actif",
-                now_iso()
-            ))
-            conn.commit()
-            print(f"Étudiant ajouté: {matricule} - {nom} {prenom}")
-        except sqlite3.IntegrityError as e:
-            messagebox.showerror("Erreur", f"Email déjà utilisé ou conflit matricule.\n{str(e)}")
-            print(f"Erreur IntegrityError: {e}")
-            conn.close()
-            return
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur lors de l'ajout: {str(e)}")
-            print(f"Erreur générale: {e}")
-            conn.close()
-            return
-        finally:
-            if not conn:
-                conn.close()
+    def on_etudiant_added(self, etu):
+        print(f"Étudiant ajouté: {etu.matricule} - {etu.nom} {etu.prenom}")
 
         # Réinitialiser le formulaire
         self.e_nom.delete(0, tk.END)
@@ -1218,8 +4180,13 @@ class App(tk.Toplevel):
         self.photo_path_temp = None
         self.lbl_photo_path.config(text="Aucune photo")
 
-        self.refresh_all()
-        messagebox.showinfo("OK", f"Étudiant ajouté ({matricule}).")
+        # Sans filtre actif, la nouvelle ligne va en tête de liste (tri id DESC)
+        if self.etudiants_filters_active():
+            self.publish_change(("etudiants", "insert"))
+        else:
+            self.patch_tree_row(self.tree_etudiants, self.students.row(etu.id), 0)
+            self.publish_change(("etudiants", "insert"), skip={"refresh_etudiants_list"})
+        messagebox.showinfo("OK", f"Étudiant ajouté ({etu.matricule}).")
 
     def delete_etudiant(self):
         """Supprime l'étudiant sélectionné et ses données liées"""
@@ -1241,20 +4208,14 @@ class App(tk.Toplevel):
         if not messagebox.askyesno("Confirmation de suppression", msg, icon='warning'):
             return
 
-        # Suppression en base
-        conn = db_connect()
-        cur = conn.cursor()
-        try:
-            cur.execute("DELETE FROM etudiants WHERE id=?", (etu_id,))
-            conn.commit()
+        def done(_):
             messagebox.showinfo("Succès", "Étudiant supprimé avec succès.")
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Impossible de supprimer : {e}")
-        finally:
-            conn.close()
+            # Rafraîchir l'affichage (inscriptions, notes et absences supprimées en cascade)
+            self.remove_tree_row(self.tree_etudiants, etu_id)
+            self.publish_change(("etudiants", "delete"), ("inscriptions", "delete"), ("notes", "delete"),
+                                ("absences", "delete"), skip={"refresh_etudiants_list"})
 
-        # Rafraîchir l'affichage
-        self.refresh_all()    
+        self.run_write(self.students.delete, etu_id, on_done=done)
 
     def select_photo_student(self):
         """Sélectionner une photo pour l'étudiant"""
@@ -1296,21 +4257,85 @@ class App(tk.Toplevel):
             return
         
         # Sinon, afficher tous les étudiants
-        for row in self.tree_etudiants.get_children():
-            self.tree_etudiants.delete(row)
+        self._search_shown = None
+        self.load_etudiants_list(self.students.list_query())
 
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id, matricule, nom, prenom, COALESCE(email,''), COALESCE(telephone,''), COALESCE(statut,'')
-            FROM etudiants
-            ORDER BY id DESC
-        """)
-        rows = cur.fetchall()
-        conn.close()
+    def load_etudiants_list(self, query, criteria=None):
+        """Lit la liste en arrière-plan ; une recherche plus récente annule la précédente.
 
-        for r in rows:
-            self.tree_etudiants.insert("", "end", values=r)
+        Un résultat d'au plus SEARCH_CACHE_ROWS lignes est affiché en entier et
+        gardé en cache ; au-delà, la liste est paginée. Sans `keys`, `sql` est déjà
+        trié (pertinence) : le résultat n'est pas mis en cache (un préfixe filtré
+        garderait l'ordre de l'ancienne recherche) et seules les SEARCH_CACHE_ROWS
+        premières lignes sont affichées, avec un avertissement.
+        """
+        tree = self.tree_etudiants
+        sql, params, keys = query
+        limit = self.SEARCH_CACHE_ROWS + 1
+
+        def show(rows):
+            truncated = keys is None and len(rows) > self.SEARCH_CACHE_ROWS
+            self.lbl_search_limit.config(
+                text=f"Seuls les {self.SEARCH_CACHE_ROWS} premiers résultats (par pertinence) sont affichés : "
+                     "précisez la recherche." if truncated else "")
+            if keys is None:
+                tree.set_rows(rows[:self.SEARCH_CACHE_ROWS])
+            elif len(rows) <= self.SEARCH_CACHE_ROWS:
+                if criteria is not None:
+                    self.remember_search(criteria, rows)
+                tree.set_rows(rows)
+            else:
+                tree.set_query(sql, params, keys, rows=rows[:tree.page_size])
+
+        if keys is None:
+            self.run_in_background(fetch_rows, sql + " LIMIT ?", list(params) + [limit],
+                                   key="etudiants", on_done=show)
+        else:
+            self.run_in_background(fetch_keyset_page, sql, params, keys, None, True, limit,
+                                   key="etudiants", on_done=show)
+
+    def schedule_etudiants_search(self):
+        """Relance la recherche `search_delay_ms` après la dernière frappe."""
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self.executor.cancel_key("etudiants")
+        self._search_after_id = self.after(self.search_delay_ms, self._run_etudiants_search)
+
+    def _run_etudiants_search(self):
+        self._search_after_id = None
+        self.apply_etudiants_filters()
+
+    def cached_search_rows(self, criteria):
+        """Filtre en mémoire le résultat complet d'un préfixe déjà recherché (ou None).
+
+        None aussi quand la recherche passe par l'index plein texte : son résultat est
+        classé par pertinence, ce qu'un filtrage des lignes en cache ne reproduit pas.
+        """
+        search_text, filters = criteria[0], criteria[1:]
+        if FTS_ENABLED and fts_match_expression(search_text):
+            return None
+        best = None
+        for cached, rows in self._search_cache.items():
+            cached_text, cached_filters = cached[0], cached[1:]
+            if cached_filters == filters and search_text.startswith(cached_text):
+                if best is None or len(cached_text) > len(best[0]):
+                    best = (cached_text, rows)
+        if best is None:
+            return None
+        if best[0] == search_text:
+            return best[1]
+        # Même règle que la requête : LIKE sur nom, prénom, email, matricule
+        return [r for r in best[1] if any(search_text in (v or "").lower() for v in (r[2], r[3], r[4], r[1]))]
+
+    def remember_search(self, criteria, rows):
+        self._search_cache.pop(criteria, None)
+        self._search_cache[criteria] = rows
+        while len(self._search_cache) > self.SEARCH_CACHE_ENTRIES:
+            del self._search_cache[next(iter(self._search_cache))]
+
+    def clear_search_cache(self):
+        self._search_cache.clear()
+        self._search_shown = None
 
     def open_fiche_etudiant(self, event=None):
         sel = self.tree_etudiants.selection()
@@ -1330,34 +4355,32 @@ class App(tk.Toplevel):
         box_id = ttk.LabelFrame(frm, text="Identité & Infos personnelles", padding=10)
         box_id.pack(fill="x")
 
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT matricule, nom, prenom, COALESCE(email,''), COALESCE(telephone,''), COALESCE(adresse,''),
-                   COALESCE(date_naissance,''), COALESCE(lieu_naissance,''), COALESCE(sexe,''), COALESCE(statut,'')
-            FROM etudiants WHERE id=?
-        """, (etu_id,))
-        etu = cur.fetchone()
-
-        ttk.Label(box_id, text=f"Matricule : {etu[0]}").grid(row=0, column=0, sticky="w", padx=6, pady=2)
-        ttk.Label(box_id, text=f"Nom : {etu[1]} {etu[2]}").grid(row=0, column=1, sticky="w", padx=6, pady=2)
-        ttk.Label(box_id, text=f"Statut : {etu[9]}").grid(row=0, column=2, sticky="w", padx=6, pady=2)
+        fiche = self.students.sheet(etu_id)
+        if fiche is None:
+            w.destroy()
+            messagebox.showerror("Erreur", "Étudiant introuvable.")
+            return
+        etu = fiche.student
+
+        ttk.Label(box_id, text=f"Matricule : {etu.matricule}").grid(row=0, column=0, sticky="w", padx=6, pady=2)
+        ttk.Label(box_id, text=f"Nom : {etu.nom} {etu.prenom}").grid(row=0, column=1, sticky="w", padx=6, pady=2)
+        ttk.Label(box_id, text=f"Statut : {etu.statut or ''}").grid(row=0, column=2, sticky="w", padx=6, pady=2)
         
         # Calculer et afficher la moyenne et mention
-        moyenne, mention, nb_notes = get_student_average(etu_id)
+        moyenne, mention, nb_notes = fiche.average
         mention_color = "green" if mention in ["Excellente", "Très bien"] else "orange" if mention in ["Bien", "Assez bien"] else "red"
         ttk.Label(box_id, text=f"Moyenne générale : {moyenne}/20").grid(row=1, column=0, sticky="w", padx=6, pady=2)
         mention_label = ttk.Label(box_id, text=f"Mention : {mention}")
         mention_label.grid(row=1, column=1, sticky="w", padx=6, pady=2)
         ttk.Label(box_id, text=f"Notes : {nb_notes}").grid(row=1, column=2, sticky="w", padx=6, pady=2)
         
-        ttk.Label(box_id, text=f"Email : {etu[3]}").grid(row=2, column=0, sticky="w", padx=6, pady=2)
-        ttk.Label(box_id, text=f"Téléphone : {etu[4]}").grid(row=2, column=1, sticky="w", padx=6, pady=2)
-        ttk.Label(box_id, text=f"Sexe : {etu[8]}").grid(row=2, column=2, sticky="w", padx=6, pady=2)
+        ttk.Label(box_id, text=f"Email : {etu.email or ''}").grid(row=2, column=0, sticky="w", padx=6, pady=2)
+        ttk.Label(box_id, text=f"Téléphone : {etu.telephone or ''}").grid(row=2, column=1, sticky="w", padx=6, pady=2)
+        ttk.Label(box_id, text=f"Sexe : {etu.sexe or ''}").grid(row=2, column=2, sticky="w", padx=6, pady=2)
         
-        ttk.Label(box_id, text=f"Adresse : {etu[5][:40]}...").grid(row=3, column=0, columnspan=3, sticky="w", padx=6, pady=2)
-        ttk.Label(box_id, text=f"Date naissance : {etu[6]}").grid(row=4, column=0, sticky="w", padx=6, pady=2)
-        ttk.Label(box_id, text=f"Pays naissance : {etu[7]}").grid(row=4, column=1, columnspan=2, sticky="w", padx=6, pady=2)
+        ttk.Label(box_id, text=f"Adresse : {(etu.adresse or '')[:40]}...").grid(row=3, column=0, columnspan=3, sticky="w", padx=6, pady=2)
+        ttk.Label(box_id, text=f"Date naissance : {etu.date_naissance or ''}").grid(row=4, column=0, sticky="w", padx=6, pady=2)
+        ttk.Label(box_id, text=f"Pays naissance : {etu.lieu_naissance or ''}").grid(row=4, column=1, columnspan=2, sticky="w", padx=6, pady=2)
 
         nb = ttk.Notebook(frm)
         nb.pack(fill="both", expand=True, pady=10)
@@ -1389,145 +4412,56 @@ class App(tk.Toplevel):
             tree_a.column(c, width=220, anchor="w")
         tree_a.pack(fill="both", expand=True, padx=10, pady=10)
 
-        cur.execute("""
-            SELECT i.annee_academique,
-                   f.code || ' - ' || f.nom,
-                   n.code || ' - ' || n.nom,
-                   COALESCE(i.statut,'')
-            FROM inscriptions i
-            JOIN filieres f ON f.id=i.filiere_id
-            JOIN niveaux n ON n.id=i.niveau_id
-            WHERE i.etudiant_id=?
-            ORDER BY i.id DESC
-        """, (etu_id,))
-        for r in cur.fetchall():
+        for r in fiche.inscriptions:
             tree_i.insert("", "end", values=r)
-
-        cur.execute("""
-            SELECT COALESCE(no.annee_academique,''),
-                   m.code || ' - ' || m.nom,
-                   no.note,
-                   m.coefficient,
-                   COALESCE(no.type_evaluation,'')
-            FROM notes no
-            JOIN modules m ON m.id=no.module_id
-            WHERE no.etudiant_id=?
-            ORDER BY no.id DESC
-        """, (etu_id,))
-        for r in cur.fetchall():
+        for r in fiche.notes:
             tree_n.insert("", "end", values=r)
-
-        cur.execute("""
-            SELECT a.date_absence,
-                   m.code || ' - ' || m.nom,
-                   CASE a.justifiee WHEN 1 THEN 'Oui' ELSE 'Non' END,
-                   COALESCE(a.motif,'')
-            FROM absences a
-            JOIN modules m ON m.id=a.module_id
-            WHERE a.etudiant_id=?
-            ORDER BY a.date_absence DESC
-        """, (etu_id,))
-        for r in cur.fetchall():
+        for r in fiche.absences:
             tree_a.insert("", "end", values=r)
 
-        conn.close()
-
     def import_etudiants_csv(self):
         path = filedialog.askopenfilename(filetypes=[("CSV", "*.csv")])
         if not path:
             return
 
-        with open(path, "r", encoding="utf-8-sig", newline="") as f:
-            reader = csv.DictReader(f)
-            rows = list(reader)
-
-        ok = 0
-        for row in rows:
-            nom = (row.get("nom") or row.get("Nom") or "").strip()
-            prenom = (row.get("prenom") or row.get("Prenom") or row.get("Prénom") or "").strip()
-            email = (row.get("email") or row.get("Email") or "").strip()
-            if not nom or not prenom:
-                continue
-
-            matricule = self.generate_matricule(nom, prenom)
-
-            conn = db_connect()
-            cur = conn.cursor()
-            try:
-                cur.execute(
-                    "INSERT INTO etudiants (matricule, nom, prenom, email, statut) VALUES (?, ?, ?, ?, ?)",
-                    (matricule, nom, prenom, email if email else None, "actif"),
-                )
-                conn.commit()
-                ok += 1
-            except sqlite3.IntegrityError:
-                pass
-            finally:
-                conn.close()
+        def done(report):
+            self.publish_change(("etudiants", "insert"))
+            msg = f"Import terminé : {report.inserted} étudiant(s)."
+            rejects = report.rejects
+            if rejects:
+                rejects_path = str(Path(path).with_name(Path(path).stem + "_rejets.csv"))
+                write_import_rejects(rejects, rejects_path)
+                apercu = "\n".join(f"Ligne {ligne} : {motif}" for ligne, motif in rejects[:10])
+                msg += f"\n{len(rejects)} ligne(s) rejetée(s) :\n{apercu}\n\nRapport complet : {rejects_path}"
+            messagebox.showinfo("OK", msg)
 
-        self.refresh_all()
-        messagebox.showinfo("OK", f"Import terminé : {ok} étudiant(s).")
+        self.executor.submit(self.students.import_csv, path, on_done=done,
+                             on_progress=self.on_background_progress, on_error=self.show_write_error)
 
     def export_etudiants_csv(self):
         path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")])
         if not path:
             return
-
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT id, matricule, nom, prenom, COALESCE(email,''), COALESCE(statut,'') FROM etudiants ORDER BY id")
-        rows = cur.fetchall()
-        conn.close()
-
-        with open(path, "w", encoding="utf-8", newline="") as f:
-            w = csv.writer(f)
-            w.writerow(["id", "matricule", "nom", "prenom", "email", "statut"])
-            w.writerows(rows)
-
-        messagebox.showinfo("OK", "Export CSV terminé.")
+        self.run_export(self.documents.export_students_csv, path, message="Export CSV terminé.")
 
     def export_etudiants_xlsx(self):
         path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel", "*.xlsx")])
         if not path:
             return
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT id, matricule, nom, prenom, COALESCE(email,''), COALESCE(statut,'') FROM etudiants ORDER BY id")
-        rows = cur.fetchall()
-        conn.close()
-        export_query_to_xlsx(["id", "matricule", "nom", "prenom", "email", "statut"], rows, path, "etudiants")
-        messagebox.showinfo("OK", "Export Excel terminé.")
+        self.run_export(self.documents.export_xlsx, "etudiants", path, message="Export Excel terminé.", progress=True)
 
     def load_filter_options(self):
         """Charger les options des filtres (filières, niveaux, groupes)"""
-        conn = db_connect()
-        cur = conn.cursor()
-        
-        # Charger filières
-        cur.execute("SELECT code || ' - ' || nom FROM filieres ORDER BY nom")
-        filieres = [""] + [row[0] for row in cur.fetchall()]
-        self.cb_filter_filiere["values"] = filieres
-        
-        # Charger niveaux
-        cur.execute("SELECT code || ' - ' || nom FROM niveaux ORDER BY ordre")
-        niveaux = [""] + [row[0] for row in cur.fetchall()]
-        self.cb_filter_niveau["values"] = niveaux
-        
-        # Charger groupes
-        cur.execute("SELECT code || ' - ' || nom FROM groupes ORDER BY nom")
-        groupes = [""] + [row[0] for row in cur.fetchall()]
-        self.cb_filter_groupe["values"] = groupes
-        
-        conn.close()
+        filieres, niveaux, groupes = self.structure.filter_choices()
+        self.cb_filter_filiere["values"] = [""] + filieres
+        self.cb_filter_niveau["values"] = [""] + niveaux
+        self.cb_filter_groupe["values"] = [""] + groupes
 
     def apply_etudiants_filters(self):
         """Appliquer les filtres avancés à la liste des étudiants"""
         if not hasattr(self, "tree_etudiants"):
             return
         
-        for row in self.tree_etudiants.get_children():
-            self.tree_etudiants.delete(row)
-
         # Récupérer les critères de filtre
         search_text = self.var_search_name.get().strip().lower()
         filiere_text = self.var_filter_filiere.get().strip()
@@ -1535,54 +4469,27 @@ class App(tk.Toplevel):
         statut_text = self.var_filter_statut.get().strip()
         groupe_text = self.var_filter_groupe.get().strip()
 
-        conn = db_connect()
-        cur = conn.cursor()
-
-        # Construire la requête SQL avec les filtres
-        query = """
-            SELECT DISTINCT e.id, e.matricule, e.nom, e.prenom, COALESCE(e.email,''), COALESCE(e.telephone,''), COALESCE(e.statut,'')
-            FROM etudiants e
-            LEFT JOIN inscriptions i ON e.id = i.etudiant_id
-            LEFT JOIN filieres f ON i.filiere_id = f.id
-            LEFT JOIN niveaux n ON i.niveau_id = n.id
-            LEFT JOIN groupes g ON i.groupe_id = g.id
-            WHERE 1=1
-        """
-        params = []
-
-        # Ajouter les conditions de filtre
-        if search_text:
-            query += " AND (LOWER(e.nom) LIKE ? OR LOWER(e.prenom) LIKE ? OR LOWER(e.email) LIKE ? OR e.matricule LIKE ?)"
-            search_param = f"%{search_text}%"
-            params.extend([search_param, search_param, search_param, search_param])
-
-        if filiere_text:
-            filiere_code = filiere_text.split(" - ")[0]
-            query += " AND f.code = ?"
-            params.append(filiere_code)
-
-        if niveau_text:
-            niveau_code = niveau_text.split(" - ")[0]
-            query += " AND n.code = ?"
-            params.append(niveau_code)
-
-        if statut_text:
-            query += " AND e.statut = ?"
-            params.append(statut_text)
-
-        if groupe_text:
-            groupe_code = groupe_text.split(" - ")[0]
-            query += " AND g.code = ?"
-            params.append(groupe_code)
-
-        query += " ORDER BY e.id DESC"
+        criteria = (search_text, filiere_text, niveau_text, statut_text, groupe_text)
+        if criteria == self._search_shown:
+            return
+        self._search_shown = criteria
+
+        # Une recherche plus longue ne peut que restreindre un résultat complet déjà lu
+        rows = self.cached_search_rows(criteria)
+        if rows is not None:
+            self.executor.cancel_key("etudiants")
+            self.remember_search(criteria, rows)
+            self.lbl_search_limit.config(text="")
+            self.tree_etudiants.set_rows(rows)
+            return
 
-        cur.execute(query, params)
-        rows = cur.fetchall()
-        conn.close()
+        filtre = StudentFilter(search_text, filiere_text.split(" - ")[0], niveau_text.split(" - ")[0],
+                               statut_text, groupe_text.split(" - ")[0])
+        self.load_etudiants_list(self.students.search_query(filtre), criteria)
 
-        for r in rows:
-            self.tree_etudiants.insert("", "end", values=r)
+    def etudiants_filters_active(self):
+        return any(v.get().strip() for v in (self.var_search_name, self.var_filter_filiere, self.var_filter_niveau,
+                                             self.var_filter_statut, self.var_filter_groupe))
 
     def reset_etudiants_filters(self):
         """Réinitialiser tous les filtres"""
@@ -1686,76 +4593,47 @@ class App(tk.Toplevel):
         ttk.Button(ls, text="Supprimer", command=self.delete_specialite).grid(row=5, column=0, columnspan=2, sticky="ew", pady=(4, 0))
 
     def add_filiere(self):
-        code = self.f_code.get().strip()
-        nom = self.f_nom.get().strip()
-        if not code or not nom:
-            messagebox.showerror("Erreur", "Code et nom filière obligatoires.")
-            return
-
-        conn = db_connect()
-        cur = conn.cursor()
-        
+        filiere_id = getattr(self, 'current_edit_filiere_id', None)
+        op = "update" if filiere_id else "insert"
         try:
-            # Check if editing or adding
-            if hasattr(self, 'current_edit_filiere_id'):
-                cur.execute("UPDATE filieres SET code=?, nom=? WHERE id=?", 
-                           (code, nom, self.current_edit_filiere_id))
-                conn.commit()
-                messagebox.showinfo("OK", "Filière modifiée.")
-                delattr(self, 'current_edit_filiere_id')
-            else:
-                cur.execute("INSERT INTO filieres (code, nom) VALUES (?, ?)", (code, nom))
-                conn.commit()
-                messagebox.showinfo("OK", "Filière ajoutée.")
+            self.structure.save_filiere(self.f_code.get(), self.f_nom.get(), filiere_id)
+        except ValueError as e:
+            messagebox.showerror("Erreur", str(e))
+            return
         except sqlite3.IntegrityError:
             messagebox.showerror("Erreur", "Code filière déjà utilisé.")
-        finally:
-            conn.close()
+            return
+        if filiere_id:
+            messagebox.showinfo("OK", "Filière modifiée.")
+            del self.current_edit_filiere_id
+        else:
+            messagebox.showinfo("OK", "Filière ajoutée.")
 
         self.f_code.delete(0, tk.END)
         self.f_nom.delete(0, tk.END)
-        self.refresh_all()
+        self.publish_change(("filieres", op))
 
     def add_niveau(self):
-        code = self.n_code.get().strip()
-        nom = self.n_nom.get().strip()
-        ordre_txt = self.n_ordre.get().strip()
-
-        if not code or not nom:
-            messagebox.showerror("Erreur", "Code et nom niveau obligatoires.")
-            return
-
-        ordre = None
-        if ordre_txt:
-            if not ordre_txt.isdigit():
-                messagebox.showerror("Erreur", "Ordre doit être un entier (ex: 4).")
-                return
-            ordre = int(ordre_txt)
-
-        conn = db_connect()
-        cur = conn.cursor()
-        
+        niveau_id = getattr(self, 'current_edit_niveau_id', None)
+        op = "update" if niveau_id else "insert"
         try:
-            # Check if editing or adding
-            if hasattr(self, 'current_edit_niveau_id'):
-                cur.execute("UPDATE niveaux SET code=?, nom=?, ordre=? WHERE id=?", 
-                           (code, nom, ordre, self.current_edit_niveau_id))
-                conn.commit()
-                messagebox.showinfo("OK", "Niveau modifié.")
-                delattr(self, 'current_edit_niveau_id')
-            else:
-                cur.execute("INSERT INTO niveaux (code, nom, ordre) VALUES (?, ?, ?)", (code, nom, ordre))
-                conn.commit()
-                messagebox.showinfo("OK", "Niveau ajouté.")
+            self.structure.save_niveau(self.n_code.get(), self.n_nom.get(), self.n_ordre.get(), niveau_id)
+        except ValueError as e:
+            messagebox.showerror("Erreur", str(e))
+            return
         except sqlite3.IntegrityError:
             messagebox.showerror("Erreur", "Code niveau déjà utilisé.")
-        finally:
-            conn.close()
+            return
+        if niveau_id:
+            messagebox.showinfo("OK", "Niveau modifié.")
+            del self.current_edit_niveau_id
+        else:
+            messagebox.showinfo("OK", "Niveau ajouté.")
 
         self.n_code.delete(0, tk.END)
         self.n_nom.delete(0, tk.END)
         self.n_ordre.delete(0, tk.END)
-        self.refresh_all()
+        self.publish_change(("niveaux", op))
 
     def edit_filiere(self):
         selection = self.list_filieres.curselection()
@@ -1764,11 +4642,7 @@ class App(tk.Toplevel):
             return
         
         fid = int(self.list_filieres.get(selection[0]).split(" - ")[0])
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT code, nom FROM filieres WHERE id=?", (fid,))
-        row = cur.fetchone()
-        conn.close()
+        row = self.structure.get_filiere(fid)
         
         if row:
             self.f_code.delete(0, tk.END)
@@ -1787,12 +4661,10 @@ class App(tk.Toplevel):
             return
         
         fid = int(self.list_filieres.get(selection[0]).split(" - ")[0])
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM filieres WHERE id=?", (fid,))
-        conn.commit()
-        conn.close()
-        self.refresh_all()
+        self.structure.delete_filiere(fid)
+        # Cascade : modules et groupes détachés, spécialités supprimées
+        self.publish_change(("filieres", "delete"), ("modules", "update"), ("groupes", "update"),
+                            ("specialites", "delete"))
 
     def edit_niveau(self):
         selection = self.list_niveaux.curselection()
@@ -1801,11 +4673,7 @@ class App(tk.Toplevel):
             return
         
         nid = int(self.list_niveaux.get(selection[0]).split(" - ")[0])
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT code, nom, COALESCE(ordre,'') FROM niveaux WHERE id=?", (nid,))
-        row = cur.fetchone()
-        conn.close()
+        row = self.structure.get_niveau(nid)
         
         if row:
             self.n_code.delete(0, tk.END)
@@ -1826,43 +4694,29 @@ class App(tk.Toplevel):
             return
         
         nid = int(self.list_niveaux.get(selection[0]).split(" - ")[0])
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM niveaux WHERE id=?", (nid,))
-        conn.commit()
-        conn.close()
-        self.refresh_all()
+        self.structure.delete_niveau(nid)
+        self.publish_change(("niveaux", "delete"), ("modules", "update"), ("groupes", "update"))
 
     def add_groupe(self):
-        code = self.g_code.get().strip()
-        nom = self.g_nom.get().strip()
-        if not code or not nom:
-            messagebox.showerror("Erreur", "Code et nom groupe obligatoires.")
-            return
-
-        conn = db_connect()
-        cur = conn.cursor()
-        
+        groupe_id = getattr(self, 'current_edit_groupe_id', None)
+        op = "update" if groupe_id else "insert"
         try:
-            # Check if editing or adding
-            if hasattr(self, 'current_edit_groupe_id'):
-                cur.execute("UPDATE groupes SET code=?, nom=? WHERE id=?", 
-                           (code, nom, self.current_edit_groupe_id))
-                conn.commit()
-                messagebox.showinfo("OK", "Groupe modifié.")
-                delattr(self, 'current_edit_groupe_id')
-            else:
-                cur.execute("INSERT INTO groupes (code, nom) VALUES (?, ?)", (code, nom))
-                conn.commit()
-                messagebox.showinfo("OK", "Groupe ajouté.")
+            self.structure.save_groupe(self.g_code.get(), self.g_nom.get(), groupe_id)
+        except ValueError as e:
+            messagebox.showerror("Erreur", str(e))
+            return
         except sqlite3.IntegrityError:
             messagebox.showerror("Erreur", "Code groupe déjà utilisé.")
-        finally:
-            conn.close()
+            return
+        if groupe_id:
+            messagebox.showinfo("OK", "Groupe modifié.")
+            del self.current_edit_groupe_id
+        else:
+            messagebox.showinfo("OK", "Groupe ajouté.")
 
         self.g_code.delete(0, tk.END)
         self.g_nom.delete(0, tk.END)
-        self.refresh_all()
+        self.publish_change(("groupes", op))
 
     def edit_groupe(self):
         selection = self.list_groupes.curselection()
@@ -1871,11 +4725,7 @@ class App(tk.Toplevel):
             return
         
         gid = int(self.list_groupes.get(selection[0]).split(" - ")[0])
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT code, nom FROM groupes WHERE id=?", (gid,))
-        row = cur.fetchone()
-        conn.close()
+        row = self.structure.get_groupe(gid)
         
         if row:
             self.g_code.delete(0, tk.END)
@@ -1894,106 +4744,60 @@ class App(tk.Toplevel):
             return
         
         gid = int(self.list_groupes.get(selection[0]).split(" - ")[0])
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM groupes WHERE id=?", (gid,))
-        conn.commit()
-        conn.close()
-        self.refresh_all()
+        self.structure.delete_groupe(gid)
+        self.publish_change(("groupes", "delete"), ("inscriptions", "update"))
 
     def refresh_filieres(self):
-        if not hasattr(self, "list_filieres"):
-            return
-        self.list_filieres.delete(0, tk.END)
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT id, code, nom FROM filieres ORDER BY code")
-        self._filieres = cur.fetchall()
-        conn.close()
+        self._filieres = self.structure.filieres()
 
-        for (fid, code, nom) in self._filieres:
-            self.list_filieres.insert(tk.END, f"{fid} - {code} - {nom}")
+        if hasattr(self, "list_filieres"):
+            self.list_filieres.delete(0, tk.END)
+            for (fid, code, nom) in self._filieres:
+                self.list_filieres.insert(tk.END, f"{fid} - {code} - {nom}")
 
         fil_values = [f"{fid} - {code} - {nom}" for (fid, code, nom) in self._filieres]
         if hasattr(self, "cb_filiere"): self.cb_filiere["values"] = fil_values
         if hasattr(self, "cb_mod_filiere"): self.cb_mod_filiere["values"] = fil_values
+        if hasattr(self, "cb_lot_filiere"): self.cb_lot_filiere["values"] = [""] + fil_values
         if hasattr(self, "refresh_specialites_combobox"): self.refresh_specialites_combobox()
 
     def refresh_niveaux(self):
-        if not hasattr(self, "list_niveaux"):
-            return
-        self.list_niveaux.delete(0, tk.END)
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT id, code, nom, COALESCE(ordre,'') FROM niveaux ORDER BY COALESCE(ordre, 999), code")
-        self._niveaux = cur.fetchall()
-        conn.close()
+        self._niveaux = self.structure.niveaux()
 
-        for (nid, code, nom, ordre) in self._niveaux:
-            self.list_niveaux.insert(tk.END, f"{nid} - {code} - {nom} - ordre:{ordre}")
+        if hasattr(self, "list_niveaux"):
+            self.list_niveaux.delete(0, tk.END)
+            for (nid, code, nom, ordre) in self._niveaux:
+                self.list_niveaux.insert(tk.END, f"{nid} - {code} - {nom} - ordre:{ordre}")
 
         niv_values = [f"{nid} - {code} - {nom}" for (nid, code, nom, _) in self._niveaux]
         if hasattr(self, "cb_niveau"): self.cb_niveau["values"] = niv_values
         if hasattr(self, "cb_mod_niveau"): self.cb_mod_niveau["values"] = niv_values
+        if hasattr(self, "cb_lot_niveau"): self.cb_lot_niveau["values"] = [""] + niv_values
 
     def refresh_groupes(self):
-        if not hasattr(self, "list_groupes"):
-            return
-        self.list_groupes.delete(0, tk.END)
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT id, code, nom FROM groupes ORDER BY code")
-        self._groupes = cur.fetchall()
-        conn.close()
+        self._groupes = self.structure.groupes()
 
-        for (gid, code, nom) in self._groupes:
-            self.list_groupes.insert(tk.END, f"{gid} - {code} - {nom}")
+        if hasattr(self, "list_groupes"):
+            self.list_groupes.delete(0, tk.END)
+            for (gid, code, nom) in self._groupes:
+                self.list_groupes.insert(tk.END, f"{gid} - {code} - {nom}")
 
         grp_values = [f"{gid} - {code} - {nom}" for (gid, code, nom) in self._groupes]
         if hasattr(self, "cb_groupe"): self.cb_groupe["values"] = grp_values
         if hasattr(self, "cb_filter_groupe"): self.cb_filter_groupe["values"] = grp_values
+        if hasattr(self, "cb_lot_groupe"): self.cb_lot_groupe["values"] = [""] + grp_values
 
     def populate_semestres(self):
         """Charger les semestres disponibles dans le ComboBox"""
         if not hasattr(self, "cb_mod_semestre"):
             return
-        
-        conn = db_connect()
-        cur = conn.cursor()
-        
-        # Get unique semestres from existing modules
-        cur.execute("SELECT DISTINCT semestre FROM modules WHERE semestre IS NOT NULL ORDER BY semestre")
-        existing_semestres = [row[0] for row in cur.fetchall()]
-        
-        # Also get semestres from niveaux codes (assuming niveaux.code is like 'S07', 'S08', etc.)
-        cur.execute("SELECT DISTINCT code FROM niveaux WHERE code LIKE 'S%' ORDER BY code")
-        niveau_semestres = [row[0] for row in cur.fetchall()]
-        
-        conn.close()
-        
-        # Combine and deduplicate
-        all_semestres = sorted(set(existing_semestres + niveau_semestres))
-        
-        # Default common semesters if none found (S01-S10)
-        if not all_semestres:
-            all_semestres = [f"S{i:02d}" for i in range(1, 11)]
-        else:
-            # Ajouter les semestres manquants de S01 à S10
-            default_semesters = [f"S{i:02d}" for i in range(1, 11)]
-            all_semestres = sorted(set(all_semestres + default_semesters))
-        
-        self.cb_mod_semestre["values"] = all_semestres
+        self.cb_mod_semestre["values"] = self.modules.semestre_choices()
 
     def refresh_specialites_combobox(self):
         """Charger les filières dans le ComboBox des spécialités"""
         if not hasattr(self, "cb_spec_filiere"):
             return
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT id, code, nom FROM filieres ORDER BY code")
-        self._spec_filieres = cur.fetchall()
-        conn.close()
-        
+        self._spec_filieres = self.structure.filieres()
         spec_fil_values = [f"{fid} - {code} - {nom}" for (fid, code, nom) in self._spec_filieres]
         self.cb_spec_filiere["values"] = spec_fil_values
 
@@ -2013,24 +4817,15 @@ class App(tk.Toplevel):
             messagebox.showerror("Erreur", "Sélectionnez une filière valide.")
             return
 
-        conn = db_connect()
-        cur = conn.cursor()
         try:
-            cur.execute(
-                "INSERT INTO specialites (filiere_id, nom, description) VALUES (?, ?, ?)",
-                (filiere_id, nom, description if description else None)
-            )
-            conn.commit()
+            self.structure.add_specialite(filiere_id, nom, description)
             messagebox.showinfo("OK", "Spécialité ajoutée.")
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors de l'ajout: {str(e)}")
-        finally:
-            conn.close()
 
         self.s_nom.delete(0, tk.END)
         self.s_description.delete(0, tk.END)
-        self.refresh_specialites_list()
-        self.refresh_all()
+        self.publish_change(("specialites", "insert"))
 
     def refresh_specialites_list(self):
         """Rafraîchir la liste des spécialités selon la filière sélectionnée"""
@@ -2048,14 +4843,7 @@ class App(tk.Toplevel):
         except (ValueError, IndexError):
             return
 
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT id, nom, COALESCE(description,'') FROM specialites WHERE filiere_id=? ORDER BY nom",
-            (filiere_id,)
-        )
-        self._specialites = cur.fetchall()
-        conn.close()
+        self._specialites = self.structure.specialites(filiere_id)
 
         for (sid, nom, description) in self._specialites:
             display = f"{sid} - {nom}"
@@ -2075,18 +4863,13 @@ class App(tk.Toplevel):
         if not messagebox.askyesno("Confirmation", "Supprimer cette spécialité ?"):
             return
 
-        conn = db_connect()
-        cur = conn.cursor()
         try:
-            cur.execute("DELETE FROM specialites WHERE id=?", (spec_id,))
-            conn.commit()
+            self.structure.delete_specialite(spec_id)
             messagebox.showinfo("OK", "Spécialité supprimée.")
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors de la suppression: {str(e)}")
-        finally:
-            conn.close()
 
-        self.refresh_specialites_list()
+        self.publish_change(("specialites", "delete"))
 
     # INSCRIPTIONS
 
@@ -2122,7 +4905,7 @@ class App(tk.Toplevel):
         bottom.pack(fill="both", expand=True, pady=(10, 0))
 
         cols = ("id", "matricule", "etudiant", "filiere", "niveau", "groupe", "annee", "statut")
-        self.tree_inscriptions = ttk.Treeview(bottom, columns=cols, show="headings")
+        self.tree_inscriptions = VirtualTreeview(bottom, columns=cols, show="headings")
         for c in cols:
             self.tree_inscriptions.heading(c, text=c)
             self.tree_inscriptions.column(c, width=120, anchor="w")
@@ -2140,21 +4923,11 @@ class App(tk.Toplevel):
         ttk.Button(btn_frame, text="Supprimer inscription", command=self.delete_inscription).pack(side="left", padx=4)
 
     def refresh_inscriptions_lists(self):
-        if not hasattr(self, "cb_etudiant"):
-            return
-
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT id, matricule, nom, prenom FROM etudiants ORDER BY nom, prenom")
-        self._etudiants = cur.fetchall()
-        
-        # Load groupes
-        cur.execute("SELECT id, nom FROM groupes ORDER BY nom")
-        self._groupes = cur.fetchall()
-        conn.close()
+        self._etudiants = self.students.choices()
+        self._groupes = self.enrollments.group_choices()
 
         vals_etu = [f"{eid} - {mat} - {nom} {prenom}" for (eid, mat, nom, prenom) in self._etudiants]
-        self.cb_etudiant["values"] = vals_etu
+        if hasattr(self, "cb_etudiant"): self.cb_etudiant["values"] = vals_etu
         if hasattr(self, "cb_note_etudiant"): self.cb_note_etudiant["values"] = vals_etu
         if hasattr(self, "cb_abs_etudiant"): self.cb_abs_etudiant["values"] = vals_etu
         if hasattr(self, "cb_doc_etudiant"): self.cb_doc_etudiant["values"] = vals_etu
@@ -2164,31 +4937,8 @@ class App(tk.Toplevel):
         if hasattr(self, "cb_groupe"): self.cb_groupe["values"] = vals_groupe
 
         if hasattr(self, "tree_inscriptions"):
-            for row in self.tree_inscriptions.get_children():
-                self.tree_inscriptions.delete(row)
-
-            conn = db_connect()
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT i.id,
-                       e.matricule,
-                       e.nom || ' ' || e.prenom AS etu,
-                       f.code || ' - ' || f.nom AS fil,
-                       n.code || ' - ' || n.nom AS niv,
-                       COALESCE(i.groupe_id, '') AS groupe,
-                       i.annee_academique,
-                       COALESCE(i.statut,'')
-                FROM inscriptions i
-                JOIN etudiants e ON e.id = i.etudiant_id
-                JOIN filieres f  ON f.id = i.filiere_id
-                JOIN niveaux n   ON n.id = i.niveau_id
-                ORDER BY i.id DESC
-            """)
-            rows = cur.fetchall()
-            conn.close()
-
-            for r in rows:
-                self.tree_inscriptions.insert("", "end", values=r)
+            sql, params, keys = self.enrollments.list_query()
+            self.tree_inscriptions.set_query(sql, params, keys=keys)
 
     def add_inscription(self):
         etu_id = self.parse_id_from_combo(self.cb_etudiant.get())
@@ -2209,38 +4959,25 @@ class App(tk.Toplevel):
             except (ValueError, IndexError):
                 groupe_id = None
 
-        conn = db_connect()
-        cur = conn.cursor()
-        
-        try:
-            # Check if editing or adding
-            if hasattr(self, 'current_edit_inscription_id'):
-                cur.execute("""
-                    UPDATE inscriptions SET etudiant_id=?, filiere_id=?, niveau_id=?, 
-                                          groupe_id=?, annee_academique=?
-                    WHERE id=?
-                """, (etu_id, filiere_id, niveau_id, groupe_id, annee, self.current_edit_inscription_id))
-                conn.commit()
+        edit_id = getattr(self, 'current_edit_inscription_id', None)
+        op = "update" if edit_id else "insert"
+
+        def done(_):
+            if edit_id:
                 messagebox.showinfo("OK", "Inscription modifiée.")
-                delattr(self, 'current_edit_inscription_id')
+                self.current_edit_inscription_id = None
+                self.btn_ins_action.config(text="Enregistrer inscription")
             else:
-                cur.execute("""
-                    INSERT INTO inscriptions (etudiant_id, filiere_id, niveau_id, groupe_id, annee_academique, statut)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (etu_id, filiere_id, niveau_id, groupe_id, annee, "inscrit"))
-                conn.commit()
                 messagebox.showinfo("OK", "Inscription enregistrée.")
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur: {str(e)}")
-        finally:
-            conn.close()
+            self.cb_etudiant.set("")
+            self.cb_filiere.set("")
+            self.cb_niveau.set("")
+            self.cb_groupe.set("")
+            self.cb_annee.set(str(datetime.now().year))
+            self.publish_change(("inscriptions", op))
 
-        self.cb_etudiant.set("")
-        self.cb_filiere.set("")
-        self.cb_niveau.set("")
-        self.cb_groupe.set("")
-        self.cb_annee.set(str(datetime.now().year))
-        self.refresh_inscriptions_lists()
+        self.run_write(lambda: self.enrollments.save(etu_id, filiere_id, niveau_id, annee, groupe_id,
+                                                     inscription_id=edit_id), on_done=done)
 
     def load_inscription_to_edit(self, event=None):
         sel = self.tree_inscriptions.selection()
@@ -2251,39 +4988,19 @@ class App(tk.Toplevel):
         values = self.tree_inscriptions.item(sel[0], 'values')
         ins_id = int(values[0])
         
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT etudiant_id, filiere_id, niveau_id, COALESCE(groupe_id,''), annee_academique
-            FROM inscriptions WHERE id=?
-        """, (ins_id,))
-        row = cur.fetchone()
-        conn.close()
-        
-        if row:
-            etu_id, fil_id, niv_id, groupe, annee = row
-            
+        ins = self.enrollments.get(ins_id)
+        if ins:
             # Set comboboxes
-            for v in self.cb_etudiant['values']:
-                if v.startswith(f"{etu_id} -"):
-                    self.cb_etudiant.set(v)
-                    break
-            for v in self.cb_filiere['values']:
-                if v.startswith(f"{fil_id} -"):
-                    self.cb_filiere.set(v)
-                    break
-            for v in self.cb_niveau['values']:
-                if v.startswith(f"{niv_id} -"):
-                    self.cb_niveau.set(v)
-                    break
-            
-            if groupe:
-                self.cb_groupe.set(groupe)
+            for combo, value in ((self.cb_etudiant, ins.etudiant_id), (self.cb_filiere, ins.filiere_id),
+                                 (self.cb_niveau, ins.niveau_id), (self.cb_groupe, ins.groupe_id)):
+                combo.set("")
+                for v in combo['values']:
+                    if value is not None and v.startswith(f"{value} -"):
+                        combo.set(v)
+                        break
+
+            self.cb_annee.set(ins.annee_academique)
             
-            self.e_annee.delete(0, tk.END)
-            self.e_annee.insert(0, annee)
-            
-            self.current_edit_inscription_id = ins_id
             self.current_edit_inscription_id = ins_id
             self.btn_ins_action.config(text="Valider la modification")
 
@@ -2297,15 +5014,8 @@ class App(tk.Toplevel):
             return
         
         values = self.tree_inscriptions.item(sel[0], 'values')
-        ins_id = int(values[0])
-        
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM inscriptions WHERE id=?", (ins_id,))
-        conn.commit()
-        conn.close()
-        
-        self.refresh_inscriptions_lists()
+        self.run_write(self.enrollments.delete, int(values[0]),
+                       on_done=lambda _: self.publish_change(("inscriptions", "delete")))
 
     # MODULES & NOTES
 
@@ -2416,7 +5126,7 @@ class App(tk.Toplevel):
         bottom.pack(fill="both", expand=True, pady=(10, 0))
 
         cols = ("id", "etudiant", "module", "note", "coef", "annee", "type")
-        self.tree_notes = ttk.Treeview(bottom, columns=cols, show="headings")
+        self.tree_notes = VirtualTreeview(bottom, columns=cols, show="headings")
         for c in cols:
             self.tree_notes.heading(c, text=c)
             self.tree_notes.column(c, width=150, anchor="w")
@@ -2438,41 +5148,16 @@ class App(tk.Toplevel):
 
     def add_module(self):
         code = self.e_mod_code.get().strip()
-        nom = self.e_mod_nom.get().strip()
-        coef_txt = self.e_mod_coef.get().strip()
-        credits_txt = self.e_mod_credits.get().strip()
-        semestre = self.cb_mod_semestre.get().strip() if self.cb_mod_semestre.get() else None
-
-        if not code or not nom or not coef_txt:
-            messagebox.showerror("Erreur", "Code, nom et coefficient sont obligatoires.")
-            return
-
         try:
-            coef = float(coef_txt.replace(",", "."))
-        except ValueError:
-            messagebox.showerror("Erreur", "Coefficient invalide (ex: 2 ou 1.5).")
+            self.modules.create(code, self.e_mod_nom.get(), self.e_mod_coef.get(), self.e_mod_credits.get(),
+                                self.cb_mod_semestre.get().strip())
+        except ValueError as e:
+            messagebox.showerror("Erreur", str(e))
             return
-
-        credits = None
-        if credits_txt:
-            if not credits_txt.isdigit():
-                messagebox.showerror("Erreur", "Crédits doit être un entier (ex: 5).")
-                return
-            credits = int(credits_txt)
-
-        conn = db_connect()
-        cur = conn.cursor()
-        try:
-            cur.execute("""
-                INSERT INTO modules (code, nom, coefficient, credits, semestre, filiere_id, niveau_id)
-                VALUES (?, ?, ?, ?, ?, NULL, NULL)
-            """, (code, nom, coef, credits, semestre))
-            conn.commit()
-            messagebox.showinfo("Succès", f"Module '{code}' créé avec succès.\nVous pouvez maintenant l'associer à une filière/niveau à l'étape 2.")
         except sqlite3.IntegrityError:
             messagebox.showerror("Erreur", "Code module déjà utilisé.")
-        finally:
-            conn.close()
+            return
+        messagebox.showinfo("Succès", f"Module '{code}' créé avec succès.\nVous pouvez maintenant l'associer à une filière/niveau à l'étape 2.")
 
         self.e_mod_code.delete(0, tk.END)
         self.e_mod_nom.delete(0, tk.END)
@@ -2480,30 +5165,17 @@ class App(tk.Toplevel):
         self.e_mod_credits.delete(0, tk.END)
         self.cb_mod_semestre.set("")
 
-        self.refresh_all()
+        self.publish_change(("modules", "insert"))
 
     def refresh_modules_list(self):
-        if not hasattr(self, "list_modules"):
-            return
-        self.list_modules.delete(0, tk.END)
-
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT m.id, m.code, m.nom, m.coefficient, COALESCE(m.credits, ''),
-                   COALESCE(m.semestre, ''), COALESCE(f.code,''), COALESCE(n.code,'')
-            FROM modules m
-            LEFT JOIN filieres f ON f.id = m.filiere_id
-            LEFT JOIN niveaux n  ON n.id = m.niveau_id
-            ORDER BY m.code
-        """)
-        self._modules = cur.fetchall()
-        conn.close()
+        self._modules = self.modules.rows()
 
-        for (mid, code, nom, coef, credits, semestre, fcode, ncode) in self._modules:
-            tag = f"{fcode}/{ncode}" if (fcode or ncode) else "(non associé)"
-            sem_info = f"- {semestre}" if semestre else ""
-            self.list_modules.insert(tk.END, f"{mid} - {code} - {nom} (coef={coef}, cr={credits}) {sem_info} {tag}")
+        if hasattr(self, "list_modules"):
+            self.list_modules.delete(0, tk.END)
+            for (mid, code, nom, coef, credits, semestre, fcode, ncode) in self._modules:
+                tag = f"{fcode}/{ncode}" if (fcode or ncode) else "(non associé)"
+                sem_info = f"- {semestre}" if semestre else ""
+                self.list_modules.insert(tk.END, f"{mid} - {code} - {nom} (coef={coef}, cr={credits}) {sem_info} {tag}")
 
         vals_mod = [f"{mid} - {code} - {nom}" for (mid, code, nom, _, _, _, _, _) in self._modules]
         if hasattr(self, "cb_note_module"): self.cb_note_module["values"] = vals_mod
@@ -2526,32 +5198,22 @@ class App(tk.Toplevel):
         filiere_id = self.parse_id_from_combo(self.cb_mod_filiere.get()) if self.cb_mod_filiere.get() else None
         niveau_id = self.parse_id_from_combo(self.cb_mod_niveau.get()) if self.cb_mod_niveau.get() else None
 
-        if not filiere_id and not niveau_id:
-            messagebox.showwarning("Avertissement", "Veuillez sélectionner au moins une filière ou un niveau.")
-            return
-
-        conn = db_connect()
-        cur = conn.cursor()
         try:
-            cur.execute("""
-                UPDATE modules
-                SET filiere_id = ?, niveau_id = ?
-                WHERE id = ?
-            """, (filiere_id, niveau_id, mod_id))
-            conn.commit()
-            
-            filiere_str = self.cb_mod_filiere.get() if self.cb_mod_filiere.get() else "(aucune)"
-            niveau_str = self.cb_mod_niveau.get() if self.cb_mod_niveau.get() else "(aucun)"
-            messagebox.showinfo("Succès", f"Module associé à:\n- Filière: {filiere_str}\n- Niveau: {niveau_str}")
+            self.modules.associate(mod_id, filiere_id, niveau_id)
+        except ValueError as e:
+            messagebox.showwarning("Avertissement", str(e))
+            return
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors de l'association: {str(e)}")
-        finally:
-            conn.close()
+            return
+        filiere_str = self.cb_mod_filiere.get() if self.cb_mod_filiere.get() else "(aucune)"
+        niveau_str = self.cb_mod_niveau.get() if self.cb_mod_niveau.get() else "(aucun)"
+        messagebox.showinfo("Succès", f"Module associé à:\n- Filière: {filiere_str}\n- Niveau: {niveau_str}")
 
         self.cb_mod_select.set("")
         self.cb_mod_filiere.set("")
         self.cb_mod_niveau.set("")
-        self.refresh_all()
+        self.publish_change(("modules", "update"))
 
     def add_note(self):
         etu_id = self.parse_id_from_combo(self.cb_note_etudiant.get())
@@ -2567,36 +5229,19 @@ class App(tk.Toplevel):
             return
 
         try:
-            note = float(note_txt.replace(",", "."))
-        except ValueError:
-            messagebox.showerror("Erreur", "Note invalide (ex: 14.5).")
+            note = self.grades.parse_note(note_txt)
+        except ValueError as e:
+            messagebox.showerror("Erreur", str(e))
             return
 
-        if note < 0 or note > 20:
-            messagebox.showerror("Erreur", "La note doit être entre 0 et 20.")
-            return
-
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO notes (etudiant_id, module_id, note, type_evaluation, annee_academique)
-            VALUES (?, ?, ?, ?, ?)
-        """, (etu_id, mod_id, note, typ if typ else None, annee if annee else None))
-        note_id = cur.lastrowid
-
-        cur.execute("""
-            INSERT INTO notes_audit (note_id, action, old_value, new_value, changed_at, changed_by)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (note_id, "INSERT", None, f"note={note};type={typ};annee={annee}", now_iso(), self.username))
-
-        conn.commit()
-        conn.close()
+        def done(note_id):
+            self.e_note.delete(0, tk.END)
+            self.cb_note_type.set("")
+            self.patch_tree_row(self.tree_notes, self.grades.row(note_id), 0)
+            self.publish_change(("notes", "insert"), ("notes_audit", "insert"), skip={"refresh_notes_lists"})
+            messagebox.showinfo("OK", "Note enregistrée.")
 
-        self.e_note.delete(0, tk.END)
-        self.cb_note_type.set("")
-        
-        self.refresh_notes_lists()
-        messagebox.showinfo("OK", "Note enregistrée.")
+        self.run_write(self.grades.add, etu_id, mod_id, note, typ, annee, on_done=done)
 
     def _selected_note_id(self):
         sel = self.tree_notes.selection()
@@ -2620,48 +5265,18 @@ class App(tk.Toplevel):
             return
 
         try:
-            note = float(note_txt.replace(",", "."))
-        except ValueError:
-            messagebox.showerror("Erreur", "Note invalide (ex: 14.5).")
-            return
-
-        if note < 0 or note > 20:
-            messagebox.showerror("Erreur", "La note doit être entre 0 et 20.")
-            return
-
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT note, COALESCE(type_evaluation,''), COALESCE(annee_academique,'') FROM notes WHERE id=?", (note_id,))
-        old = cur.fetchone()
-        if not old:
-            conn.close()
-            messagebox.showerror("Erreur", "Note introuvable.")
+            note = self.grades.parse_note(note_txt)
+        except ValueError as e:
+            messagebox.showerror("Erreur", str(e))
             return
 
-        cur.execute("""
-            UPDATE notes
-            SET note=?, type_evaluation=?, annee_academique=?
-            WHERE id=?
-        """, (note, typ if typ else None, annee if annee else None, note_id))
-
-        cur.execute("""
-            INSERT INTO notes_audit (note_id, action, old_value, new_value, changed_at, changed_by)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (
-            note_id,
-            "UPDATE",
-            f"note={old[0]};type={old[1]};annee={old[2]}",
-            f"note={note};type={typ};annee={annee}",
-            now_iso(),
-            self.username
-        ))
-
-        conn.commit()
-        conn.close()
+        def done(_):
+            self.patch_tree_row(self.tree_notes, self.grades.row(note_id))
+            self.publish_change(("notes", "update"), ("notes_audit", "insert"), skip={"refresh_notes_lists"})
+            self.refresh_audit_for_selected_note()
+            messagebox.showinfo("OK", "Note modifiée (traçabilité enregistrée).")
 
-        self.refresh_notes_lists()
-        self.refresh_audit_for_selected_note()
-        messagebox.showinfo("OK", "Note modifiée (traçabilité enregistrée).")
+        self.run_write(self.grades.update, note_id, note, typ, annee, on_done=done)
 
     def delete_note_selected(self):
         note_id = self._selected_note_id()
@@ -2671,58 +5286,20 @@ class App(tk.Toplevel):
         if not messagebox.askyesno("Confirmer", "Supprimer la note sélectionnée ?"):
             return
 
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT note, COALESCE(type_evaluation,''), COALESCE(annee_academique,'') FROM notes WHERE id=?", (note_id,))
-        old = cur.fetchone()
-
-        cur.execute("""
-            INSERT INTO notes_audit (note_id, action, old_value, new_value, changed_at, changed_by)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (
-            note_id,
-            "DELETE",
-            f"note={old[0]};type={old[1]};annee={old[2]}" if old else None,
-            None,
-            now_iso(),
-            self.username
-        ))
-
-        cur.execute("DELETE FROM notes WHERE id=?", (note_id,))
-        conn.commit()
-        conn.close()
+        def done(_):
+            self.remove_tree_row(self.tree_notes, note_id)
+            self.publish_change(("notes", "delete"), ("notes_audit", "insert"), skip={"refresh_notes_lists"})
+            for r in self.tree_audit.get_children():
+                self.tree_audit.delete(r)
+            messagebox.showinfo("OK", "Note supprimée.")
 
-        self.refresh_notes_lists()
-        for r in self.tree_audit.get_children():
-            self.tree_audit.delete(r)
-        messagebox.showinfo("OK", "Note supprimée.")
+        self.run_write(self.grades.delete, note_id, on_done=done)
 
     def refresh_notes_lists(self):
         if not hasattr(self, "tree_notes"):
             return
-        for row in self.tree_notes.get_children():
-            self.tree_notes.delete(row)
-
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT no.id,
-                   e.matricule || ' - ' || e.nom || ' ' || e.prenom AS etu,
-                   m.code || ' - ' || m.nom AS mod,
-                   no.note,
-                   m.coefficient,
-                   COALESCE(no.annee_academique,''),
-                   COALESCE(no.type_evaluation,'')
-            FROM notes no
-            JOIN etudiants e ON e.id = no.etudiant_id
-            JOIN modules m   ON m.id = no.module_id
-            ORDER BY no.id DESC
-        """)
-        rows = cur.fetchall()
-        conn.close()
-
-        for r in rows:
-            self.tree_notes.insert("", "end", values=r)
+        sql, params, keys = self.grades.list_query()
+        self.tree_notes.set_query(sql, params, keys=keys)
 
     def refresh_audit_for_selected_note(self, event=None):
         note_id = self._selected_note_id()
@@ -2731,18 +5308,7 @@ class App(tk.Toplevel):
         for row in self.tree_audit.get_children():
             self.tree_audit.delete(row)
 
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id, action, COALESCE(old_value,''), COALESCE(new_value,''), COALESCE(changed_at,''), COALESCE(changed_by,'')
-            FROM notes_audit
-            WHERE note_id=?
-            ORDER BY id DESC
-        """, (note_id,))
-        rows = cur.fetchall()
-        conn.close()
-
-        for r in rows:
+        for r in self.grades.audit(note_id):
             self.tree_audit.insert("", "end", values=r)
 
     def compute_moyenne(self):
@@ -2751,24 +5317,12 @@ class App(tk.Toplevel):
             messagebox.showerror("Erreur", "Choisis un étudiant.")
             return
 
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT SUM(no.note * m.coefficient) AS total_points,
-                   SUM(m.coefficient) AS total_coef
-            FROM notes no
-            JOIN modules m ON m.id = no.module_id
-            WHERE no.etudiant_id = ?
-        """, (etu_id,))
-        row = cur.fetchone()
-        conn.close()
-
-        if not row or row[0] is None or row[1] is None or row[1] == 0:
+        moyenne, mention, nb_notes = self.students.average(etu_id)
+        if not nb_notes:
             self.lbl_moyenne.config(text="Moyenne: - (aucune note)")
             return
 
-        moyenne = row[0] / row[1]
-        self.lbl_moyenne.config(text=f"Moyenne: {moyenne:.2f} / 20")
+        self.lbl_moyenne.config(text=f"Moyenne: {moyenne:.2f} / 20 ({mention})")
 
     # ABSENCES
 
@@ -2809,7 +5363,7 @@ class App(tk.Toplevel):
         bottom.pack(fill="both", expand=True, pady=(10, 0))
 
         cols = ("id", "etudiant", "module", "date", "justifiee", "motif")
-        self.tree_absences = ttk.Treeview(bottom, columns=cols, show="headings")
+        self.tree_absences = VirtualTreeview(bottom, columns=cols, show="headings")
         for c in cols:
             self.tree_absences.heading(c, text=c)
             self.tree_absences.column(c, width=160, anchor="w")
@@ -2845,38 +5399,24 @@ class App(tk.Toplevel):
             messagebox.showerror("Erreur", "Étudiant, module et date sont obligatoires.")
             return
 
-        conn = db_connect()
-        cur = conn.cursor()
-        try:
-            # GESTION AJOUT vs MODIFICATION
-            if hasattr(self, 'current_edit_absence_id'):
-                cur.execute("""
-                    UPDATE absences 
-                    SET etudiant_id=?, module_id=?, date_absence=?, justifiee=?, motif=?
-                    WHERE id=?
-                """, (etu_id, mod_id, date_abs, just, motif if motif else None, self.current_edit_absence_id))
-                
+        # GESTION AJOUT vs MODIFICATION
+        edit_id = getattr(self, 'current_edit_absence_id', None)
+        op = "update" if edit_id else "insert"
+
+        def done(_):
+            if edit_id:
                 messagebox.showinfo("Succès", "Absence modifiée.")
-                del self.current_edit_absence_id
+                self.current_edit_absence_id = None
                 self.btn_abs_action.config(text="Enregistrer absence")
             else:
-                cur.execute("""
-                    INSERT INTO absences (etudiant_id, module_id, date_absence, justifiee, motif)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (etu_id, mod_id, date_abs, just, motif if motif else None))
-                
                 messagebox.showinfo("Succès", "Absence enregistrée.")
-            
-            conn.commit()
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur SQL: {e}")
-        finally:
-            conn.close()
+            # Réinitialisation
+            self.e_abs_motif.delete(0, tk.END)
+            self.var_justifiee.set(0)
+            self.publish_change(("absences", op))
 
-        # Réinitialisation
-        self.e_abs_motif.delete(0, tk.END)
-        self.var_justifiee.set(0)        
-        self.refresh_absences()
+        self.run_write(lambda: self.absences.save(etu_id, mod_id, date_abs, just, motif, absence_id=edit_id),
+                       on_done=done)
 
 
     def load_absence_to_edit(self):
@@ -2888,17 +5428,12 @@ class App(tk.Toplevel):
         values = self.tree_absences.item(sel[0], 'values')
         abs_id = int(values[0]) 
 
-        conn = db_connect()
-        cur = conn.cursor()
         # On récupère les IDs bruts pour remplir les combobox correctement
-        cur.execute("SELECT etudiant_id, module_id, date_absence, justifiee, motif FROM absences WHERE id=?", (abs_id,))
-        row = cur.fetchone()
-        conn.close()
-
-        if not row:
+        absence = self.absences.get(abs_id)
+        if not absence:
             return
 
-        etu_id, mod_id, date_val, just_val, motif_val = row
+        etu_id, mod_id, date_val, just_val, motif_val = absence[1:]
 
         # Remplir les champs
         # Pour les combobox, on cherche l'élément qui commence par l'ID
@@ -2933,52 +5468,29 @@ class App(tk.Toplevel):
 
         abs_id = int(self.tree_absences.item(sel[0], 'values')[0])
 
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM absences WHERE id=?", (abs_id,))
-        conn.commit()
-        conn.close()
+        def done(_):
+            self.remove_tree_row(self.tree_absences, abs_id)
+            # Mettre à jour les stats instantanément
+            self.refresh_absence_stats()
+            self.publish_change(("absences", "delete"), skip={"refresh_absences"})
 
-        self.refresh_absences()
-        # Mettre à jour les stats instantanément
-        self.refresh_dashboard()
+        self.run_write(self.absences.delete, abs_id, on_done=done)
 
 
     def refresh_absences(self):
         if not hasattr(self, "tree_absences"):
             return
 
-        for row in self.tree_absences.get_children():
-            self.tree_absences.delete(row)
-
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT a.id,
-                   e.nom || ' ' || e.prenom,
-                   m.code || ' - ' || m.nom,
-                   a.date_absence,
-                   CASE a.justifiee WHEN 1 THEN 'Oui' ELSE 'Non' END,
-                   COALESCE(a.motif,'')
-            FROM absences a
-            JOIN etudiants e ON e.id = a.etudiant_id
-            JOIN modules m ON m.id = a.module_id
-            ORDER BY a.date_absence DESC
-        """)
-        rows = cur.fetchall()
-
-        cur.execute("SELECT COUNT(*) FROM absences")
-        total_abs = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM etudiants")
-        nb_etu = cur.fetchone()[0]
-
-        conn.close()
+        sql, params, keys = self.absences.list_query()
+        self.tree_absences.set_query(sql, params, keys=keys)
+        self.refresh_absence_stats()
 
-        for r in rows:
-            self.tree_absences.insert("", "end", values=r)
+    def refresh_absence_stats(self):
+        if not hasattr(self, "lbl_abs_stats"):
+            return
 
-        taux = (total_abs / nb_etu) if nb_etu else 0.0
-        self.lbl_abs_stats.config(text=f"Taux: {taux:.2f} abs/étudiant | Alertes: -")
+        stats = self.absences.stats()
+        self.lbl_abs_stats.config(text=f"Taux: {stats.taux:.2f} abs/étudiant | Alertes: -")
 
     def show_absence_alerts(self):
         try:
@@ -2987,18 +5499,7 @@ class App(tk.Toplevel):
             messagebox.showerror("Erreur", "Seuil invalide.")
             return
 
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT e.matricule, e.nom || ' ' || e.prenom, COUNT(*) as nb
-            FROM absences a
-            JOIN etudiants e ON e.id=a.etudiant_id
-            GROUP BY a.etudiant_id
-            HAVING nb >= ?
-            ORDER BY nb DESC
-        """, (seuil,))
-        rows = cur.fetchall()
-        conn.close()
+        rows = self.absences.alerts(seuil)
 
         if not rows:
             messagebox.showinfo("Alertes", "Aucune alerte.")
@@ -3097,28 +5598,19 @@ class App(tk.Toplevel):
         ttk.Button(btn_frame, text="Supprimer affectation", command=self.delete_affectation).pack(side="right", padx=4)
 
     def add_enseignant(self):
-        nom = self.e_ens_nom.get().strip()
-        prenom = self.e_ens_pre.get().strip()
-        email = self.e_ens_mail.get().strip() or None
-
-        if not nom or not prenom:
-            messagebox.showerror("Erreur", "Nom et prénom obligatoires.")
-            return
-
-        conn = db_connect()
-        cur = conn.cursor()
         try:
-            cur.execute("INSERT INTO enseignants (nom, prenom, email) VALUES (?, ?, ?)", (nom, prenom, email))
-            conn.commit()
+            self.teachers.create(self.e_ens_nom.get(), self.e_ens_pre.get(), self.e_ens_mail.get().strip())
+        except ValueError as e:
+            messagebox.showerror("Erreur", str(e))
+            return
         except sqlite3.IntegrityError:
             messagebox.showerror("Erreur", "Email déjà utilisé.")
-        finally:
-            conn.close()
+            return
 
         self.e_ens_nom.delete(0, tk.END)
         self.e_ens_pre.delete(0, tk.END)
         self.e_ens_mail.delete(0, tk.END)
-        self.refresh_enseignants()
+        self.publish_change(("enseignants", "insert"))
 
     def edit_enseignant(self):
         sel = self.tree_ens.selection()
@@ -3128,11 +5620,7 @@ class App(tk.Toplevel):
         values = self.tree_ens.item(sel[0], 'values')
         ens_id = int(values[0])
 
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT nom, prenom, email FROM enseignants WHERE id=?", (ens_id,))
-        row = cur.fetchone()
-        conn.close()
+        row = self.teachers.get(ens_id)
         if not row:
             messagebox.showerror("Erreur", "Enseignant introuvable.")
             return
@@ -3154,12 +5642,8 @@ class App(tk.Toplevel):
         ens_id = int(values[0])
         if not messagebox.askyesno("Confirmation", "Supprimer cet enseignant et toutes ses affectations ?"):
             return
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM enseignants WHERE id=?", (ens_id,))
-        conn.commit()
-        conn.close()
-        self.refresh_enseignants()
+        self.teachers.delete(ens_id)
+        self.publish_change(("enseignants", "delete"), ("enseignements", "delete"))
 
     def delete_affectation(self):
         sel = self.tree_aff.selection()
@@ -3170,12 +5654,8 @@ class App(tk.Toplevel):
         aff_id = int(values[0])
         if not messagebox.askyesno("Confirmation", "Supprimer cette affectation ?"):
             return
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM enseignements WHERE id=?", (aff_id,))
-        conn.commit()
-        conn.close()
-        self.refresh_enseignants()
+        self.teachers.delete_assignment(aff_id)
+        self.publish_change(("enseignements", "delete"))
 
     def load_affectation_to_edit(self, event=None):
         sel = self.tree_aff.selection()
@@ -3183,18 +5663,9 @@ class App(tk.Toplevel):
             messagebox.showerror("Erreur", "Sélectionnez d'abord une affectation.")
             return
         values = self.tree_aff.item(sel[0], 'values')
-        aff_id = int(values[0])
-
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT en.enseignant_id, en.module_id, m.filiere_id, m.niveau_id, en.groupe, en.annee_academique 
-            FROM enseignements en
-            JOIN modules m ON m.id = en.module_id
-            WHERE en.id=?
-        """, (aff_id,))
-        row = cur.fetchone()
-        conn.close()
+        aff_id = int(values[0])
+
+        row = self.teachers.get_assignment(aff_id)
         if not row:
             messagebox.showerror("Erreur", "Affectation introuvable.")
             return
@@ -3224,9 +5695,9 @@ class App(tk.Toplevel):
                     break
         
         if groupe:
-            for v in self.cb_groupe['values']:
+            for v in self.cb_aff_groupe['values']:
                 if v.startswith(f"{groupe} -"):  # On cherche par ID
-                    self.cb_groupe.set(v)
+                    self.cb_aff_groupe.set(v)
                     break
         
         self.cb_aff_annee.set(annee or "")
@@ -3238,13 +5709,8 @@ class App(tk.Toplevel):
         if not fil_text: return
         
         fil_id = self.parse_id_from_combo(fil_text)
-        
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT id, nom FROM specialites WHERE filiere_id=? ORDER BY nom", (fil_id,))
-        specs = cur.fetchall()
-        conn.close()
-        
+        specs = self.teachers.specialite_choices(fil_id)
+
         # On remplit la combobox des spécialités
         self.cb_aff_specialite['values'] = [f"{sid} - {nom}" for (sid, nom) in specs]
         self.cb_aff_specialite.set("")
@@ -3264,15 +5730,7 @@ class App(tk.Toplevel):
             return
         
         # Load groupes for this filière+niveau
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT DISTINCT groupe_id FROM inscriptions 
-            WHERE filiere_id=? AND niveau_id=? AND groupe_id IS NOT NULL
-            ORDER BY groupe_id
-        """, (fil_id, niv_id))
-        groupes = cur.fetchall()
-        conn.close()
+        groupes = self.structure.groupes_filiere_niveau(fil_id, niv_id)
         
         groupe_values = [str(row[0]) for row in groupes] if groupes else []
         # Also add default groups
@@ -3290,31 +5748,20 @@ class App(tk.Toplevel):
         groupe = self.cb_aff_groupe.get().strip() or None
         annee = self.cb_aff_annee.get().strip() or None
 
-        if not ens_id or not mod_id:
-            messagebox.showerror("Erreur", "Enseignant et module obligatoires.")
-            return
-
-        conn = db_connect()
-        cur = conn.cursor()
+        affectation_id = getattr(self, 'current_edit_affectation_id', None)
+        op = "update" if affectation_id else "insert"
         try:
-            # Si on est en édition d'une affectation existante, mettre à jour
-            if hasattr(self, 'current_edit_affectation_id'):
-                cur.execute("""
-                    UPDATE enseignements SET enseignant_id=?, module_id=?, groupe=?, annee_academique=? WHERE id=?
-                """, (ens_id, mod_id, groupe, annee, self.current_edit_affectation_id))
-                del self.current_edit_affectation_id
-            else:
-                cur.execute("""
-                    INSERT INTO enseignements (enseignant_id, module_id, groupe, annee_academique)
-                    VALUES (?, ?, ?, ?)
-                """, (ens_id, mod_id, groupe, annee))
-            conn.commit()
+            self.teachers.save_assignment(ens_id, mod_id, groupe, annee, affectation_id)
+        except ValueError as e:
+            messagebox.showerror("Erreur", str(e))
+            return
         except sqlite3.IntegrityError:
             messagebox.showerror("Erreur", "Affectation déjà existante.")
-        finally:
-            conn.close()
+            return
+        if affectation_id:
+            del self.current_edit_affectation_id
 
-        self.refresh_enseignants()
+        self.publish_change(("enseignements", op))
         messagebox.showinfo("OK", "Affectation enregistrée.")
 
     def refresh_enseignants(self):
@@ -3326,42 +5773,24 @@ class App(tk.Toplevel):
         for r in self.tree_aff.get_children():
             self.tree_aff.delete(r)
 
-        conn = db_connect()
-        cur = conn.cursor()
-        
         # 1. Charger les enseignants
-        cur.execute("SELECT id, nom, prenom, COALESCE(email,'') FROM enseignants ORDER BY nom, prenom")
-        ens = cur.fetchall()
+        ens = self.teachers.rows()
         self.cb_aff_ens["values"] = [f"{eid} - {n} {p}" for (eid, n, p, _) in ens]
         for row in ens:
             self.tree_ens.insert("", "end", values=row)
 
         # 2. CHARGEMENT DES CHAMPS MANQUANTS (Correction)
         # Filières
-        cur.execute("SELECT id, code, nom FROM filieres ORDER BY code")
-        self.cb_aff_filiere["values"] = [f"{fid} - {code} - {nom}" for (fid, code, nom) in cur.fetchall()]
+        self.cb_aff_filiere["values"] = [f"{fid} - {code} - {nom}" for (fid, code, nom) in self.structure.filieres()]
         
         # Niveaux
-        cur.execute("SELECT id, code, nom FROM niveaux ORDER BY ordre")
-        self.cb_aff_niveau["values"] = [f"{nid} - {code} - {nom}" for (nid, code, nom) in cur.fetchall()]
+        self.cb_aff_niveau["values"] = [f"{nid} - {code} - {nom}" for (nid, code, nom, _) in self.structure.niveaux()]
         
         # Groupes
-        cur.execute("SELECT id, code, nom FROM groupes ORDER BY code")
-        self.cb_aff_groupe["values"] = [f"{gid} - {code} - {nom}" for (gid, code, nom) in cur.fetchall()]
+        self.cb_aff_groupe["values"] = [f"{gid} - {code} - {nom}" for (gid, code, nom) in self.structure.groupes()]
 
         # 3. Charger les affectations existantes
-        cur.execute("""
-            SELECT en.id, e.nom || ' ' || e.prenom, m.code || ' - ' || m.nom,
-                COALESCE(en.groupe,''), COALESCE(en.annee_academique,'')
-            FROM enseignements en
-            JOIN enseignants e ON e.id=en.enseignant_id
-            JOIN modules m ON m.id=en.module_id
-            ORDER BY en.id DESC
-        """)
-        aff = cur.fetchall()
-        conn.close()
-
-        for row in aff:
+        for row in self.teachers.assignments():
             self.tree_aff.insert("", "end", values=row)
 
     # CALENDRIER
@@ -3454,39 +5883,30 @@ class App(tk.Toplevel):
         deb = self.e_sem_deb.get().strip()
         fin = self.e_sem_fin.get().strip()
 
-        if not code or not deb or not fin:
-            messagebox.showerror("Erreur", "Code + dates début/fin obligatoires.")
-            return
-
-        conn = db_connect()
-        cur = conn.cursor()
+        semestre_id = getattr(self, 'current_edit_semestre_id', None)
+        op = "update" if semestre_id else "insert"
         try:
-            # GESTION MODIFICATION vs AJOUT
-            if hasattr(self, 'current_edit_semestre_id'):
-                cur.execute("""
-                    UPDATE semestres SET code=?, libelle=?, date_debut=?, date_fin=?
-                    WHERE id=?
-                """, (code, lib, deb, fin, self.current_edit_semestre_id))
-                messagebox.showinfo("Succès", "Semestre modifié.")
-                del self.current_edit_semestre_id
-                self.btn_sem_action.config(text="Ajouter semestre")
-            else:
-                cur.execute("INSERT INTO semestres (code, libelle, date_debut, date_fin) VALUES (?, ?, ?, ?)", 
-                           (code, lib, deb, fin))
-                messagebox.showinfo("Succès", "Semestre ajouté.")
-            
-            conn.commit()
+            self.calendar.save_semestre(code, lib, deb, fin, semestre_id)
+        except ValueError as e:
+            messagebox.showerror("Erreur", str(e))
+            return
         except sqlite3.IntegrityError:
             messagebox.showerror("Erreur", "Code semestre déjà utilisé.")
-        finally:
-            conn.close()
+            return
+        # GESTION MODIFICATION vs AJOUT
+        if semestre_id:
+            messagebox.showinfo("Succès", "Semestre modifié.")
+            del self.current_edit_semestre_id
+            self.btn_sem_action.config(text="Ajouter semestre")
+        else:
+            messagebox.showinfo("Succès", "Semestre ajouté.")
 
         # Nettoyage
         self.e_sem_code.delete(0, tk.END)
         self.e_sem_lib.delete(0, tk.END)
         self.e_sem_deb.delete(0, tk.END)
         self.e_sem_fin.delete(0, tk.END)
-        self.refresh_calendrier()
+        self.publish_change(("semestres", op))
 
     def load_semestre_to_edit(self):
         """Charger le semestre sélectionné pour modification"""
@@ -3529,20 +5949,13 @@ class App(tk.Toplevel):
 
         s_id = int(self.tree_sem.item(sel[0], 'values')[0])
 
-        conn = db_connect()
-        cur = conn.cursor()
         try:
-            # La suppression en cascade (ON DELETE CASCADE) gérera les périodes si configurée,
-            # sinon on force le nettoyage.
-            cur.execute("DELETE FROM semestres WHERE id=?", (s_id,))
-            conn.commit()
+            self.calendar.delete_semestre(s_id)
             messagebox.showinfo("Succès", "Semestre supprimé.")
         except Exception as e:
             messagebox.showerror("Erreur", f"Impossible de supprimer : {e}")
-        finally:
-            conn.close()
 
-        self.refresh_calendrier()
+        self.publish_change(("semestres", "delete"), ("periodes", "delete"))
 
     def add_periode(self):
         sem_id = self.parse_id_from_combo(self.cb_per_sem.get())
@@ -3551,39 +5964,29 @@ class App(tk.Toplevel):
         deb = self.e_per_deb.get().strip()
         fin = self.e_per_fin.get().strip()
 
-        if not sem_id or not typ or not deb or not fin:
-            messagebox.showerror("Erreur", "Semestre, type et dates obligatoires.")
-            return
-
-        conn = db_connect()
-        cur = conn.cursor()
+        periode_id = getattr(self, 'current_edit_periode_id', None)
+        op = "update" if periode_id else "insert"
         try:
-            if hasattr(self, 'current_edit_periode_id'):
-                cur.execute("""
-                    UPDATE periodes SET semestre_id=?, type=?, libelle=?, date_debut=?, date_fin=?
-                    WHERE id=?
-                """, (sem_id, typ, lib, deb, fin, self.current_edit_periode_id))
-                messagebox.showinfo("Succès", "Période modifiée.")
-                del self.current_edit_periode_id
-                self.btn_per_action.config(text="Ajouter période")
-            else:
-                cur.execute("""
-                    INSERT INTO periodes (semestre_id, type, libelle, date_debut, date_fin)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (sem_id, typ, lib, deb, fin))
-                messagebox.showinfo("Succès", "Période ajoutée.")
-            conn.commit()
+            self.calendar.save_periode(sem_id, typ, lib, deb, fin, periode_id)
+        except ValueError as e:
+            messagebox.showerror("Erreur", str(e))
+            return
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur SQL: {e}")
-        finally:
-            conn.close()
+            return
+        if periode_id:
+            messagebox.showinfo("Succès", "Période modifiée.")
+            del self.current_edit_periode_id
+            self.btn_per_action.config(text="Ajouter période")
+        else:
+            messagebox.showinfo("Succès", "Période ajoutée.")
 
         # Reset des champs
         self.cb_per_type.set("")
         self.e_per_lib.delete(0, tk.END)
         self.e_per_deb.delete(0, tk.END)
         self.e_per_fin.delete(0, tk.END)
-        self.refresh_calendrier()
+        self.publish_change(("periodes", op))
     
     def load_periode_to_edit(self):
         """Charger la période sélectionnée pour modification"""
@@ -3601,11 +6004,7 @@ class App(tk.Toplevel):
         p_fin = values[5]
 
         # Retrouver l'ID complet du semestre pour la combobox
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT semestre_id FROM periodes WHERE id=?", (p_id,))
-        sem_id = cur.fetchone()[0]
-        conn.close()
+        sem_id = self.calendar.periode_semestre(p_id)
 
         # Remplir le formulaire
         for val in self.cb_per_sem['values']:
@@ -3635,13 +6034,9 @@ class App(tk.Toplevel):
 
         p_id = int(self.tree_per.item(sel[0], 'values')[0])
 
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM periodes WHERE id=?", (p_id,))
-        conn.commit()
-        conn.close()
+        self.calendar.delete_periode(p_id)
 
-        self.refresh_calendrier()
+        self.publish_change(("periodes", "delete"))
 
     def refresh_calendrier(self):
         if not hasattr(self, "tree_sem"):
@@ -3651,26 +6046,13 @@ class App(tk.Toplevel):
         for r in self.tree_per.get_children():
             self.tree_per.delete(r)
 
-        conn = db_connect()
-        cur = conn.cursor()
-
-        cur.execute("SELECT id, code, COALESCE(libelle,''), date_debut, date_fin FROM semestres ORDER BY date_debut")
-        sem = cur.fetchall()
+        sem = self.calendar.semestres()
         for row in sem:
             self.tree_sem.insert("", "end", values=row)
 
         self.cb_per_sem["values"] = [f"{sid} - {code} ({deb}→{fin})" for (sid, code, _, deb, fin) in sem]
 
-        cur.execute("""
-            SELECT p.id, s.code, p.type, COALESCE(p.libelle,''), p.date_debut, p.date_fin
-            FROM periodes p
-            JOIN semestres s ON s.id=p.semestre_id
-            ORDER BY p.date_debut
-        """)
-        per = cur.fetchall()
-        conn.close()
-
-        for row in per:
+        for row in self.calendar.periodes():
             self.tree_per.insert("", "end", values=row)
 
     # DASHBOARD
@@ -3709,29 +6091,13 @@ class App(tk.Toplevel):
 
         ttk.Button(frm, text="Rafraîchir", command=self.refresh_dashboard).pack(anchor="e", pady=(10, 0))
 
-    def create_grade_distribution_chart(self):
+    def create_grade_distribution_chart(self, mentions_count):
         """Crée un graphique de distribution des mentions académiques"""
-        conn = db_connect()
-        cur = conn.cursor()
-        
-        # Récupérer les données de notes
-        cur.execute("SELECT note FROM notes WHERE note IS NOT NULL")
-        notes = [row[0] for row in cur.fetchall()]
-        conn.close()
-        
-        if not notes:
+        from matplotlib.figure import Figure
+
+        if not any(mentions_count.values()):
             return None
         
-        # Créer les catégories de mentions
-        mentions_count = {
-            "Excellente (≥18)": len([n for n in notes if n >= 18]),
-            "Très bien (≥16)": len([n for n in notes if 16 <= n < 18]),
-            "Bien (≥14)": len([n for n in notes if 14 <= n < 16]),
-            "Assez bien (≥12)": len([n for n in notes if 12 <= n < 14]),
-            "Passable (≥10)": len([n for n in notes if 10 <= n < 12]),
-            "Insuffisant (<10)": len([n for n in notes if n < 10]),
-        }
-        
         fig = Figure(figsize=(5, 3.5), dpi=100)
         ax = fig.add_subplot(111)
         
@@ -3747,104 +6113,113 @@ class App(tk.Toplevel):
         
         return fig
 
-    def create_absences_distribution_chart(self):
-        """Crée un graphique de distribution des absences par niveau"""
-        conn = db_connect()
-        cur = conn.cursor()
-        
-        # Récupérer les absences par niveau
-        cur.execute("""
-            SELECT n.nom, COUNT(a.id) as nb_absences
-            FROM absences a
-            LEFT JOIN modules m ON m.id = a.module_id
-            LEFT JOIN niveaux n ON n.id = (
-                SELECT niveau_id FROM inscriptions WHERE etudiant_id = a.etudiant_id LIMIT 1
-            )
-            GROUP BY n.nom
-            ORDER BY nb_absences DESC
-            LIMIT 8
-        """)
-        data = cur.fetchall()
-        conn.close()
-        
-        if not data:
-            return None
-        
+    def update_grade_distribution_chart(self, fig, mentions_count):
+        """Met à jour les barres existantes (les mentions ne changent pas)"""
+        ax = fig.axes[0]
+        counts = list(mentions_count.values())
+        for bar, count in zip(ax.patches, counts):
+            bar.set_height(count)
+        ax.set_ylim(0, max(max(counts), 1) * 1.05)
+
+    def plot_absences_distribution(self, ax, data):
         niveaux = [row[0] if row[0] else "Non assigné" for row in data]
         absences = [row[1] for row in data]
-        
-        fig = Figure(figsize=(5, 3.5), dpi=100)
-        ax = fig.add_subplot(111)
-        
+
         ax.barh(niveaux, absences, color='#e74c3c', edgecolor='black', linewidth=0.5)
         ax.set_xlabel('Nombre d\'absences', fontsize=10)
         ax.set_title('Absences par niveau', fontsize=11, fontweight='bold')
         ax.tick_params(axis='y', labelsize=9)
+
+    def create_absences_distribution_chart(self, data):
+        """Crée un graphique de distribution des absences par niveau"""
+        from matplotlib.figure import Figure
+
+        if not data:
+            return None
+        
+        fig = Figure(figsize=(5, 3.5), dpi=100)
+        ax = fig.add_subplot(111)
+        self.plot_absences_distribution(ax, data)
         fig.tight_layout()
         
         return fig
 
-    def refresh_dashboard(self):
-        if not hasattr(self, "lbl_kpis"):
-            return
-
-        conn = db_connect()
-        cur = conn.cursor()
-
-        cur.execute("SELECT COUNT(*) FROM etudiants")
-        nb_etudiants = cur.fetchone()[0]
-
-        cur.execute("SELECT COUNT(*) FROM modules")
-        nb_modules = cur.fetchone()[0]
-
-        cur.execute("SELECT COUNT(*) FROM inscriptions")
-        nb_inscriptions = cur.fetchone()[0]
-
-        cur.execute("SELECT COUNT(*) FROM absences")
-        nb_absences = cur.fetchone()[0]
+    def update_absences_distribution_chart(self, fig, data):
+        """Redessine les barres sur les Axes existants (les niveaux affichés peuvent changer)"""
+        ax = fig.axes[0]
+        ax.clear()
+        self.plot_absences_distribution(ax, data)
+        fig.tight_layout()
 
-        cur.execute("""
-            SELECT e.matricule, e.nom || ' ' || e.prenom, COUNT(*) as nb
-            FROM absences a
-            JOIN etudiants e ON e.id=a.etudiant_id
-            GROUP BY a.etudiant_id
-            ORDER BY nb DESC
-            LIMIT 5
-        """)
-        top_abs = cur.fetchall()
-        conn.close()
+    def show_dashboard_chart(self, name, master, data, create, update):
+        """Crée le graphique au premier affichage, puis met à jour sa Figure en place."""
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
-        self.lbl_kpis.config(
-            text=f"Étudiants: {nb_etudiants} | Modules: {nb_modules} | "
-                 f"Inscriptions: {nb_inscriptions} | Absences: {nb_absences}"
-        )
+        chart = self._dashboard_charts.get(name)
+        if chart is None:
+            fig = create(data)
+            if fig is None:
+                return
+            chart = FigureCanvasTkAgg(fig, master=master)
+            chart.get_tk_widget().pack(fill="both", expand=True)
+            self._dashboard_charts[name] = chart
+            chart.draw()
+        else:
+            update(chart.figure, data)
+            chart.draw_idle()
+
+    def invalidate_dashboard(self, part):
+        """Marque une partie à relire : au prochain idle si le tableau de bord est affiché
+        (une seule lecture pour les écritures d'un même cycle), sinon à son affichage."""
+        self._dashboard_stale.add(part)
+        if self.current_tab() == "dashboard" and self._dashboard_after is None:
+            self._dashboard_after = self.after_idle(self.refresh_dashboard_stale)
+
+    def refresh_dashboard_stale(self):
+        self._dashboard_after = None
+        parts, self._dashboard_stale = self._dashboard_stale, set()
+        if parts:
+            self.refresh_dashboard(parts)
+
+    def refresh_dashboard(self, parts=None):
+        """Relit les parties `parts` du tableau de bord (toutes par défaut) hors du thread Tk."""
+        if not hasattr(self, "lbl_kpis"):
+            return
+        if parts is None:
+            self._dashboard_stale.clear()
+        # Une lecture en cours est annulée par la suivante : ses parties sont reprises
+        parts = set(self.DASHBOARD_DEPENDENCIES if parts is None else parts) | self._dashboard_loading
+        self._dashboard_loading = parts
+        self.run_in_background(load_dashboard_data, parts, key="dashboard", on_done=self.apply_dashboard)
+
+    def apply_dashboard(self, data):
+        self._dashboard_loading = set()
+        changed = {key for key, value in data.items() if self._dashboard_data.get(key) != value}
+        self._dashboard_data.update(data)
+        cache = self._dashboard_data
+
+        if changed & {"nb_etudiants", "nb_modules", "nb_inscriptions", "nb_absences"}:
+            self.lbl_kpis.config(
+                text=f"Étudiants: {cache.get('nb_etudiants', '-')} | Modules: {cache.get('nb_modules', '-')} | "
+                     f"Inscriptions: {cache.get('nb_inscriptions', '-')} | Absences: {cache.get('nb_absences', '-')}"
+            )
 
-        for row in self.tree_top_abs.get_children():
-            self.tree_top_abs.delete(row)
-        for m, e, n in top_abs:
-            self.tree_top_abs.insert("", "end", values=(m, e, n))
+        if "top_abs" in changed:
+            for row in self.tree_top_abs.get_children():
+                self.tree_top_abs.delete(row)
+            for m, e, n in cache["top_abs"]:
+                self.tree_top_abs.insert("", "end", values=(m, e, n))
 
         # Refresh charts
         try:
-            # Clear previous canvases
-            for widget in self.canvas_grades.winfo_children():
-                widget.destroy()
-            for widget in self.canvas_absences.winfo_children():
-                widget.destroy()
-
-            # Grade distribution chart
-            fig_grades = self.create_grade_distribution_chart()
-            if fig_grades:
-                canvas_grades = FigureCanvasTkAgg(fig_grades, master=self.canvas_grades)
-                canvas_grades.draw()
-                canvas_grades.get_tk_widget().pack(fill="both", expand=True)
-
-            # Absences distribution chart
-            fig_absences = self.create_absences_distribution_chart()
-            if fig_absences:
-                canvas_absences = FigureCanvasTkAgg(fig_absences, master=self.canvas_absences)
-                canvas_absences.draw()
-                canvas_absences.get_tk_widget().pack(fill="both", expand=True)
+            if "mentions" in changed:
+                self.show_dashboard_chart("mentions", self.canvas_grades, cache["mentions"],
+                                          self.create_grade_distribution_chart,
+                                          self.update_grade_distribution_chart)
+            if "absences_niveaux" in changed:
+                self.show_dashboard_chart("absences_niveaux", self.canvas_absences, cache["absences_niveaux"],
+                                          self.create_absences_distribution_chart,
+                                          self.update_absences_distribution_chart)
         except Exception as e:
             print(f"Erreur lors du rendu des graphiques: {e}")
 
@@ -3860,6 +6235,8 @@ class App(tk.Toplevel):
         line.pack(fill="x", pady=10)
         ttk.Button(line, text="Exporter notes (Excel)", command=self.export_notes_xlsx).pack(side="left", padx=6)
         ttk.Button(line, text="Exporter absences (Excel)", command=self.export_absences_xlsx).pack(side="left", padx=6)
+        ttk.Button(line, text="Exporter Parquet (incrémental)", command=self.export_parquet).pack(side="left", padx=6)
+        ttk.Button(line, text="Importer Parquet", command=self.import_parquet).pack(side="left", padx=6)
 
         ttk.Separator(frm, orient="horizontal").pack(fill="x", pady=10)
 
@@ -3880,13 +6257,45 @@ class App(tk.Toplevel):
         self.e_doc_annee.grid(row=0, column=1, padx=8, pady=4, sticky="w")
         ttk.Button(att, text="Attestation PDF", command=self.export_attestation_pdf).grid(row=0, column=2, padx=8)
 
+        lot = ttk.LabelFrame(frm, text="Relevés et attestations par lot", padding=10)
+        lot.pack(fill="x", pady=10)
+
+        ttk.Label(lot, text="Filière").grid(row=0, column=0, sticky="w")
+        self.cb_lot_filiere = ttk.Combobox(lot, width=30, state="readonly")
+        self.cb_lot_filiere.grid(row=0, column=1, padx=8, pady=4, sticky="w")
+        ttk.Label(lot, text="Niveau").grid(row=0, column=2, sticky="w")
+        self.cb_lot_niveau = ttk.Combobox(lot, width=30, state="readonly")
+        self.cb_lot_niveau.grid(row=0, column=3, padx=8, pady=4, sticky="w")
+
+        ttk.Label(lot, text="Groupe").grid(row=1, column=0, sticky="w")
+        self.cb_lot_groupe = ttk.Combobox(lot, width=30, state="readonly")
+        self.cb_lot_groupe.grid(row=1, column=1, padx=8, pady=4, sticky="w")
+        ttk.Label(lot, text="Année").grid(row=1, column=2, sticky="w")
+        self.e_lot_annee = ttk.Entry(lot, width=20)
+        self.e_lot_annee.grid(row=1, column=3, padx=8, pady=4, sticky="w")
+
+        ttk.Label(lot, text="Statut").grid(row=2, column=0, sticky="w")
+        self.e_lot_statut = ttk.Entry(lot, width=20)
+        self.e_lot_statut.grid(row=2, column=1, padx=8, pady=4, sticky="w")
+        self.var_lot_fusion = tk.IntVar()
+        ttk.Checkbutton(lot, text="Un seul PDF", variable=self.var_lot_fusion).grid(row=2, column=3, sticky="w", padx=8, pady=4)
+        self.var_lot_reprendre = tk.IntVar()
+        ttk.Checkbutton(lot, text="Reprendre (garder les PDF présents)", variable=self.var_lot_reprendre).grid(row=2, column=2, sticky="w", pady=4)
+
+        btns = ttk.Frame(lot)
+        btns.grid(row=3, column=0, columnspan=4, sticky="e", pady=6)
+        ttk.Button(btns, text="Générer les relevés", command=self.export_releves_lot).pack(side="left", padx=8)
+        ttk.Button(btns, text="Générer les attestations", command=self.export_attestations_lot).pack(side="left", padx=8)
+
     def refresh_documents_lists(self):
         # alimenté via refresh_inscriptions_lists (cb_doc_etudiant)
         pass
 
     def close_app(self):
         """Ferme l'application complètement"""
+        self.executor.shutdown()
         self.destroy()
+        checkpoint_database()
         if self.root:
             self.root.quit()
         else:
@@ -3901,12 +6310,7 @@ class App(tk.Toplevel):
         path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF", "*.pdf")])
         if not path:
             return
-        conn = db_connect()
-        try:
-            generate_transcript_pdf(conn, etu_id, path)
-        finally:
-            conn.close()
-        messagebox.showinfo("OK", "Relevé PDF généré.")
+        self.run_export(self.documents.transcript, etu_id, path, message="Relevé PDF généré.")
 
     def export_attestation_pdf(self):
         etu_id = self.parse_id_from_combo(self.cb_doc_etudiant.get())
@@ -3917,75 +6321,103 @@ class App(tk.Toplevel):
         path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF", "*.pdf")])
         if not path:
             return
-        conn = db_connect()
-        try:
-            generate_attestation_pdf(conn, etu_id, annee, path)
-        finally:
-            conn.close()
-        messagebox.showinfo("OK", "Attestation PDF générée.")
+        self.run_export(self.documents.attestation, etu_id, annee, path, message="Attestation PDF générée.")
+
+    def _lot_filter(self):
+        """Filtre saisi dans le cadre « par lot » : dict de paramètres des générateurs par lot."""
+        return {
+            "filiere_id": self.parse_id_from_combo(self.cb_lot_filiere.get()),
+            "niveau_id": self.parse_id_from_combo(self.cb_lot_niveau.get()),
+            "groupe_id": self.parse_id_from_combo(self.cb_lot_groupe.get()),
+            "annee": self.e_lot_annee.get().strip() or None,
+            "statut": self.e_lot_statut.get().strip() or None,
+        }
+
+    def _run_pdf_batch(self, fn, filters, title, message):
+        merged = bool(self.var_lot_fusion.get())
+        resume = bool(self.var_lot_reprendre.get())
+        if merged:
+            output = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF", "*.pdf")])
+        else:
+            output = filedialog.askdirectory(title=title)
+        if not output:
+            return
+
+        def done(result):
+            if not result.total:
+                messagebox.showinfo("Info", "Aucun étudiant inscrit ne correspond au filtre.")
+                return
+            text = message.format(result.written)
+            if result.skipped:
+                text += f"\n{result.skipped} déjà présent(s), conservé(s)."
+            messagebox.showinfo("OK", text)
+
+        def job(progress=None):
+            return fn(output, merged=merged, progress=progress, resume=resume, **filters)
+
+        self.run_in_background(job, on_done=done, on_progress=self.on_background_progress,
+                               error_title="Erreur export")
+
+    def export_releves_lot(self):
+        self._run_pdf_batch(self.documents.transcripts_batch, self._lot_filter(),
+                            "Dossier des relevés", "{} relevé(s) généré(s).")
+
+    def export_attestations_lot(self):
+        filters = self._lot_filter()
+        if not filters["annee"]:
+            messagebox.showerror("Erreur", "Année obligatoire pour les attestations.")
+            return
+        self._run_pdf_batch(self.documents.attestations_batch, filters,
+                            "Dossier des attestations", "{} attestation(s) générée(s).")
 
     def export_notes_xlsx(self):
         path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel", "*.xlsx")])
         if not path:
             return
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT no.id,
-                   e.matricule,
-                   e.nom || ' ' || e.prenom AS etudiant,
-                   m.code,
-                   m.nom AS module,
-                   no.note,
-                   m.coefficient,
-                   COALESCE(no.annee_academique,'') AS annee,
-                   COALESCE(no.type_evaluation,'') AS type
-            FROM notes no
-            JOIN etudiants e ON e.id=no.etudiant_id
-            JOIN modules m ON m.id=no.module_id
-            ORDER BY no.id
-        """)
-        rows = cur.fetchall()
-        conn.close()
+        self.run_export(self.documents.export_xlsx, "notes", path, message="Export notes Excel terminé.", progress=True)
 
-        export_query_to_xlsx(
-            ["id", "matricule", "etudiant", "code_module", "module", "note", "coef", "annee", "type"],
-            rows,
-            path,
-            "notes"
-        )
-        messagebox.showinfo("OK", "Export notes Excel terminé.")
+    def export_parquet(self):
+        if not pyarrow_available():
+            messagebox.showerror("Erreur", "Module pyarrow non installé.\nInstallez-le avec : pip install pyarrow")
+            return
+        directory = filedialog.askdirectory(title="Dossier d'export Parquet")
+        if not directory:
+            return
+
+        def done(written):
+            lignes = "\n".join(f"{Path(f).name} : {n} ligne(s)" for f, n in written)
+            messagebox.showinfo("OK", f"Export Parquet terminé.\n{lignes}")
+
+        self.run_in_background(export_columnar, directory, on_done=done,
+                               on_progress=self.on_background_progress, error_title="Erreur export")
+
+    def import_parquet(self):
+        if not pyarrow_available():
+            messagebox.showerror("Erreur", "Module pyarrow non installé.\nInstallez-le avec : pip install pyarrow")
+            return
+        paths = filedialog.askopenfilenames(filetypes=[("Parquet", "*.parquet")])
+        if not paths:
+            return
+
+        def done(result):
+            counts, rejects = result["counts"], result["rejects"]
+            self.publish_change(*[(table, None) for table in counts])
+            lignes = "\n".join(f"{t} : {n} ligne(s)" for t, n in counts.items())
+            msg = f"Import Parquet terminé.\n{lignes}"
+            if rejects:
+                apercu = "\n".join(f"{fichier} ({table} id {row_id}) : {motif}"
+                                    for fichier, table, row_id, motif in rejects[:10])
+                msg += f"\n{len(rejects)} ligne(s) rejetée(s) :\n{apercu}"
+            messagebox.showinfo("OK", msg)
+
+        self.run_in_background(import_columnar, list(paths), on_done=done,
+                               on_progress=self.on_background_progress, error_title="Erreur import")
 
     def export_absences_xlsx(self):
         path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel", "*.xlsx")])
         if not path:
             return
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT a.id,
-                   e.matricule,
-                   e.nom || ' ' || e.prenom AS etudiant,
-                   m.code,
-                   m.nom AS module,
-                   a.date_absence,
-                   a.justifiee,
-                   COALESCE(a.motif,'')
-            FROM absences a
-            JOIN etudiants e ON e.id=a.etudiant_id
-            JOIN modules m ON m.id=a.module_id
-            ORDER BY a.id
-        """)
-        rows = cur.fetchall()
-        conn.close()
-
-        export_query_to_xlsx(
-            ["id", "matricule", "etudiant", "code_module", "module", "date_absence", "justifiee", "motif"],
-            rows,
-            path,
-            "absences"
-        )
-        messagebox.showinfo("OK", "Export absences Excel terminé.")
+        self.run_export(self.documents.export_xlsx, "absences", path, message="Export absences Excel terminé.", progress=True)
 
     # GESTION UTILISATEURS
 
@@ -4059,32 +6491,14 @@ class App(tk.Toplevel):
         prenom = self.e_user_prenom.get().strip()
         email = self.e_user_email.get().strip()
 
-        if not username or not password:
-            messagebox.showerror("Erreur", "Nom d'utilisateur et mot de passe obligatoires.")
-            return
-
-        password_hash = hash_password(password)
-
-        conn = db_connect()
-        cur = conn.cursor()
         try:
-            cur.execute("""
-                INSERT INTO users (username, password_hash, role, nom, prenom, email, date_creation, actif)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                username, password_hash, role,
-                nom if nom else None,
-                prenom if prenom else None,
-                email if email else None,
-                now_iso(),
-                1
-            ))
-            conn.commit()
+            self.users.create(username, password, role, nom, prenom, email)
             messagebox.showinfo("OK", "Utilisateur ajouté.")
+        except ValueError as e:
+            messagebox.showerror("Erreur", str(e))
+            return
         except sqlite3.IntegrityError:
             messagebox.showerror("Erreur", "Nom d'utilisateur ou email déjà utilisé.")
-        finally:
-            conn.close()
 
         # Réinitialiser le formulaire
         self.e_user_username.delete(0, tk.END)
@@ -4106,13 +6520,7 @@ class App(tk.Toplevel):
         values = self.tree_users.item(sel[0], "values")
         user_id = int(values[0])
 
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT username, role, nom, prenom, email FROM users WHERE id=?
-        """, (user_id,))
-        user = cur.fetchone()
-        conn.close()
+        user = self.users.get(user_id)
 
         if user:
             self.e_user_username.delete(0, tk.END)
@@ -4137,17 +6545,8 @@ class App(tk.Toplevel):
             messagebox.showerror("Erreur", "Sélectionnez d'abord un utilisateur.")
             return
 
-        new_password = "Password123"
-        password_hash = hash_password(new_password)
-
-        conn = db_connect()
-        cur = conn.cursor()
-        try:
-            cur.execute("UPDATE users SET password_hash=? WHERE id=?", (password_hash, self.current_edit_user_id))
-            conn.commit()
-            messagebox.showinfo("OK", f"Mot de passe réinitialisé à: {new_password}")
-        finally:
-            conn.close()
+        new_password = self.users.reset_password(self.current_edit_user_id)
+        messagebox.showinfo("OK", f"Mot de passe réinitialisé à: {new_password}")
 
         self.refresh_users_list()
 
@@ -4157,27 +6556,17 @@ class App(tk.Toplevel):
             messagebox.showerror("Erreur", "Sélectionnez d'abord un utilisateur.")
             return
         # Récupérer statut actuel
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT actif FROM users WHERE id=?", (self.current_edit_user_id,))
-        row = cur.fetchone()
-        if not row:
-            conn.close()
+        active = self.users.is_active(self.current_edit_user_id)
+        if active is None:
             messagebox.showerror("Erreur", "Utilisateur introuvable.")
             return
-        current_actif = row[0]
-        new_actif = 0 if current_actif == 1 else 1
 
-        action = "désactiver" if new_actif == 0 else "activer"
+        action = "désactiver" if active else "activer"
         if not messagebox.askyesno("Confirmation", f"{action.capitalize()} cet utilisateur ?"):
-            conn.close()
             return
 
-        cur.execute("UPDATE users SET actif=? WHERE id=?", (new_actif, self.current_edit_user_id))
-        conn.commit()
-        conn.close()
-
-        messagebox.showinfo("OK", f"Utilisateur {'activé' if new_actif==1 else 'désactivé'}.")
+        self.users.set_active(self.current_edit_user_id, not active)
+        messagebox.showinfo("OK", f"Utilisateur {'désactivé' if active else 'activé'}.")
         self.refresh_users_list()
 
     def update_user(self):
@@ -4193,22 +6582,11 @@ class App(tk.Toplevel):
         prenom = self.e_user_prenom.get().strip() or None
         email = self.e_user_email.get().strip() or None
 
-        conn = db_connect()
-        cur = conn.cursor()
         try:
-            if password:
-                password_hash = hash_password(password)
-                cur.execute("UPDATE users SET username=?, password_hash=?, role=?, nom=?, prenom=?, email=? WHERE id=?",
-                            (username, password_hash, role, nom, prenom, email, self.current_edit_user_id))
-            else:
-                cur.execute("UPDATE users SET username=?, role=?, nom=?, prenom=?, email=? WHERE id=?",
-                            (username, role, nom, prenom, email, self.current_edit_user_id))
-            conn.commit()
+            self.users.update(self.current_edit_user_id, username, role, nom, prenom, email, password)
             messagebox.showinfo("OK", "Utilisateur mis à jour.")
         except sqlite3.IntegrityError:
             messagebox.showerror("Erreur", "Nom d'utilisateur ou email déjà utilisé.")
-        finally:
-            conn.close()
 
         self.refresh_users_list()
 
@@ -4220,18 +6598,7 @@ class App(tk.Toplevel):
         for row in self.tree_users.get_children():
             self.tree_users.delete(row)
 
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id, username, role, COALESCE(nom,'') || ' ' || COALESCE(prenom,''), 
-                   COALESCE(email,''), CASE actif WHEN 1 THEN 'Actif' ELSE 'Inactif' END
-            FROM users
-            ORDER BY id DESC
-        """)
-        rows = cur.fetchall()
-        conn.close()
-
-        for r in rows:
+        for r in self.users.rows():
             self.tree_users.insert("", "end", values=r)
 
         # Réinitialiser le formulaire
@@ -4283,16 +6650,7 @@ class Login(tk.Toplevel):
             messagebox.showerror("Erreur", "Champs manquants.")
             return
 
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT role FROM users
-            WHERE username = ? AND password_hash = ? AND actif = 1
-        """, (username, hash_password(password)))
-        row = cur.fetchone()
-        conn.close()
-
-        if not row:
+        if UserService().authenticate(username, password) is None:
             messagebox.showerror("Erreur", "Identifiants invalides.")
             return
 
@@ -4310,5 +6668,5 @@ if __name__ == "__main__":
 
     ttkb.Style(theme="flatly")
 
-    Login(root)
+    login = Login(root)
     root.mainloop()
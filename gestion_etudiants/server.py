@@ -0,0 +1,449 @@
+"""Serveur HTTP/JSON local (asyncio, bibliothèque standard uniquement).
+
+Expose étudiants, inscriptions, notes, absences et documents par les services de main.py.
+Toutes les écritures passent par un unique thread écrivain (une seule connexion :
+plus de verrou disputé entre postes) ; les lectures sont servies par un groupe de
+threads lecteurs, chacun avec sa connexion du pool.
+
+    python -m gestion_etudiants serve [--hote 127.0.0.1] [--port 8765] [--lecteurs 8]
+
+Les postes Tk l'utilisent quand le paramètre serveur_api contient son URL. Chaque
+requête porte le jeton partagé serveur_api_jeton (en-tête Authorization: Bearer),
+créé au premier lancement s'il est vide ; les corps sont en application/json.
+"""
+
+import asyncio
+import hmac
+import json
+import re
+import secrets
+import signal
+import sqlite3
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+import main
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_READERS = 8
+
+# Taille maximale d'un corps de requête (octets ; l'import CSV y voyage) et lignes par page de liste
+MAX_BODY = 16 << 20
+PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+students = main.StudentService()
+enrollments = main.EnrollmentService()
+absences = main.AbsenceService()
+documents = main.DocumentService()
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _json(value):
+    """NamedTuple -> dict (récursif) pour json.dumps."""
+    if hasattr(value, "_asdict"):
+        return {k: _json(v) for k, v in value._asdict().items()}
+    if isinstance(value, (list, tuple)):
+        return [_json(v) for v in value]
+    return value
+
+
+def _int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} invalide : {value}")
+
+
+def _found(value, what):
+    if value is None:
+        raise LookupError(f"{what} introuvable")
+    return value
+
+
+def _bound(value, size):
+    """Clé `apres` : liste JSON de `size` valeurs simples (celle renvoyée dans `suivant`)."""
+    try:
+        bound = json.loads(value)
+    except ValueError:
+        bound = None
+    if (not isinstance(bound, list) or len(bound) != size
+            or not all(isinstance(v, (str, int, float)) and not isinstance(v, bool) for v in bound)):
+        raise ValueError(f"apres invalide : {value} (liste JSON de {size} valeur(s) attendue)")
+    return bound
+
+
+def _page(query, params):
+    """Page d'une ListQuery ; `apres` = clé (liste JSON) de la dernière ligne reçue."""
+    limit = _int(params.get("limite", PAGE_SIZE), "limite")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limite invalide : {limit} (entre 1 et {MAX_PAGE_SIZE})")
+    if query.keys is None:
+        # Liste classée par pertinence : une seule page
+        rows = main.fetch_rows(query.sql + " LIMIT ?", list(query.params) + [limit])
+        return {"lignes": rows, "suivant": None}
+    bound = _bound(params["apres"], len(query.keys)) if params.get("apres") else None
+    rows = main.fetch_keyset_page(query.sql, query.params, query.keys, bound, True, limit)
+    following = [rows[-1][i] for _, i in query.keys] if rows and len(rows) == limit else None
+    return {"lignes": rows, "suivant": following}
+
+
+def _pdf(render, *args) -> bytes:
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = Path(tmp) / "document.pdf"
+        render(*args, str(filepath))
+        return filepath.read_bytes()
+
+
+# ROUTES
+
+def list_etudiants(params, body):
+    filtre = main.StudentFilter(*(params.get(k, "") for k in main.StudentFilter._fields))
+    query = students.search_query(filtre) if any(filtre) else students.list_query()
+    return _page(query, params)
+
+
+def create_etudiant(params, body):
+    fields = {k: body.get(k) for k in ("telephone", "adresse", "date_naissance", "lieu_naissance", "photo_path")}
+    return students.create(body.get("nom"), body.get("prenom"), body.get("email"),
+                           sexe=body.get("sexe") or "M", **fields)
+
+
+def import_etudiants(params, body):
+    # Contenu CSV dans la requête : aucun chemin du serveur n'est accepté
+    content = body.get("contenu")
+    if not isinstance(content, str) or not content.strip():
+        raise ValueError("Contenu CSV obligatoire")
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = Path(tmp) / "import.csv"
+        filepath.write_text(content, encoding="utf-8", newline="")
+        return students.import_csv(str(filepath))
+
+
+def fiche_etudiant(params, body, etudiant_id):
+    return _found(students.sheet(etudiant_id), "Étudiant")
+
+
+def delete_etudiant(params, body, etudiant_id):
+    _found(students.get(etudiant_id), "Étudiant")
+    students.delete(etudiant_id)
+    return {"id": etudiant_id}
+
+
+def moyenne_etudiant(params, body, etudiant_id):
+    _found(students.get(etudiant_id), "Étudiant")
+    return students.average(etudiant_id, params.get("annee") or None)
+
+
+def list_inscriptions(params, body):
+    return _page(enrollments.list_query(), params)
+
+
+def save_inscription(params, body, inscription_id=None):
+    if inscription_id:
+        _found(enrollments.get(inscription_id), "Inscription")
+    return {"id": enrollments.save(body.get("etudiant_id"), body.get("filiere_id"), body.get("niveau_id"),
+                                   body.get("annee"), body.get("groupe_id"), inscription_id=inscription_id)}
+
+
+def get_inscription(params, body, inscription_id):
+    return _found(enrollments.get(inscription_id), "Inscription")
+
+
+def delete_inscription(params, body, inscription_id):
+    _found(enrollments.get(inscription_id), "Inscription")
+    enrollments.delete(inscription_id)
+    return {"id": inscription_id}
+
+
+def _grades(source):
+    return main.GradeService(changed_by=source.get("utilisateur") or "api")
+
+
+def list_notes(params, body):
+    return _page(_grades(params).list_query(), params)
+
+
+def add_note(params, body):
+    grades = _grades(body)
+    note = grades.parse_note(body.get("note"))
+    return {"id": grades.add(body.get("etudiant_id"), body.get("module_id"), note,
+                             body.get("type_evaluation"), body.get("annee"))}
+
+
+def update_note(params, body, note_id):
+    grades = _grades(body)
+    _found(grades.row(note_id), "Note")
+    grades.update(note_id, grades.parse_note(body.get("note")), body.get("type_evaluation"), body.get("annee"))
+    return {"id": note_id}
+
+
+def delete_note(params, body, note_id):
+    grades = _grades(params)
+    _found(grades.row(note_id), "Note")
+    grades.delete(note_id)
+    return {"id": note_id}
+
+
+def audit_note(params, body, note_id):
+    return _grades(params).audit(note_id)
+
+
+def list_absences(params, body):
+    return _page(absences.list_query(), params)
+
+
+def save_absence(params, body, absence_id=None):
+    if absence_id:
+        _found(absences.get(absence_id), "Absence")
+    return {"id": absences.save(body.get("etudiant_id"), body.get("module_id"), body.get("date_absence"),
+                                1 if body.get("justifiee") else 0, body.get("motif"), absence_id=absence_id)}
+
+
+def get_absence(params, body, absence_id):
+    return _found(absences.get(absence_id), "Absence")
+
+
+def delete_absence(params, body, absence_id):
+    _found(absences.get(absence_id), "Absence")
+    absences.delete(absence_id)
+    return {"id": absence_id}
+
+
+def stats_absences(params, body):
+    return absences.stats()
+
+
+def alertes_absences(params, body):
+    return absences.alerts(_int(params.get("seuil", 3), "seuil"))
+
+
+def releve_pdf(params, body, etudiant_id):
+    _found(students.get(etudiant_id), "Étudiant")
+    return _pdf(documents.transcript, etudiant_id)
+
+
+def attestation_pdf(params, body, etudiant_id):
+    _found(students.get(etudiant_id), "Étudiant")
+    return _pdf(documents.attestation, etudiant_id, params.get("annee"))
+
+
+# (méthode, chemin, fonction, écriture) ; {id} : entier passé en dernier argument
+ROUTES = [
+    ("GET", "/sante", lambda params, body: {"statut": "ok", "schema": main.SCHEMA_VERSION}, False),
+    ("GET", "/etudiants", list_etudiants, False),
+    ("POST", "/etudiants", create_etudiant, True),
+    ("POST", "/etudiants/import", import_etudiants, True),
+    ("GET", "/etudiants/{id}", fiche_etudiant, False),
+    ("DELETE", "/etudiants/{id}", delete_etudiant, True),
+    ("GET", "/etudiants/{id}/moyenne", moyenne_etudiant, False),
+    ("GET", "/inscriptions", list_inscriptions, False),
+    ("POST", "/inscriptions", save_inscription, True),
+    ("GET", "/inscriptions/{id}", get_inscription, False),
+    ("PUT", "/inscriptions/{id}", save_inscription, True),
+    ("DELETE", "/inscriptions/{id}", delete_inscription, True),
+    ("GET", "/notes", list_notes, False),
+    ("POST", "/notes", add_note, True),
+    ("PUT", "/notes/{id}", update_note, True),
+    ("DELETE", "/notes/{id}", delete_note, True),
+    ("GET", "/notes/{id}/audit", audit_note, False),
+    ("GET", "/absences", list_absences, False),
+    ("POST", "/absences", save_absence, True),
+    ("GET", "/absences/stats", stats_absences, False),
+    ("GET", "/absences/alertes", alertes_absences, False),
+    ("GET", "/absences/{id}", get_absence, False),
+    ("PUT", "/absences/{id}", save_absence, True),
+    ("DELETE", "/absences/{id}", delete_absence, True),
+    ("GET", "/documents/releves/{id}", releve_pdf, False),
+    ("GET", "/documents/attestations/{id}", attestation_pdf, False),
+]
+
+COMPILED_ROUTES = [
+    (method, re.compile("^" + path.replace("{id}", r"(\d+)") + "$"), fn, write)
+    for method, path, fn, write in ROUTES
+]
+
+
+# SERVEUR
+
+class ApiServer:
+    """Serveur asyncio : une coroutine par connexion (keep-alive), travail SQLite dans les threads."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, readers=DEFAULT_READERS, token=None):
+        self.host = host
+        self.port = port
+        self.token = token or api_token()
+        # Un seul thread écrivain : les écritures sont sérialisées sur une seule connexion
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-ecrivain")
+        self.readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="api-lecteur")
+        self.server = None
+
+    def route(self, method, path):
+        allowed = False
+        for route_method, pattern, fn, write in COMPILED_ROUTES:
+            match = pattern.match(path)
+            if match:
+                if route_method == method:
+                    return fn, write, [int(g) for g in match.groups()]
+                allowed = True
+        if allowed:
+            raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, "Méthode non autorisée")
+        raise HttpError(HTTPStatus.NOT_FOUND, "Ressource inconnue")
+
+    def authorized(self, headers):
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        return scheme.lower() == "bearer" and hmac.compare_digest(token.strip().encode(), self.token.encode())
+
+    async def dispatch(self, method, target, body, headers):
+        """(statut, type de contenu, corps) de la réponse."""
+        url = urlsplit(target)
+        params = dict(parse_qsl(url.query))
+        try:
+            if not self.authorized(headers):
+                raise HttpError(HTTPStatus.UNAUTHORIZED, "Jeton absent ou invalide")
+            fn, write, args = self.route(method, url.path.rstrip("/") or "/")
+            content_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+            if body and content_type != "application/json":
+                raise HttpError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "Corps application/json attendu")
+            try:
+                payload = json.loads(body.decode("utf-8")) if body else {}
+            except ValueError:
+                raise HttpError(HTTPStatus.BAD_REQUEST, "Corps JSON invalide")
+            if not isinstance(payload, dict):
+                raise HttpError(HTTPStatus.BAD_REQUEST, "Objet JSON attendu")
+            pool = self.writer if write else self.readers
+            result = await asyncio.get_running_loop().run_in_executor(pool, lambda: fn(params, payload, *args))
+        except HttpError as e:
+            return e.status, "application/json", {"erreur": str(e)}
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, "application/json", {"erreur": str(e)}
+        except LookupError as e:
+            return HTTPStatus.NOT_FOUND, "application/json", {"erreur": str(e)}
+        except sqlite3.IntegrityError as e:
+            return HTTPStatus.CONFLICT, "application/json", {"erreur": str(e)}
+        except Exception as e:
+            print(f"Erreur API {method} {target}: {e}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, "application/json", {"erreur": str(e)}
+        if isinstance(result, bytes):
+            return HTTPStatus.OK, "application/pdf", result
+        return HTTPStatus.OK, "application/json", _json(result)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.respond(writer, HTTPStatus.BAD_REQUEST, "application/json",
+                                       {"erreur": "Requête invalide"}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.respond(writer, HTTPStatus.BAD_REQUEST, "application/json",
+                                       {"erreur": "Content-Length invalide"}, False)
+                    break
+                if length > MAX_BODY:
+                    await self.respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "application/json",
+                                       {"erreur": "Corps de requête trop volumineux"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, content_type, payload = await self.dispatch(method.upper(), target, body, headers)
+                await self.respond(writer, status, content_type, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, content_type, payload, keep_alive):
+        if content_type == "application/json":
+            payload = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            content_type += "; charset=utf-8"
+        status = HTTPStatus(status)
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + payload)
+        await writer.drain()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port, backlog=1024)
+        return self.server
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"✓ Serveur API sur http://{self.host}:{self.port} (Ctrl+C pour arrêter)")
+        try:
+            # Arrêt propre par le gestionnaire de services (SIGTERM) ; indisponible sous Windows
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self.server.close)
+        except (NotImplementedError, AttributeError):
+            pass
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.writer.shutdown(wait=True)
+        self.readers.shutdown(wait=True)
+        main.checkpoint_database()
+
+
+def api_token():
+    """Jeton partagé (paramètre serveur_api_jeton), créé au premier lancement s'il est vide."""
+    token = str(main.get_parametre("serveur_api_jeton", "") or "").strip()
+    if token:
+        return token
+    token = secrets.token_urlsafe(32)
+    conn = main.db_connect()
+    try:
+        with conn:
+            conn.execute("""
+                INSERT INTO parametres (cle, valeur, description, type_donnee) VALUES ('serveur_api_jeton', ?, ?, 'texte')
+                ON CONFLICT(cle) DO UPDATE SET valeur=excluded.valeur
+            """, (token, "Jeton partagé du serveur API (créé au premier lancement de serve)"))
+    finally:
+        conn.close()
+    print("✓ Jeton du serveur API créé (paramètre serveur_api_jeton)")
+    return token
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, readers=DEFAULT_READERS):
+    server = ApiServer(host, port, readers)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("Serveur API arrêté")
+    finally:
+        server.close()
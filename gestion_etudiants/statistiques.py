@@ -0,0 +1,228 @@
+"""Statistiques de cohorte vectorisées (délibérations de jury).
+
+Les notes, coefficients et identifiants sont chargés une seule fois en tableaux NumPy ;
+moyennes pondérées, mentions, rangs, percentiles, écarts-types et taux de réussite sont
+ensuite calculés pour toute la cohorte sans boucle Python par étudiant.
+"""
+
+import numpy as np
+
+# Note minimale de validation
+PASS_MARK = 10.0
+
+# Percentiles calculés par groupe (interpolation linéaire, comme np.percentile)
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Regroupements des étudiants disponibles pour stats_by / ranks_by
+GROUPINGS = ("filiere", "niveau", "groupe")
+
+
+def _dense(ids):
+    """(valeurs distinctes triées, index dense de chaque élément)."""
+    return np.unique(ids, return_inverse=True)
+
+
+def mention_index(values, thresholds):
+    """Indice de mention de chaque valeur : 0 pour le seuil le plus haut, len(thresholds) en dessous du dernier.
+
+    thresholds : seuils décroissants (ex. 18, 16, 14, 12, 10).
+    """
+    ascending = np.asarray(thresholds, dtype=np.float64)[::-1]
+    return len(ascending) - np.searchsorted(ascending, values, side="right")
+
+
+def mention_counts(values, thresholds):
+    """Nombre de valeurs par mention, dans l'ordre de mention_index."""
+    return np.bincount(mention_index(values, thresholds), minlength=len(thresholds) + 1)
+
+
+def weighted_means(values, weights, index, size):
+    """Moyenne pondérée de values par index dense (NaN si la somme des poids est nulle)."""
+    points = np.bincount(index, weights=values * weights, minlength=size)
+    total = np.bincount(index, weights=weights, minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, points / total, np.nan), total
+
+
+def group_stats(values, groups, size, percentiles=PERCENTILES, pass_mark=PASS_MARK) -> dict:
+    """Statistiques de values par groupe (index dense 0..size-1 ; -1 = hors groupe).
+
+    Retourne des tableaux de longueur size : count, mean, std (population), min, max,
+    pass_rate et p<q> pour chaque percentile. NaN pour un groupe vide.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    groups = np.asarray(groups, dtype=np.int64)
+    keep = groups >= 0
+    values, groups = values[keep], groups[keep]
+
+    count = np.bincount(groups, minlength=size)
+    total = np.bincount(groups, weights=values, minlength=size)
+    squares = np.bincount(groups, weights=values * values, minlength=size)
+    passed = np.bincount(groups, weights=(values >= pass_mark), minlength=size)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        std = np.sqrt(np.maximum(squares / count - mean * mean, 0.0))
+        pass_rate = passed / count
+
+    # Valeurs triées par groupe puis par valeur : chaque groupe occupe une tranche contiguë
+    order = np.lexsort((values, groups))
+    ordered = values[order]
+    start = np.concatenate(([0], np.cumsum(count)[:-1]))
+    last = start + count - 1
+    empty = count == 0
+
+    def at(positions):
+        if not len(ordered):
+            return np.full(size, np.nan)
+        return np.where(empty, np.nan, ordered[np.clip(positions, 0, len(ordered) - 1)])
+
+    stats = {
+        "count": count,
+        "mean": mean,
+        "std": std,
+        "min": at(start),
+        "max": at(last),
+        "pass_rate": pass_rate,
+    }
+    for q in percentiles:
+        position = start + (q / 100.0) * np.maximum(count - 1, 0)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, last)
+        stats[f"p{q}"] = at(low) + (at(high) - at(low)) * (position - low)
+    return stats
+
+
+def group_ranks(values, groups=None):
+    """Rang décroissant de chaque valeur dans son groupe (1 = meilleure ; ex æquo : 1, 2, 2, 4).
+
+    groups : index par valeur (-1 = non classé, rang 0) ; None = un seul groupe.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    groups = np.zeros(n, dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)
+    ranks = np.zeros(n, dtype=np.int64)
+    valid = np.flatnonzero((groups >= 0) & ~np.isnan(values))
+    if not len(valid):
+        return ranks
+
+    order = valid[np.lexsort((-values[valid], groups[valid]))]
+    g, v = groups[order], values[order]
+    positions = np.arange(len(order))
+    new_group = np.ones(len(order), dtype=bool)
+    new_group[1:] = g[1:] != g[:-1]
+    new_value = new_group.copy()
+    new_value[1:] |= v[1:] != v[:-1]
+    group_start = np.maximum.accumulate(np.where(new_group, positions, 0))
+    value_start = np.maximum.accumulate(np.where(new_value, positions, 0))
+    ranks[order] = value_start - group_start + 1
+    return ranks
+
+
+class Cohort:
+    """Notes d'une cohorte en tableaux NumPy, avec l'inscription retenue de chaque étudiant.
+
+    Les étudiants de la cohorte sont ceux qui ont au moins une note ; students, averages,
+    mentions et les tableaux de regroupement sont alignés sur le même index dense.
+    """
+
+    def __init__(self, etudiant_ids, module_ids, notes, coefficients, inscriptions=None, mentions=None):
+        """inscriptions : tableau (n, 4) etudiant_id, filiere_id, niveau_id, groupe_id (0 = aucun).
+        mentions : seuils décroissants des mentions (voir mention_index)."""
+        self.notes = np.asarray(notes, dtype=np.float64)
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)
+        self.students, self.student_index = _dense(np.asarray(etudiant_ids, dtype=np.int64))
+        self.modules, self.module_index = _dense(np.asarray(module_ids, dtype=np.int64))
+        self.mentions = tuple(mentions or ())
+
+        self.averages, self.coefficient_totals = weighted_means(
+            self.notes, self.coefficients, self.student_index, len(self.students))
+
+        # Filière / niveau / groupe de chaque étudiant (0 = non inscrit)
+        self.attributes = {name: np.zeros(len(self.students), dtype=np.int64) for name in GROUPINGS}
+        if inscriptions is not None and len(inscriptions) and len(self.students):
+            inscriptions = np.asarray(inscriptions, dtype=np.int64)
+            position = np.searchsorted(self.students, inscriptions[:, 0])
+            position = np.minimum(position, len(self.students) - 1)
+            found = self.students[position] == inscriptions[:, 0]
+            for column, name in enumerate(GROUPINGS, start=1):
+                self.attributes[name][position[found]] = inscriptions[found, column]
+
+    @classmethod
+    def from_db(cls, conn, annee=None, mentions=None):
+        """Charge la cohorte (toutes années, ou une année académique) en deux requêtes."""
+        cur = conn.cursor()
+        year = " WHERE no.annee_academique=?" if annee else ""
+        cur.execute(f"""
+            SELECT no.etudiant_id, no.module_id, no.note, m.coefficient
+            FROM notes no
+            JOIN modules m ON m.id = no.module_id{year}
+        """, (annee,) if annee else ())
+        rows = np.array(cur.fetchall(), dtype=np.float64).reshape(-1, 4)
+
+        # Inscription la plus récente de chaque étudiant (de l'année si précisée)
+        year = " WHERE annee_academique=?" if annee else ""
+        cur.execute(f"""
+            SELECT etudiant_id, filiere_id, niveau_id, COALESCE(groupe_id, 0)
+            FROM inscriptions
+            WHERE id IN (SELECT MAX(id) FROM inscriptions{year} GROUP BY etudiant_id)
+        """, (annee,) if annee else ())
+        inscriptions = np.array(cur.fetchall(), dtype=np.int64).reshape(-1, 4)
+
+        return cls(rows[:, 0].astype(np.int64), rows[:, 1].astype(np.int64), rows[:, 2], rows[:, 3],
+                   inscriptions, mentions)
+
+    def _grouping(self, name):
+        """(identifiants distincts, index dense par étudiant ; -1 = non inscrit)."""
+        values = self.attributes[name]
+        ids, index = _dense(values)
+        index = index.reshape(-1)
+        if len(ids) and ids[0] == 0:
+            ids, index = ids[1:], index - 1
+        graded = ~np.isnan(self.averages)
+        return ids, np.where(graded, index, -1)
+
+    def mention_indexes(self):
+        return mention_index(np.nan_to_num(self.averages, nan=0.0), self.mentions)
+
+    def ranks(self):
+        """Rang de chaque étudiant dans toute la cohorte."""
+        return group_ranks(self.averages)
+
+    def ranks_by(self, name):
+        """Rang de chaque étudiant dans sa filière, son niveau ou son groupe (0 = non classé)."""
+        return group_ranks(self.averages, self._grouping(name)[1])
+
+    def stats_by(self, name, **kwargs) -> dict:
+        """Statistiques des moyennes des étudiants par filière, niveau ou groupe ; clé "id"."""
+        ids, index = self._grouping(name)
+        stats = group_stats(self.averages, index, len(ids), **kwargs)
+        stats["id"] = ids
+        return stats
+
+    def module_stats(self, **kwargs) -> dict:
+        """Statistiques par module de la note moyenne de chaque étudiant dans le module ; clé "id"."""
+        if not len(self.modules):
+            return dict(group_stats([], [], 0, **kwargs), id=self.modules)
+        pairs = self.student_index.astype(np.int64) * len(self.modules) + self.module_index
+        keys, pair_index = _dense(pairs)
+        counts = np.bincount(pair_index)
+        means = np.bincount(pair_index, weights=self.notes) / counts
+        stats = group_stats(means, keys % len(self.modules), len(self.modules), **kwargs)
+        stats["id"] = self.modules
+        return stats
+
+    def student_table(self) -> dict:
+        """Tableaux par étudiant : id, moyenne, mention, admis, rang et rang par regroupement."""
+        table = {
+            "id": self.students,
+            "moyenne": self.averages,
+            "admis": self.averages >= PASS_MARK,
+            "rang": self.ranks(),
+        }
+        if self.mentions:
+            table["mention"] = self.mention_indexes()
+        for name in GROUPINGS:
+            table[name] = self.attributes[name]
+            table[f"rang_{name}"] = self.ranks_by(name)
+        return table
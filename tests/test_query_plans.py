@@ -0,0 +1,100 @@
+"""Plans des requêtes chaudes sur une base neuve : aucune ne doit parcourir une table entière."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "gestion_etudiants"))
+
+import main  # noqa: E402
+
+
+class RecordingConnection:
+    """Connexion qui garde (requête, paramètres) de chaque execute pour EXPLAIN QUERY PLAN."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.queries = []
+        self.cur = None
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=()):
+        self.queries.append((sql, tuple(params)))
+        self.cur = self.conn.execute(sql, params)
+        return self.cur
+
+    def fetchall(self):
+        return self.cur.fetchall()
+
+
+@pytest.fixture(scope="module")
+def conn(tmp_path_factory):
+    main.use_database(tmp_path_factory.mktemp("plans") / "t.db")
+    main.ensure_tables_and_seed()
+    conn = main.db_connect()
+    try:
+        yield conn
+    finally:
+        conn.close()
+        main.DB_POOL.close_all()
+
+
+def test_hot_queries(conn):
+    assert main.find_full_scans(conn) == []
+
+
+@pytest.mark.parametrize("filtre", [
+    main.StudentFilter(filiere="INF"),
+    main.StudentFilter(niveau="L1"),
+    main.StudentFilter(groupe="G1"),
+    main.StudentFilter(filiere="INF", niveau="L1", statut="actif"),
+])
+def test_student_search_filters(conn, filtre):
+    query = main.StudentService().search_query(filtre)
+    sql, params = main.keyset_page_sql(query.sql, query.params, query.keys, (1000,))
+    assert main.find_full_scans(conn, [("search_query", sql, params)]) == []
+
+
+def test_student_search_fulltext(conn):
+    if not main.FTS_ENABLED:
+        pytest.skip("FTS5 indisponible")
+    query = main.StudentService().search_query(main.StudentFilter(recherche="dupont"))
+    assert query.keys is None
+    assert main.find_full_scans(conn, [("search_query fts", query.sql + " LIMIT 200", query.params)]) == []
+
+
+@pytest.mark.parametrize("service, bound", [
+    (main.StudentService(), (1000,)),
+    (main.EnrollmentService(), (1000,)),
+    (main.GradeService("test"), (1000,)),
+    (main.AbsenceService(), ("2025-10-01", 1000)),
+])
+def test_keyset_pages(conn, service, bound):
+    # Pages suivantes et précédentes ; la première page parcourt la clé à rebours jusqu'à LIMIT
+    query = service.list_query()
+    for after in (True, False):
+        sql, params = main.keyset_page_sql(query.sql, query.params, query.keys, bound, after)
+        assert main.find_full_scans(conn, [(type(service).__name__, sql, params)]) == []
+
+
+@pytest.mark.parametrize("filters", [
+    {"annee": "2025-2026"},
+    {"filiere_id": 1, "niveau_id": 1, "annee": "2025-2026"},
+    {"groupe_id": 1},
+])
+def test_transcript_batch(conn, filters):
+    recorder = RecordingConnection(conn)
+    main.fetch_transcript_batch(recorder, **filters)
+    queries = [("fetch_transcript_batch", sql, params) for sql, params in recorder.queries]
+    assert main.find_full_scans(conn, queries) == []
+
+
+@pytest.mark.parametrize("filters", [{}, {"filiere_id": 1, "niveau_id": 1}, {"groupe_id": 1}])
+def test_attestation_batch(conn, filters):
+    recorder = RecordingConnection(conn)
+    main.fetch_attestation_batch(recorder, "2025-2026", **filters)
+    queries = [("fetch_attestation_batch", sql, params) for sql, params in recorder.queries]
+    assert main.find_full_scans(conn, queries) == []